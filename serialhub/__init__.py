@@ -10,7 +10,20 @@ from pathlib import Path
 
 #Import these so they get re-exported to serialhub package
 from .backend import SerialHubWidget
-from .serialio import SerialIO, SerialIOProvider, SerialIOLoopbackProvider
+from .serialio import SerialIO, SerialIOProvider, SerialIOLoopbackProvider, SerialWriteTimeout
+from .trace import SerialTrace
+from .checksum import SerialChecksum
+from .ttyprovider import SerialTTYProvider
+from .tcpprovider import SerialTCPProvider
+from .fanout import SerialFanout
+from .parsers import SerialLineParser, SerialRecordDecoder
+from .expect import SerialExpect
+from .framing import (SerialCOBSFramer, SerialSLIPFramer, SerialLengthFramer,
+                      SerialFrameStream)
+from .ringbuffer import SerialRingBuffer, SerialBufferOverflow
+from .streams import SerialStreamReader, SerialStreamWriter, open_serial_connection
+from .capture import (SerialCaptureWriter, SerialCaptureReader, SerialCaptureProvider,
+                      SerialIOReplayProvider)
 from .nbextension import _jupyter_nbextension_paths
 
 from ._version import __version__
@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""Shared base of SerialIOProviders servicing a non-blocking file descriptor."""
+
+import asyncio
+import itertools
+import selectors
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import ByteString, Callable, Deque, List, Optional, TextIO
+
+from .ringbuffer import _byte_view
+from .serialio import SerialIOProvider, SerialWriteTimeout
+
+_POLL_INTERVAL: float = 0.05  # Longest a reader thread waits before checking for stop
+_IOV_MAX: int = 1024  # Buffers per vectored write (the POSIX minimum of IOV_MAX)
+
+
+class PollingProvider(SerialIOProvider, ABC):
+    """SerialIOProvider for a non-blocking fd, delivering each read of up to read_size
+        bytes to do_recv. Data is read by whichever of these is active:
+            start() a reader thread, which also sends data held back by write_bytes
+            attach() to an asyncio loop, using loop.add_reader()
+            otherwise blocking SerialIO reads, via wait_recv()
+        Waits use a selectors.DefaultSelector (so any fd number works, unlike select()).
+        Subclasses set _fd, and implement _read_raw, _write_raw and _close_raw.
+    """
+
+    def __init__(self, read_size: int, write_timeout: Optional[float], dbglog: TextIO):
+        if read_size <= 0:
+            raise ValueError("read_size must be positive")
+        self._fd: Optional[int] = None
+        self._read_size: int = read_size
+        self.write_timeout: Optional[float] = write_timeout
+        self._cb_recv: Optional[Callable[[ByteString], None]] = None
+        self._dbglog: TextIO = dbglog
+        self._eof: bool = False
+        self._wpend: Deque[memoryview] = deque()  # Written data the fd did not accept yet
+        self._wpend_bytes: int = 0
+        self._wlock: threading.Lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop: threading.Event = threading.Event()
+        self._arrived: threading.Condition = threading.Condition()
+        self._n_recv: int = 0  # Count of reads delivered (by any means)
+        self._n_seen: int = 0  # Value of _n_recv when wait_recv last returned
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._selector: Optional[selectors.BaseSelector] = None  # Registered with _fd
+        self._sel_events: int = 0
+        self.n_read_bytes: int = 0
+        self.error: Optional[OSError] = None  # What stopped the reader thread, if anything
+
+    @abstractmethod
+    def _read_raw(self) -> bytes:
+        """Read up to _read_size bytes, b'' at EOF (raising BlockingIOError if none)."""
+
+    @abstractmethod
+    def _write_raw(self, bufs: List[memoryview]) -> int:
+        """Write bufs in order, returning bytes accepted (raising BlockingIOError if none)."""
+
+    def _close_raw(self) -> None:
+        """Release the fd."""
+
+    def _kernel_out_waiting(self) -> int:
+        """Bytes accepted by the fd but not yet transmitted, where that can be queried."""
+        return 0
+
+    def _reset_kernel_output(self) -> None:
+        """Discard data accepted by the fd but not yet transmitted, where supported."""
+
+    def fileno(self) -> int:
+        """The (non-blocking) file descriptor."""
+        if self._fd is None:
+            raise ValueError("Provider closed")
+        return self._fd
+
+    @property
+    def at_eof(self) -> bool:
+        """True once the other end hung up, so no more data can arrive."""
+        return self._eof
+
+    def _read_ready(self) -> int:
+        """Read and deliver whatever is waiting, returning bytes delivered.
+            A read filling read_size is repeated, since more data is likely waiting.
+        """
+        n_total: int = 0
+        while self._fd is not None and not self._eof:
+            try:
+                data: bytes = self._read_raw()
+            except BlockingIOError:
+                break
+            if not data:
+                self._eof = True
+                self._notify()
+                break
+            n_total += len(data)
+            self.n_read_bytes += len(data)
+            self.do_recv(data)
+            self._notify()
+            if len(data) < self._read_size:
+                break
+        return n_total
+
+    def _notify(self) -> None:
+        """Wake a wait_recv() waiting upon the reader thread."""
+        with self._arrived:
+            self._n_recv += 1
+            self._arrived.notify_all()
+
+    def _write_ready(self) -> None:
+        """Write as much held back data as the fd accepts, in vectored writes."""
+        with self._wlock:
+            wpend: Deque[memoryview] = self._wpend
+            while wpend and self._fd is not None:
+                bufs: List[memoryview] = list(itertools.islice(wpend, _IOV_MAX))
+                try:
+                    n_sent: int = self._write_raw(bufs)
+                except BlockingIOError:
+                    break
+                self._wpend_bytes -= n_sent
+                while n_sent > 0:
+                    if n_sent < len(wpend[0]):
+                        wpend[0] = wpend[0][n_sent:]
+                        break
+                    n_sent -= len(wpend.popleft())
+
+    def _select(self, timeout: Optional[float]) -> bool:
+        """Wait until the fd is readable (or writable while data is held back),
+            servicing both. Returns False if nothing happened within timeout.
+        """
+        events: int = selectors.EVENT_READ | (selectors.EVENT_WRITE if self._wpend else 0)
+        if self._selector is None:
+            self._selector = selectors.DefaultSelector()
+            self._selector.register(self._fd, events)
+        elif events != self._sel_events:
+            self._selector.modify(self._fd, events)
+        self._sel_events = events
+        ready: int = 0
+        for (_, mask) in self._selector.select(timeout):
+            ready |= mask
+        if ready & selectors.EVENT_WRITE:
+            self._write_ready()
+        if ready & selectors.EVENT_READ:
+            self._read_ready()
+        return bool(ready)
+
+    def start(self) -> None:
+        """Start a (daemon) thread reading the fd, which calls do_recv from that thread."""
+        if self._thread is not None or self._loop is not None:
+            raise RuntimeError("Reader already started")
+        self._stop.clear()
+
+        def run() -> None:
+            try:
+                while not self._stop.is_set() and self._fd is not None and not self._eof:
+                    self._select(_POLL_INTERVAL)
+            except OSError as exc:
+                self.error = exc
+                self._eof = True  # No more data can arrive
+                self._notify()
+
+        self._thread = threading.Thread(target=run, name=type(self).__name__, daemon=True)
+        self._thread.start()
+
+    def attach(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+        """Read the fd from an asyncio loop (the running one, unless given)."""
+        if self._thread is not None or self._loop is not None:
+            raise RuntimeError("Reader already started")
+        self._loop = loop or asyncio.get_running_loop()
+        self._loop.add_reader(self._fd, self._read_ready)
+
+    def stop(self) -> None:
+        """Stop the reader thread of start() or the loop reader of attach()."""
+        if self._thread is not None:
+            self._stop.set()
+            if self._thread is not threading.current_thread():
+                self._thread.join()
+            self._thread = None
+        if self._loop is not None:
+            if self._fd is not None:
+                self._loop.remove_reader(self._fd)
+            self._loop = None
+
+    def on_recv(self, cb_recv: Optional[Callable[[ByteString], None]]) -> None:
+        """Set callback for received buffers of serial data."""
+        self._cb_recv = cb_recv
+
+    def do_recv(self, buf: ByteString) -> None:
+        """A buffer arrived, handle it."""
+        if self._cb_recv:
+            self._cb_recv(buf)
+        elif self._dbglog:
+            self._dbglog.write(f'{type(self).__name__}-LOST: {len(buf)} {ascii(buf)}\n')
+
+    def write_bytes(self, buf: ByteString) -> None:
+        """Write without blocking, holding back what the fd does not accept, to be sent
+            once the reader thread, flush() or drain() find it writable.
+            With write_timeout set, instead waits until all held back data is written,
+            raising SerialWriteTimeout if write_timeout passes first.
+        """
+        if self.is_closed():
+            raise ValueError("Provider closed")
+        view: memoryview = _byte_view(buf)
+        if not view.readonly:  # Caller may reuse a mutable buffer, so keep a copy
+            view = memoryview(view.tobytes())
+        if len(view) <= 0:
+            return
+        with self._wlock:
+            self._wpend.append(view)
+            self._wpend_bytes += len(view)
+        self._write_ready()
+        if self._wpend and self.write_timeout is not None:
+            if not self._wait_written(self.write_timeout):
+                raise SerialWriteTimeout(f'Write of {len(view)} bytes timed out, '
+                                         f'{self._wpend_bytes} bytes held back')
+
+    def _wait_written(self, timeout: Optional[float]) -> bool:
+        """Write held back data as the fd accepts it, for up to timeout seconds.
+            Returns True if none remains.
+        """
+        if not self._wpend or self._fd is None:
+            return not self._wpend
+        t_end: Optional[float] = None if timeout is None else time.monotonic() + timeout
+        # Its own selector, as a reader thread may be using _selector meanwhile
+        with selectors.DefaultSelector() as selector:
+            selector.register(self._fd, selectors.EVENT_WRITE)
+            while self._wpend and self._fd is not None:
+                t_wait: Optional[float] = None if t_end is None else t_end - time.monotonic()
+                if t_wait is not None and t_wait <= 0:
+                    break
+                if selector.select(t_wait):
+                    self._write_ready()
+        return not self._wpend
+
+    def flush(self) -> None:
+        """Write held back data, as far as possible without blocking."""
+        self._write_ready()
+
+    def wait_recv(self, timeout: Optional[float]) -> bool:
+        """Wait up to timeout seconds for data, reading it directly unless a reader thread
+            is active. Returns False once closed or at EOF.
+        """
+        if self._fd is None or self._eof:
+            return False
+        if self._thread is None:
+            self._select(timeout)
+            return self._fd is not None and not self._eof
+        with self._arrived:
+            self._arrived.wait_for(lambda: self._n_recv != self._n_seen or self._eof,
+                                   timeout)
+            self._n_seen = self._n_recv
+        return not self._eof
+
+    def out_waiting(self) -> int:
+        """Bytes held back by write_bytes, plus those still queued by the kernel."""
+        return self._wpend_bytes + self._kernel_out_waiting()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Write held back data, then wait until the kernel has transmitted it too, for up
+            to timeout seconds (or write_timeout if None). Returns True if so.
+        """
+        if timeout is None:
+            timeout = self.write_timeout
+        t_end: Optional[float] = None if timeout is None else time.monotonic() + timeout
+        if not self._wait_written(timeout):
+            return False
+        while self._kernel_out_waiting() > 0:
+            t_wait: float = _POLL_INTERVAL if t_end is None else t_end - time.monotonic()
+            if t_wait <= 0:
+                return False
+            time.sleep(min(_POLL_INTERVAL, t_wait))
+        return True
+
+    def reset_output(self) -> None:
+        """Discard held back data, and whatever the kernel has not transmitted yet."""
+        with self._wlock:
+            self._wpend.clear()
+            self._wpend_bytes = 0
+        if self._fd is not None:
+            self._reset_kernel_output()
+
+    def is_closed(self) -> bool:
+        """Closed by close(), but not by EOF, as data received before it may still be read."""
+        return self._fd is None
+
+    def close(self) -> None:
+        """Stop reading, then release the fd."""
+        self.stop()
+        if self._selector is not None:
+            self._selector.close()
+            self._selector = None
+        if self._fd is not None:
+            self._close_raw()
+        self._fd = None
+        self._notify()
+
+    def __enter__(self) -> 'PollingProvider':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
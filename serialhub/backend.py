@@ -8,13 +8,210 @@
 
 from __future__ import absolute_import
 
-from typing import Sequence, Mapping, Any, ByteString, Optional, Callable  # , BinaryIO, IO
+import asyncio
+import inspect
+import threading
+import time
+from collections import deque
+from typing import (Sequence, Mapping, Any, ByteString, Optional, Callable, List, Deque, Dict,
+                    Tuple)
 
 import ipywidgets #eg: DOMWidget, register
 import traitlets #eg: Integer, Unicode, Bool, Complex, Enum
+import zmq
+from IPython import get_ipython
+from jupyter_client.session import DELIM
 
 from ._frontend import module_name, module_version
-from .serialio import SerialIOProvider
+from .serialio import SerialIOProvider, SerialWriteTimeout
+from .metrics import WidgetMetrics
+
+
+# ipykernel major versions whose shell message handling _pump_kernel knows: 6.x queues
+# (index, dispatch, args) in kernel.msg_queue, while 7.x reads the shell socket from its
+# own thread, forwarding messages to the main thread over an inproc socket
+_PUMP_KERNEL_VERSIONS: Tuple[int, ...] = (6, 7)
+_PUMPED_MSG_TYPES = frozenset(('comm_open', 'comm_msg', 'comm_close'))
+# Seconds drain() (so SerialIO.flush) waits for acknowledgements without write_timeout,
+# in case the view with the port open goes away
+_DEFAULT_DRAIN_TIMEOUT: float = 5.0
+
+
+def _kernel_version() -> Tuple[int, ...]:
+    """Version of the installed ipykernel."""
+    import ipykernel  # pylint: disable=import-outside-toplevel
+    return tuple(ipykernel.version_info)
+
+
+def _shell_msg_type(kernel: Any, msg_list: Sequence[Any]) -> str:
+    """msg_type of a raw (zmq frames) shell message, read from its header alone, leaving
+        signature checks and any buffers to the kernel's own dispatch.
+    """
+    for (i_part, part) in enumerate(msg_list):
+        if getattr(part, 'bytes', part) == DELIM and i_part + 2 < len(msg_list):
+            header = msg_list[i_part + 2]  # After the delimiter and signature
+            return kernel.session.unpack(getattr(header, 'bytes', header))['msg_type']
+    return ''
+
+
+def _run_now(pending: Any) -> None:
+    """Run a dispatch coroutine, which for comm messages completes without suspending."""
+    if inspect.iscoroutine(pending):
+        try:
+            pending.send(None)
+            pending.close()  # Cannot await a real suspension from here
+        except StopIteration:
+            pass
+
+
+def _pump_kernel(timeout: Optional[float]) -> bool:
+    """Handle comm messages (eg: SENT acknowledgements from the frontend) that arrive at
+        the kernel while a cell is running, first waiting up to timeout seconds
+        (None=forever) for a shell message. Other requests (eg: to execute further cells)
+        are left to the kernel's own dispatch, after the running cell.
+        Returns False outside of a kernel, since nothing can arrive. This relies upon
+        ipykernel internals, so raises RuntimeError under unsupported versions.
+    """
+    kernel = getattr(get_ipython(), 'kernel', None)
+    if kernel is None:
+        return False
+    version: Tuple[int, ...] = _kernel_version()
+    if version[0] == 6:
+        return _pump_kernel6(kernel, timeout)
+    if version[0] == 7:
+        return _pump_kernel7(kernel, timeout)
+    raise RuntimeError(
+        f"Waiting upon the widget within a running cell is not supported under "
+        f"ipykernel {'.'.join(map(str, version))} "
+        f"(requires {' or '.join(f'{major}.x' for major in _PUMP_KERNEL_VERSIONS)})")
+
+
+def _poll_ms(timeout: Optional[float]) -> int:
+    return -1 if timeout is None else max(0, int(timeout * 1000))
+
+
+def _pump_kernel6(kernel: Any, timeout: Optional[float]) -> bool:
+    """_pump_kernel under ipykernel 6.x, whose shell stream queues each message in
+        kernel.msg_queue, so requests not handled here are put back there in order.
+    """
+    stream = kernel.shell_stream
+    msg_queue = kernel.msg_queue
+    if msg_queue.empty():
+        if not stream.socket.poll(_poll_ms(timeout)):
+            return True  # Nothing arrived, but more could while waiting again
+    #pylint: disable=protected-access
+    parent_ident = kernel._parent_ident['shell']
+    parent = kernel.get_parent('shell')
+    deferred: List[Any] = []
+    try:
+        while True:
+            stream.flush()  # Queue whatever arrived, via kernel.schedule_dispatch
+            if msg_queue.empty():
+                break
+            item = msg_queue.get_nowait()
+            (dispatch, args) = item[-2:]
+            if _shell_msg_type(kernel, args[-1]) in _PUMPED_MSG_TYPES:
+                _run_now(dispatch(*args))
+            else:
+                deferred.append(item)
+    finally:
+        for item in deferred:  # Requeued in order, for the kernel's own dispatch
+            msg_queue.put_nowait(item)
+        kernel.set_parent(parent_ident, parent, 'shell')  # The running cell's again
+    return True
+
+
+def _pump_kernel7(kernel: Any, timeout: Optional[float]) -> bool:
+    """_pump_kernel under ipykernel 7.x, where the main thread's shell messages arrive
+        on a socket (from the shell channel thread when subshells are supported) whose
+        stream would call kernel.shell_main once the running cell returns to the loop.
+        Messages are read from that socket directly, and those not handled here are
+        handed to shell_main on the loop, as the stream would have, in order.
+    """
+    channel = kernel.shell_channel_thread
+    if channel is None:
+        socket = kernel.shell_stream.socket
+    elif threading.current_thread() is channel.parent_thread:
+        socket = channel.manager.get_shell_channel_to_subshell_pair(None).to_socket
+    else:  # Its socket belongs to the thread of the subshell
+        raise RuntimeError("Waiting upon the widget is only supported in the main shell")
+    if not socket.poll(_poll_ms(timeout)):
+        return True  # Nothing arrived, but more could while waiting again
+    #pylint: disable=protected-access
+    parent_ident = kernel._get_shell_context_var(kernel._shell_parent_ident)
+    parent = kernel.get_parent('shell')
+    # Without busy/idle status messages (since 7.4), as the running cell stays busy
+    concurrent: Dict[str, bool] = {'concurrent': True} \
+        if 'concurrent' in inspect.signature(kernel.dispatch_shell).parameters else {}
+    try:
+        while True:  # Until none is left, as the stream may not be woken for them again
+            try:
+                msg_list = socket.recv_multipart(zmq.NOBLOCK, copy=False)
+            except zmq.Again:
+                break
+            if _shell_msg_type(kernel, msg_list) in _PUMPED_MSG_TYPES:
+                _run_now(kernel.dispatch_shell(msg_list, None, **concurrent))
+            else:
+                kernel.io_loop.add_callback(kernel.shell_main, None, msg_list)
+    finally:
+        kernel.set_parent(parent_ident, parent, 'shell')  # The running cell's again
+    return True
+
+
+def _call_later(delay: float, func: Callable[[], None]) -> Optional[asyncio.TimerHandle]:
+    """Schedule func on the running (kernel) event loop, or return None if there is none."""
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+    return loop.call_later(delay, func)
+
+
+class _Scrollback():
+    """Tail of appended text, bounded by character and/or line (newline) count."""
+
+    def __init__(self):
+        self._parts: Deque[str] = deque()
+        self._nchars: int = 0
+        self._nlines: int = 0
+
+    def __str__(self) -> str:
+        return ''.join(self._parts)
+
+    def __len__(self) -> int:
+        return self._nchars
+
+    def clear(self) -> None:
+        """Discard all text."""
+        self._parts.clear()
+        self._nchars = 0
+        self._nlines = 0
+
+    def append(self, text: str, max_chars: int, max_lines: int) -> None:
+        """Append text, then discard the oldest text beyond max_chars or max_lines (if > 0)."""
+        self._parts.append(text)
+        self._nchars += len(text)
+        self._nlines += text.count('\n')
+        while self._parts:
+            head: str = self._parts[0]
+            n_cut: int = 0  # Leading characters of head to discard
+            if 0 < max_chars < self._nchars:
+                n_cut = min(len(head), self._nchars - max_chars)
+            if 0 < max_lines < self._nlines:
+                i_nl: int = -1
+                for _ in range(self._nlines - max_lines):  # Through the excess newlines
+                    i_nl = head.find('\n', i_nl + 1)
+                    if i_nl < 0:
+                        break
+                n_cut = max(n_cut, len(head) if i_nl < 0 else i_nl + 1)
+            if n_cut <= 0:
+                break
+            self._nchars -= n_cut
+            self._nlines -= head.count('\n', 0, n_cut)
+            if n_cut >= len(head):
+                self._parts.popleft()
+            else:
+                self._parts[0] = head[n_cut:]
 
 
 @ipywidgets.register
@@ -45,6 +242,18 @@ class SerialHubWidget(ipywidgets.DOMWidget, SerialIOProvider):
         default_value='',
         help='value for debug feedback messages'
     ).tag(sync=True)
+    scrollback_chars = traitlets.Int(
+        default_value=0,
+        help='if > 0, keep only this many characters of received text (see scrollback)'
+    ).tag(sync=True)
+    scrollback_lines = traitlets.Int(
+        default_value=0,
+        help='if > 0, keep only this many lines of received text (see scrollback)'
+    ).tag(sync=True)
+    scrollback_interval = traitlets.Float(  # Backend only, so not synced
+        default_value=0.05,
+        help='seconds between sending scrollback deltas, merging text meanwhile (0=every chunk)'
+    )
     request_options = traitlets.Dict(
         per_key_traits={
             'filters': traitlets.List(trait=traitlets.Dict())
@@ -67,7 +276,11 @@ class SerialHubWidget(ipywidgets.DOMWidget, SerialIOProvider):
             'stopBits': 1
         }, help='serial_options to apply when opening serial port'
     ).tag(sync=True)
-    #FUTURE: Optionally turn off 'sync' attribute for statistics (for performance)
+    #Statistics are counted in plain integers, then published to the pkt_* traitlets
+    stats_interval = traitlets.Float(
+        default_value=0.0,
+        help='seconds between publishing pkt_* statistics (0=every packet, <0=on demand only)'
+    ).tag(sync=True)
     pkt_recv_front = traitlets.Tuple(
         traitlets.Int(), traitlets.Int(),
         default_value=(0, 0),
@@ -90,11 +303,60 @@ class SerialHubWidget(ipywidgets.DOMWidget, SerialIOProvider):
         default_value=(0, 0),
         help='[bytes,packets] sent by backend to frontend'
     ).tag(sync=True)
+    recv_batch_ms = traitlets.Int(
+        default_value=0,
+        help='milliseconds the frontend may hold received data to merge into one message (0=off)'
+    ).tag(sync=True)
+    recv_batch_bytes = traitlets.Int(
+        default_value=0,
+        help='byte budget at which the frontend forwards merged received data (0=unlimited)'
+    ).tag(sync=True)
+    #Write coalescing is a backend only setting, so these traitlets are not synced
+    write_coalesce_bytes = traitlets.Int(
+        default_value=0,
+        help='hold back writes until this many bytes are pending (0 sends each write at once)'
+    )
+    write_coalesce_delay = traitlets.Float(
+        default_value=0.005,
+        help='seconds a held back write may wait for more before being sent anyway'
+    )
+    write_coalesce_join = traitlets.Bool(
+        default_value=False,
+        help='join held back writes into one buffer, rather than one buffer each'
+    )
+    #Write flow control, counting bytes sent until the frontend acknowledges writing them
+    write_window = traitlets.Int(
+        default_value=0,
+        help='writes wait while this many bytes are not yet acknowledged as sent (0=no limit)'
+    )
+    write_timeout = traitlets.Float(
+        default_value=None,
+        allow_none=True,
+        help='seconds a write may wait for write_window (None=forever), or flush() to drain'
+    )
 
     def __init__(self, *args, **kwargs):
         #FUTURE: Allow request & serial options to be passed at construction
         ipywidgets.DOMWidget.__init__(self, *args, **kwargs)
         self._cb_recv: Optional[Callable[[ByteString], None]] = None
+        self._wpend: List[bytes] = []  # Writes held back for coalescing
+        self._wpend_bytes: int = 0
+        self._wtimer: Optional[asyncio.TimerHandle] = None
+        self._wsent: int = 0  # Total bytes sent to frontend in SEND messages
+        self._wacked: int = 0  # Offset (within _wsent) acknowledged by SENT messages
+        self._sent_listeners: List[Callable[[], None]] = []
+        self._stat_recv_back: List[int] = list(self.pkt_recv_back)  # Unsynced [bytes,packets]
+        self._stat_send_back: List[int] = list(self.pkt_send_back)
+        self._stat_send_front: List[int] = [0, 0]  # As last acknowledged by a SENT message
+        self._stat_timer: Optional[asyncio.TimerHandle] = None
+        self._scroll: _Scrollback = _Scrollback()
+        self._vpend: List[str] = []  # Scrollback text appended, but not yet sent
+        self._vpend_chars: int = 0
+        self._vtimer: Optional[asyncio.TimerHandle] = None
+        self._vtime: float = 0.0  # time.monotonic() of last scrollback message
+        self._metrics: Optional[WidgetMetrics] = None  # Only while enabled
+        self._metrics_data: Optional[WidgetMetrics] = None  # Kept while paused
+        self._stat_time: float = 0.0  # time.monotonic() of last publish_stats()
         self.on_msg(self.msg_custom)
 
     def msg_custom(self,
@@ -104,19 +366,101 @@ class SerialHubWidget(ipywidgets.DOMWidget, SerialIOProvider):
     ) -> None:
         """Receives custom message callbacks from the frontend client."""
         msgtype = str(content['type'])
+        metrics: Optional[WidgetMetrics] = self._metrics
+        t_start: int = 0 if metrics is None else time.perf_counter_ns()
         if msgtype == 'RECV':
+            stat = self._stat_recv_back
             for buf in buffers:
-                (o_byt, o_pkt) = self.pkt_recv_back
-                self.pkt_recv_back = (o_byt + len(buf), o_pkt + 1)
+                stat[0] += len(buf)
+                stat[1] += 1
                 self.do_recv(buf)
+            self._stats_dirty()
         elif msgtype == 'SENT': #Acknowledge data sent by client
-            (f_byt, f_pkt) = content['stat_client'] #Update backend stats
-            self.pkt_send_front = (f_byt, f_pkt)
+            if 'offset' in content:  # Echoed from SEND, so stale acks (eg: from before
+                acked: int = int(content['offset'])  # reset_output) change nothing
+            else:  # Older frontend, counting bytes
+                acked = self._wacked + int(content.get('acked', 0))
+            self._wacked = max(self._wacked, min(self._wsent, acked))
+            (f_byt, f_pkt) = content['stat_client'] #Frontend publishes its own traitlet
+            self._stat_send_front = [f_byt, f_pkt]
+            self._notify_sent()
         elif msgtype == 'RSTS': #Reset backend statistics
-            self.pkt_recv_back = (0, 0)
-            self.pkt_send_back = (0, 0)
+            self._stat_recv_back = [0, 0]
+            self._stat_send_back = [0, 0]
+            self.publish_stats(frontend=False)
         elif msgtype == 'MSGV': #Append to "value" from client
-            self.value += content['text']
+            self.append_value(content['text'])
+        elif msgtype == 'VREQ': #A view rendered, so needs the scrollback retained so far
+            self.send_scrollback()
+        if metrics is not None:
+            metrics.on_msg(msgtype, buffers, time.perf_counter_ns() - t_start)
+
+    def enable_metrics(self, enabled: bool = True) -> None:
+        """Start updating the counters reported by stats(), or pause with enabled=False."""
+        if enabled and self._metrics_data is None:
+            self._metrics_data = WidgetMetrics()
+        self._metrics = self._metrics_data if enabled else None
+
+    def reset_metrics(self) -> None:
+        """Zero the counters reported by stats()."""
+        self._metrics_data = WidgetMetrics()
+        if self._metrics is not None:
+            self._metrics = self._metrics_data
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of traffic counters and write flow state, plus any metrics counted
+            while enabled (see enable_metrics).
+        """
+        snap: Dict[str, Any] = {
+            'metrics_enabled': self._metrics is not None,
+            'recv_back': list(self._stat_recv_back),
+            'send_back': list(self._stat_send_back),
+            'send_front': list(self._stat_send_front),
+            'out_waiting': self.out_waiting(),
+        }
+        if self._metrics_data is not None:
+            snap.update(self._metrics_data.snapshot())
+        return snap
+
+    @traitlets.observe('pkt_recv_back', 'pkt_send_back')
+    def _stats_assigned(self, change: Mapping[str, Any]) -> None:
+        """Keep counters consistent if the traitlets get assigned directly."""
+        if change['name'] == 'pkt_recv_back':
+            self._stat_recv_back = list(change['new'])
+        else:
+            self._stat_send_back = list(change['new'])
+
+    def _stats_dirty(self) -> None:
+        """Statistics changed, so publish them now or later according to stats_interval."""
+        interval: float = self.stats_interval
+        if interval == 0:
+            self.publish_stats(frontend=False)
+        elif interval > 0 and self._stat_timer is None:
+            t_wait: float = self._stat_time + interval - time.monotonic()
+            if t_wait <= 0:
+                self.publish_stats(frontend=False)
+            else:  # Without an event loop, the next change after t_wait will publish
+                self._stat_timer = _call_later(t_wait, self._stats_timeout)
+
+    def _stats_timeout(self) -> None:
+        self._stat_timer = None
+        self.publish_stats(frontend=False)
+
+    def publish_stats(self, frontend: bool = True) -> None:
+        """Copy backend counters to the pkt_*_back traitlets (in one sync message),
+            and unless frontend=False ask the frontend to publish pkt_*_front too.
+        """
+        if self._stat_timer is not None:
+            self._stat_timer.cancel()
+            self._stat_timer = None
+        self._stat_time = time.monotonic()
+        if self._metrics is not None:
+            self._metrics.stats_published += 1
+        with self.hold_sync():
+            self.pkt_recv_back = tuple(self._stat_recv_back)
+            self.pkt_send_back = tuple(self._stat_send_back)
+        if frontend:
+            self.send_custom({'type': 'STAT'})
 
     def send_custom(self,
                 content: Mapping[str, Any],
@@ -127,6 +471,8 @@ class SerialHubWidget(ipywidgets.DOMWidget, SerialIOProvider):
             Optional "buffers" get sent as binary data (unlike binary data within "content").
         """
         self.send(content, buffers)
+        if self._metrics is not None:
+            self._metrics.on_send(content['type'], buffers)
 
     def on_recv(self, cb_recv: Optional[Callable[[ByteString], None]]):
         """Set callback for received buffers of serial data"""
@@ -140,22 +486,219 @@ class SerialHubWidget(ipywidgets.DOMWidget, SerialIOProvider):
             # buf.hex() ; str(binascii.b2a_hex(buf)) ; buf.decode('ascii','ignore')
             decoded: str = str(buf, encoding='ascii',
                                errors='backslashreplace')
-            self.value += decoded.replace("\n", "\\n").replace("\r", "\\r")
+            if self.scrollback_chars > 0 or self.scrollback_lines > 0:
+                self.append_value(decoded.replace("\r", "\\r"))  # Keep lines for scrollback
+            else:
+                self.value += decoded.replace("\n", "\\n").replace("\r", "\\r")
+
+    @property
+    def scrollback(self) -> str:
+        """Received text kept in scrollback mode (when scrollback_chars/lines is set)."""
+        return str(self._scroll)
+
+    def append_value(self, text: str) -> None:
+        """Append text to the displayed value. In scrollback mode only the appended text
+            is sent to the frontend, rather than re-syncing an ever growing "value".
+        """
+        if self.scrollback_chars <= 0 and self.scrollback_lines <= 0:
+            self.value += text
+            return
+        self._scroll.append(text, self.scrollback_chars, self.scrollback_lines)
+        self._vpend.append(text)
+        self._vpend_chars += len(text)
+        if self._vpend_chars > len(self._scroll):  # To be sent as VSET, so need not keep
+            self._vpend = []
+        interval: float = self.scrollback_interval
+        if interval <= 0:
+            self.flush_scrollback()
+        elif self._vtimer is None:
+            t_wait: float = self._vtime + interval - time.monotonic()
+            if t_wait > 0:
+                self._vtimer = _call_later(t_wait, self.flush_scrollback)
+            if self._vtimer is None:  # Due already, or no event loop to send it later
+                self.flush_scrollback()
+
+    def _discard_deltas(self) -> None:
+        if self._vtimer is not None:
+            self._vtimer.cancel()
+            self._vtimer = None
+        self._vpend = []
+        self._vpend_chars = 0
+        self._vtime = time.monotonic()
+
+    def flush_scrollback(self) -> None:
+        """Send text appended since the last scrollback message (per scrollback_interval)
+            in one VDLT message, or as VSET once it exceeds what the scrollback retains.
+        """
+        if self._vpend_chars <= 0:
+            return
+        if self._vpend_chars > len(self._scroll):
+            self.send_scrollback()
+            return
+        text: str = ''.join(self._vpend)
+        self._discard_deltas()
+        self.send_custom({'type': 'VDLT', 'text': text})
+
+    def send_scrollback(self) -> None:
+        """Send the whole scrollback in one VSET message (views replace what they show),
+            eg: for a view that rendered after VDLT deltas were sent.
+        """
+        self._discard_deltas()  # Included in the whole scrollback
+        if self.scrollback_chars > 0 or self.scrollback_lines > 0:
+            self.send_custom({'type': 'VSET', 'text': str(self._scroll)})
+
+    def clear_scrollback(self) -> None:
+        """Discard scrollback text, both here and as displayed by the frontend."""
+        self._scroll.clear()
+        self._discard_deltas()
+        self.send_custom({'type': 'VCLR'})
 
     def write_bytes(self,
                     buf: ByteString
                     ) -> None:
         """Sends a buffer for the client to write() as serial data.
           "buf" is a single bytestring to be output by client to the serialport
+          With write_coalesce_bytes set, buf is held back until that many bytes are
+          pending, write_coalesce_delay passes, or flush() is called (or sent at once
+          without a running event loop to send it later).
+          With write_window set, first waits until buf fits among the bytes not yet
+          acknowledged (sending any held back, which cannot be acknowledged until sent),
+          raising SerialWriteTimeout if write_timeout passes.
         """
-        self.send_custom({'type': 'SEND'}, [buf])
-        (o_byt, o_pkt) = self.pkt_send_back
-        self.pkt_send_back = (o_byt + len(buf), o_pkt + 1)
+        if self._metrics is not None:
+            self._metrics.write_calls += 1
+        if self.write_window > 0:
+            self._wait_window(len(buf))
+        if self.write_coalesce_bytes <= 0 and not self._wpend:
+            self._send_bufs([buf], len(buf))
+            return
+        if self._metrics is not None:
+            self._metrics.write_held += 1
+        self._wpend.append(bytes(buf))  # Copy, since caller may reuse a mutable buffer
+        self._wpend_bytes += len(buf)
+        if self._wpend_bytes >= self.write_coalesce_bytes:
+            self.flush()
+        elif self._wtimer is None:
+            self._wtimer = _call_later(self.write_coalesce_delay, self.flush)
+            if self._wtimer is None:  # No event loop to send it later, so send it now
+                self.flush()
+
+    def flush(self) -> None:
+        """Send any writes held back for coalescing, as a single SEND message."""
+        if self._wtimer is not None:
+            self._wtimer.cancel()
+            self._wtimer = None
+        if not self._wpend:
+            return
+        bufs: List[bytes] = self._wpend
+        n_bytes: int = self._wpend_bytes
+        self._wpend = []
+        self._wpend_bytes = 0
+        if self.write_coalesce_join and len(bufs) > 1:
+            bufs = [b''.join(bufs)]
+        self._send_bufs(bufs, n_bytes)
+
+    def _send_bufs(self, bufs: Sequence[ByteString], n_bytes: int) -> None:
+        """Send buffers totalling n_bytes in one SEND message, counting them in flight.
+            The message carries the offset they end at, which SENT echoes once written.
+        """
+        self._wsent += n_bytes  # Before sending, in case SENT is handled within send()
+        self.send_custom({'type': 'SEND', 'offset': self._wsent}, bufs)
+        if self._metrics is not None:
+            self._metrics.on_out_waiting(self.out_waiting())
+        self._stat_send_back[0] += n_bytes
+        self._stat_send_back[1] += len(bufs)
+        self._stats_dirty()
+
+    def out_waiting(self) -> int:
+        """Bytes held back or sent, but not yet acknowledged as written by the frontend."""
+        return self._wpend_bytes + self._wsent - self._wacked
+
+    def _wait_sent(self, is_done: Callable[[], bool], timeout: Optional[float]) -> bool:
+        """Service comm messages (delivering SENT acknowledgements) until is_done() or
+            timeout seconds pass. Returns is_done(), also when unable to wait any longer.
+        """
+        deadline: Optional[float] = None if timeout is None else time.monotonic() + timeout
+        while not is_done():
+            remain: Optional[float] = None
+            if deadline is not None:
+                remain = deadline - time.monotonic()
+                if remain <= 0:
+                    return False
+            if self.is_closed() or not _pump_kernel(remain):
+                return is_done()
+        return True
+
+    def _wait_window(self, n_bytes: int) -> None:
+        """Wait until n_bytes more fit within write_window, or nothing is in flight."""
+        def has_room() -> bool:
+            n_out: int = self.out_waiting()
+            return n_out == 0 or n_out + n_bytes <= self.write_window
+        if self._wpend and not has_room():
+            self.flush()  # Otherwise waiting upon acknowledgements that cannot arrive
+        t_start: int = time.perf_counter_ns()
+        fits: bool = self._wait_sent(has_room, self.write_timeout)
+        if self._metrics is not None:
+            self._metrics.write_wait_ns.add(time.perf_counter_ns() - t_start)
+        if not fits:
+            raise SerialWriteTimeout(
+                f'Write of {n_bytes} bytes timed out, {self.out_waiting()} bytes in flight')
+
+    @property
+    def port_open(self) -> bool:
+        """Has a view opened a serial port (per status), so may acknowledge writes?"""
+        return self.status == 'Connected'
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Send held back writes, then wait until the frontend acknowledges writing all
+            data, for up to timeout seconds (if None, write_timeout or else
+            _DEFAULT_DRAIN_TIMEOUT). Returns True if so.
+            Without write_window there is no flow control to wait for, and without an
+            open port no acknowledgement can arrive, so either returns at once.
+        """
+        self.flush()
+        if self.write_window <= 0 or not self.port_open:
+            return self.out_waiting() == 0
+        if timeout is None:
+            timeout = _DEFAULT_DRAIN_TIMEOUT if self.write_timeout is None \
+                else self.write_timeout
+        return self._wait_sent(lambda: self.out_waiting() == 0, timeout)
+
+    def reset_output(self) -> None:
+        """Discard held back writes, and stop waiting upon data already sent to frontend."""
+        if self._wtimer is not None:
+            self._wtimer.cancel()
+            self._wtimer = None
+        self._wpend = []
+        self._wpend_bytes = 0
+        self._wacked = self._wsent
+        self._notify_sent()
+
+    def add_sent_listener(self, listener: Callable[[], None]) -> bool:
+        """Call listener() as SENT acknowledgements (or reset_output) reduce out_waiting."""
+        self._sent_listeners.append(listener)
+        return True
+
+    def remove_sent_listener(self, listener: Callable[[], None]) -> None:
+        """Stop calling a listener added by add_sent_listener."""
+        self._sent_listeners.remove(listener)
+
+    def _notify_sent(self) -> None:
+        for listener in tuple(self._sent_listeners):
+            listener()
 
     def is_closed(self) -> bool:
         """Currently presumes open if serial is supported."""
         return not self.is_supported
 
+    def wait_recv(self, timeout: Optional[float]) -> bool:
+        """Keep servicing comm messages from the frontend (which arrive via msg_custom)
+            for up to timeout seconds, even while a notebook cell is running.
+        """
+        if self.is_closed():
+            return False
+        return _pump_kernel(timeout)
+
     def write_str(self,
                   data: str,
                   enc: Optional[str] = 'ascii',
@@ -0,0 +1,400 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""Record serial traffic to memory-mapped capture files, and read them back.
+
+Each capture segment file is preallocated, then filled through mmap:
+    header  _HEADER (padded to _HEADER_SIZE bytes), counts updated after each chunk
+    index   index_capacity entries of _ENTRY: (time_ns, data_offset, length, direction)
+    data    data_capacity bytes of raw chunks, back to back
+Once either the index or data region is full, the segment is truncated to the size used
+and recording continues in the next segment file: "<path>.0", "<path>.1", ...
+"""
+
+import asyncio
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from typing import (ByteString, Callable, Collection, Iterator, List, NamedTuple, Optional,
+                    TextIO)
+
+from .ringbuffer import _byte_view
+from .serialio import SerialIOProvider
+
+DIR_RECV: int = 0  # Chunk arrived from the serial port
+DIR_SEND: int = 1  # Chunk was written to the serial port
+
+_MAGIC: bytes = b'SHUBCAP\x00'
+_VERSION: int = 1
+# magic, version, entry size, index capacity, data capacity, start time (ns since epoch)
+_HEADER = struct.Struct('<8sHHIQQ')
+_COUNTS = struct.Struct('<QQ')  # Entries and data bytes used, following _HEADER
+_HEADER_SIZE: int = 64
+_ENTRY = struct.Struct('<QQIB3x')  # time_ns, data offset, length, direction
+
+
+class CaptureRecord(NamedTuple):
+    """One recorded chunk of serial traffic."""
+    time_ns: int  # Nanoseconds since the epoch
+    direction: int  # DIR_RECV or DIR_SEND
+    data: bytes
+
+
+def _segment_path(path: str, number: int) -> str:
+    return f'{path}.{number}'
+
+
+def capture_segments(path: str) -> List[str]:
+    """Existing segment files of a capture, oldest first."""
+    folder: str = os.path.dirname(path) or '.'
+    prefix: str = os.path.basename(path) + '.'
+    numbers: List[int] = []
+    for name in os.listdir(folder):
+        if name.startswith(prefix) and re.fullmatch(r'\d+', name[len(prefix):]):
+            numbers.append(int(name[len(prefix):]))
+    return [_segment_path(path, num) for num in sorted(numbers)]
+
+
+class SerialCaptureWriter():
+    """Appends chunks with a timestamp and direction to memory-mapped segment files.
+        Each append only packs an index entry and copies the data into the mapping,
+        leaving the OS to write pages back to disk. With max_segments > 0 the oldest
+        segments are deleted, bounding disk use to max_segments segment files (counting
+        those of earlier captures to the same path, which are pruned at startup).
+    """
+
+    def __init__(self, path: str, data_capacity: int = 2 ** 24,
+                 index_capacity: int = 2 ** 16, max_segments: int = 0):
+        if data_capacity <= 0 or index_capacity <= 0:
+            raise ValueError("data_capacity and index_capacity must be positive")
+        self._path: str = path
+        self._data_cap: int = data_capacity
+        self._index_cap: int = index_capacity
+        self._max_segments: int = max_segments
+        self._data_start: int = _HEADER_SIZE + _ENTRY.size * index_capacity
+        self._lock: threading.Lock = threading.Lock()  # Chunks may arrive from threads
+        self._number: int = 0
+        existing: List[str] = capture_segments(path)
+        if existing:  # Continue numbering after a prior capture to the same path
+            self._number = int(existing[-1].rsplit('.', 1)[1]) + 1
+        self._segments: List[str] = existing  # Oldest first, to prune beyond max_segments
+        self._file = None
+        self._map: Optional[mmap.mmap] = None
+        self._n_entries: int = 0
+        self._n_data: int = 0
+        # Timestamps are wall clock at segment start plus monotonic time since
+        self._t_wall: int = 0
+        self._t_mono: int = 0
+        self._open_segment()
+
+    @property
+    def path(self) -> str:
+        """Path of the current segment file."""
+        return self._segments[-1]
+
+    @property
+    def closed(self) -> bool:
+        """True once close() was called."""
+        return self._map is None
+
+    def _open_segment(self) -> None:
+        seg_path: str = _segment_path(self._path, self._number)
+        self._number += 1
+        self._file = open(seg_path, 'w+b')
+        self._file.truncate(self._data_start + self._data_cap)  # Sparse where supported
+        self._map = mmap.mmap(self._file.fileno(), self._data_start + self._data_cap)
+        self._t_wall = time.time_ns()
+        self._t_mono = time.monotonic_ns()
+        _HEADER.pack_into(self._map, 0, _MAGIC, _VERSION, _ENTRY.size,
+                          self._index_cap, self._data_cap, self._t_wall)
+        self._n_entries = 0
+        self._n_data = 0
+        _COUNTS.pack_into(self._map, _HEADER.size, 0, 0)
+        self._segments.append(seg_path)
+        while 0 < self._max_segments < len(self._segments):
+            os.remove(self._segments.pop(0))
+
+    def _close_segment(self) -> None:
+        """Unmap the current segment, then truncate its file to the space used."""
+        self._map.close()
+        self._map = None
+        self._file.truncate(self._data_start + self._n_data)
+        self._file.close()
+        self._file = None
+
+    def append(self, data: ByteString, direction: int = DIR_RECV) -> None:
+        """Record a chunk, split across segments if it does not fit in the current one."""
+        view: ByteString = data if isinstance(data, bytes) else _byte_view(data)
+        n_view: int = len(view)
+        with self._lock:
+            cmap: Optional[mmap.mmap] = self._map
+            if cmap is None:
+                raise ValueError("Capture closed")
+            t_ns: int = self._t_wall + time.monotonic_ns() - self._t_mono
+            n_data: int = self._n_data
+            if self._n_entries < self._index_cap and n_data + n_view <= self._data_cap:
+                pos: int = self._data_start + n_data
+                cmap[pos:pos + n_view] = view
+                self._add_entry(cmap, t_ns, n_view, direction)
+            else:
+                self._append_split(memoryview(view), t_ns, direction)
+
+    def _add_entry(self, cmap: mmap.mmap, t_ns: int, n_part: int, direction: int) -> None:
+        """Index n_part bytes just copied to the data region, then update the counts."""
+        _ENTRY.pack_into(cmap, _HEADER_SIZE + _ENTRY.size * self._n_entries,
+                         t_ns, self._n_data, n_part, direction)
+        self._n_entries += 1
+        self._n_data += n_part
+        _COUNTS.pack_into(cmap, _HEADER.size, self._n_entries, self._n_data)
+
+    def _append_split(self, view: memoryview, t_ns: int, direction: int) -> None:
+        """Record a chunk that does not fit, rotating segments as they fill."""
+        while True:
+            n_part: int = min(len(view), self._data_cap - self._n_data)
+            if self._n_entries >= self._index_cap or (n_part < len(view) and n_part <= 0):
+                self._close_segment()
+                self._open_segment()
+                continue
+            pos: int = self._data_start + self._n_data
+            self._map[pos:pos + n_part] = view[:n_part]
+            self._add_entry(self._map, t_ns, n_part, direction)
+            if n_part >= len(view):
+                return
+            view = view[n_part:]
+
+    def flush(self) -> None:
+        """Ask the OS to write the current segment back to disk now."""
+        with self._lock:
+            if self._map is not None:
+                self._map.flush()
+
+    def close(self) -> None:
+        """Finish the current segment, truncating it to the space used."""
+        with self._lock:
+            if self._map is not None:
+                self._close_segment()
+
+    def __enter__(self) -> 'SerialCaptureWriter':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class SerialCaptureReader():
+    """Reads CaptureRecords back from a capture file, or all segments of a capture.
+        Segments still being written are read as far as their header counts.
+    """
+
+    def __init__(self, path: str):
+        self._paths: List[str] = [path] if os.path.isfile(path) else capture_segments(path)
+        if not self._paths:
+            raise FileNotFoundError(f"No capture segments for {path}")
+
+    @property
+    def paths(self) -> List[str]:
+        """Segment files read, in order."""
+        return list(self._paths)
+
+    def __iter__(self) -> Iterator[CaptureRecord]:
+        for seg_path in self._paths:
+            yield from self._read_segment(seg_path)
+
+    @staticmethod
+    def _read_segment(seg_path: str) -> Iterator[CaptureRecord]:
+        with open(seg_path, 'rb') as fseg:
+            with mmap.mmap(fseg.fileno(), 0, access=mmap.ACCESS_READ) as cmap:
+                (magic, version, entry_size, index_cap, _,
+                 _) = _HEADER.unpack_from(cmap, 0)
+                if magic != _MAGIC or version != _VERSION or entry_size != _ENTRY.size:
+                    raise ValueError(f"Not a version {_VERSION} capture file: {seg_path}")
+                (n_entries, _) = _COUNTS.unpack_from(cmap, _HEADER.size)
+                data_start: int = _HEADER_SIZE + entry_size * index_cap
+                for i_entry in range(n_entries):
+                    (t_ns, off, length, direction) = _ENTRY.unpack_from(
+                        cmap, _HEADER_SIZE + entry_size * i_entry)
+                    pos: int = data_start + off
+                    yield CaptureRecord(t_ns, direction, cmap[pos:pos + length])
+
+
+class SerialCaptureProvider(SerialIOProvider):
+    """SerialIOProvider recording all traffic of another provider to a capture file,
+        to be placed between that provider and SerialIO. Options are as SerialCaptureWriter.
+    """
+
+    def __init__(self, provider: SerialIOProvider, path: str, **kwargs):
+        self._siop: SerialIOProvider = provider
+        self._capture: SerialCaptureWriter = SerialCaptureWriter(path, **kwargs)
+        self._cb_recv: Optional[Callable[[ByteString], None]] = None
+        self._append: Callable[[ByteString, int], None] = self._capture.append
+        provider.on_recv(self._recv_inner)
+
+    @property
+    def capture(self) -> SerialCaptureWriter:
+        """The capture being recorded to."""
+        return self._capture
+
+    @property
+    def provider(self) -> SerialIOProvider:
+        """The provider being recorded."""
+        return self._siop
+
+    def _recv_inner(self, buf: ByteString) -> None:
+        """Record data from the wrapped provider, then pass it along."""
+        self._append(buf, DIR_RECV)
+        if self._cb_recv is not None:
+            self._cb_recv(buf)
+
+    def on_recv(self, cb_recv: Optional[Callable[[ByteString], None]]) -> None:
+        self._cb_recv = cb_recv
+
+    def do_recv(self, buf: ByteString) -> None:
+        self._siop.do_recv(buf)
+
+    def is_closed(self) -> bool:
+        return self._siop.is_closed()
+
+    def write_bytes(self, buf: ByteString) -> None:
+        self._append(buf, DIR_SEND)
+        self._siop.write_bytes(buf)
+
+    def flush(self) -> None:
+        self._siop.flush()
+
+    def wait_recv(self, timeout: Optional[float]) -> bool:
+        return self._siop.wait_recv(timeout)
+
+    def recv_error(self) -> Optional[Exception]:
+        return self._siop.recv_error()
+
+    def out_waiting(self) -> int:
+        return self._siop.out_waiting()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        return self._siop.drain(timeout)
+
+    def reset_output(self) -> None:
+        self._siop.reset_output()
+
+    def add_sent_listener(self, listener: Callable[[], None]) -> bool:
+        return self._siop.add_sent_listener(listener)
+
+    def remove_sent_listener(self, listener: Callable[[], None]) -> None:
+        self._siop.remove_sent_listener(listener)
+
+    def close(self) -> None:
+        """Stop recording and finish the capture file (the wrapped provider stays open)."""
+        self._capture.close()
+
+
+class SerialIOReplayProvider(SerialIOProvider):
+    """SerialIOProvider feeding a recorded capture back through do_recv, streaming records
+        from the (memory-mapped) capture segments rather than loading them into memory.
+        With speed=1.0 records arrive with their original inter-chunk timing, other
+        positive speeds scale that timing (eg: 2.0 is twice as fast), while speed=0
+        replays as fast as possible. Records are delivered as blocking SerialIO reads
+        wait for them, by replay_due() or replay(), or by the play() coroutine.
+        Only directions in "directions" are replayed, and written data is discarded.
+    """
+
+    def __init__(self, path: str, speed: float = 1.0,
+                 directions: Collection[int] = (DIR_RECV,), dbglog: TextIO = None):
+        self._records: Iterator[CaptureRecord] = (
+            rec for rec in SerialCaptureReader(path) if rec.direction in directions)
+        self._next: Optional[CaptureRecord] = next(self._records, None)
+        self._speed: float = speed
+        self._t_first: int = 0 if self._next is None else self._next.time_ns
+        self._t_start: Optional[float] = None  # Monotonic time replay started
+        self._cb_recv: Optional[Callable[[ByteString], None]] = None
+        self._dbglog: TextIO = dbglog
+        self._closed = False
+        self.n_replayed: int = 0  # Count of records delivered
+
+    @property
+    def finished(self) -> bool:
+        """True once every record has been delivered."""
+        return self._next is None
+
+    def _due(self, rec: CaptureRecord) -> float:
+        """Monotonic time at which rec is to be delivered."""
+        if self._t_start is None:
+            self._t_start = time.monotonic()
+        if self._speed <= 0:
+            return self._t_start
+        return self._t_start + (rec.time_ns - self._t_first) / 1e9 / self._speed
+
+    def _deliver(self) -> None:
+        rec: CaptureRecord = self._next
+        self._next = next(self._records, None)
+        self.n_replayed += 1
+        self.do_recv(rec.data)
+
+    def replay_due(self) -> int:
+        """Deliver every record that is due by now, returning how many were."""
+        n_done: int = 0
+        while self._next is not None and self._due(self._next) <= time.monotonic():
+            self._deliver()
+            n_done += 1
+        return n_done
+
+    def replay(self, count: int = -1) -> int:
+        """Deliver up to count records (or all if negative) immediately, regardless of
+            timing. Returns how many were delivered.
+        """
+        n_done: int = 0
+        while self._next is not None and n_done != count:
+            self._deliver()
+            n_done += 1
+        return n_done
+
+    async def play(self) -> None:
+        """Deliver all records with their timing, letting other coroutines run meanwhile."""
+        while self._next is not None:
+            await asyncio.sleep(max(0.0, self._due(self._next) - time.monotonic()))
+            self.replay_due()
+
+    def on_recv(self, cb_recv: Optional[Callable[[ByteString], None]]) -> None:
+        """Set callback for replayed buffers of serial data."""
+        self._cb_recv = cb_recv
+
+    def do_recv(self, buf: ByteString) -> None:
+        """A buffer was replayed, handle it."""
+        if self._cb_recv:
+            self._cb_recv(buf)
+        elif self._dbglog:
+            self._dbglog.write(f'Replay-LOST: {len(buf)} {ascii(buf)}\n')
+
+    def write_bytes(self, buf: ByteString) -> None:
+        """Discard written data, since the replayed device can not respond."""
+        if self._dbglog:
+            self._dbglog.write(f'Replay-WRITE: {len(buf)} {ascii(buf)}\n')
+
+    def wait_recv(self, timeout: Optional[float]) -> bool:
+        """Sleep until the next record is due (or timeout passes), then deliver what is due.
+            Returns False once all records were delivered.
+        """
+        if self._next is None:
+            return False
+        t_wait: float = self._due(self._next) - time.monotonic()
+        if timeout is not None and t_wait > timeout:
+            time.sleep(max(0.0, timeout))
+            return True
+        if t_wait > 0:
+            time.sleep(t_wait)
+        self.replay_due()
+        return True
+
+    def is_closed(self) -> bool:
+        """Only closed by close(), as data delivered before the end may still be read."""
+        return self._closed
+
+    def close(self) -> None:
+        """Stop replaying."""
+        self._closed = True
+        self._next = None
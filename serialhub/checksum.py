@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""Validation of the checksum trailing each frame or record, in batches.
+
+Frames are checked by the C implementations of the standard library (binascii.crc_hqx
+for CRC-16/CCITT, zlib.crc32 for CRC-32, sum() for additive checksums). Fixed size
+records (eg: from SerialRecordDecoder) are checked all at once with NumPy, running
+a table-driven CRC over byte columns so each step processes every record.
+"""
+
+import binascii
+import zlib
+from typing import ByteString, Callable, Dict, Iterable, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency, only needed by check_records()
+    np = None
+
+from .ringbuffer import _byte_view
+
+# name: (checksum bytes, default byte order)
+ALGORITHMS: Dict[str, Tuple[int, str]] = {
+    'crc16-ccitt': (2, 'big'),  # CRC-16/CCITT-FALSE: poly 0x1021, init 0xFFFF
+    'crc16-xmodem': (2, 'big'),  # CRC-16/XMODEM: poly 0x1021, init 0
+    'crc32': (4, 'little'),  # As zlib, Ethernet etc.
+    'sum8': (1, 'big'),  # Sum of bytes modulo 256
+    'sum16': (2, 'big'),  # Sum of bytes modulo 65536
+}
+
+
+def _crc16_table() -> List[int]:
+    """CRC-16 (poly 0x1021, MSB first) of each byte value."""
+    table: List[int] = []
+    for byte in range(256):
+        crc: int = byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021 if crc & 0x8000 else crc << 1) & 0xFFFF
+        table.append(crc)
+    return table
+
+
+def _crc32_table() -> List[int]:
+    """CRC-32 (poly 0xEDB88320, LSB first) of each byte value."""
+    table: List[int] = []
+    for byte in range(256):
+        crc: int = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0xEDB88320 if crc & 1 else crc >> 1
+        table.append(crc)
+    return table
+
+
+_CRC16_TABLE: List[int] = _crc16_table()
+_CRC32_TABLE: List[int] = _crc32_table()
+
+
+class SerialChecksum():
+    """Checks (and appends) a checksum of algorithm (see ALGORITHMS) trailing each frame
+        or record, covering all bytes before it. check_batch() returns the payloads of
+        frames that pass, as views without copying, and check_records() a mask of the
+        fixed size records that pass. Both count frames in n_passed and n_rejected.
+    """
+
+    def __init__(self, algorithm: str = 'crc16-ccitt', byteorder: Optional[str] = None):
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f"algorithm must be one of {tuple(ALGORITHMS)}")
+        self.algorithm: str = algorithm
+        (self.size, default_order) = ALGORITHMS[algorithm]
+        self.byteorder: str = byteorder or default_order
+        if self.byteorder not in ('big', 'little'):
+            raise ValueError("byteorder must be 'big' or 'little'")
+        self.n_passed: int = 0
+        self.n_rejected: int = 0
+        self._compute: Callable[[ByteString], int] = {
+            'crc16-ccitt': lambda data: binascii.crc_hqx(data, 0xFFFF),
+            'crc16-xmodem': lambda data: binascii.crc_hqx(data, 0),
+            'crc32': zlib.crc32,
+            'sum8': lambda data: sum(data) & 0xFF,
+            'sum16': lambda data: sum(data) & 0xFFFF,
+        }[algorithm]
+        # A CRC over a frame including its checksum (in the CRC's own bit order) is this
+        # constant for every intact frame, sparing the checksum's extraction
+        self._residue: Optional[int] = {
+            ('crc16-ccitt', 'big'): 0, ('crc16-xmodem', 'big'): 0,
+            ('crc32', 'little'): 0x2144DF1C,
+        }.get((algorithm, self.byteorder))
+
+    def compute(self, data: ByteString) -> int:
+        """Checksum of data."""
+        return self._compute(data)
+
+    def append(self, payload: ByteString) -> bytes:
+        """payload followed by its checksum, for sending."""
+        data: bytes = _byte_view(payload).tobytes()
+        return data + self._compute(data).to_bytes(self.size, self.byteorder)
+
+    def check_batch(self, frames: Iterable[ByteString]) -> List[memoryview]:
+        """Payloads (views of frames without the checksum) of the frames that pass."""
+        compute = self._compute
+        (size, byteorder) = (self.size, self.byteorder)
+        (from_bytes, residue) = (int.from_bytes, self._residue)
+        passed: List[memoryview] = []
+        n_checked: int = 0
+        for frame in frames:
+            n_checked += 1
+            view: memoryview = _byte_view(frame)
+            n_body: int = len(view) - size
+            if n_body < 0:
+                continue
+            if residue is not None:
+                if compute(view) == residue:
+                    passed.append(view[:n_body])
+            elif compute(view[:n_body]) == from_bytes(view[n_body:], byteorder):
+                passed.append(view[:n_body])
+        self.n_passed += len(passed)
+        self.n_rejected += n_checked - len(passed)
+        return passed
+
+    def check(self, frame: ByteString) -> Optional[memoryview]:
+        """Payload of frame if it passes, else None."""
+        passed: List[memoryview] = self.check_batch((frame,))
+        return passed[0] if passed else None
+
+    def check_records(self, records: 'np.ndarray') -> 'np.ndarray':
+        """Boolean mask of the records passing, given as a structured array (eg: from
+            SerialRecordDecoder) or a 2D uint8 array of one record per row.
+        """
+        if np is None:
+            raise ImportError("numpy is required for check_records: pip install numpy")
+        if records.ndim == 2 and records.dtype == np.uint8:
+            rows = records
+        else:
+            rows = np.ascontiguousarray(records).view(np.uint8).reshape(len(records), -1)
+        n_body: int = rows.shape[1] - self.size
+        if n_body < 0:
+            raise ValueError("Records are shorter than the checksum")
+        stored = np.zeros(len(rows), dtype=np.uint32)
+        for i_byte in (range(n_body, rows.shape[1]) if self.byteorder == 'big'
+                       else range(rows.shape[1] - 1, n_body - 1, -1)):
+            stored = (stored << 8) | rows[:, i_byte]
+        body = rows[:, :n_body]
+        if self.algorithm.startswith('sum'):
+            computed = body.sum(axis=1, dtype=np.uint64) & ((1 << 8 * self.size) - 1)
+        elif self.algorithm == 'crc32':
+            table = np.array(_CRC32_TABLE, dtype=np.uint32)
+            computed = np.full(len(rows), 0xFFFFFFFF, dtype=np.uint32)
+            for i_byte in range(n_body):  # One table lookup per byte column
+                computed = table[(computed ^ body[:, i_byte]) & 0xFF] ^ (computed >> 8)
+            computed ^= np.uint32(0xFFFFFFFF)
+        else:
+            table = np.array(_CRC16_TABLE, dtype=np.uint32)
+            computed = np.full(len(rows), 0xFFFF if self.algorithm == 'crc16-ccitt' else 0,
+                               dtype=np.uint32)
+            for i_byte in range(n_body):
+                computed = ((computed << 8) & 0xFFFF) ^ \
+                    table[((computed >> 8) ^ body[:, i_byte]) & 0xFF]
+        mask = computed == stored
+        n_passed: int = int(np.count_nonzero(mask))
+        self.n_passed += n_passed
+        self.n_rejected += len(mask) - n_passed
+        return mask
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""Incremental multi-pattern matching of received data (prompts, errors, banners)."""
+
+import asyncio
+import re
+import threading
+from typing import (ByteString, Callable, Dict, Iterable, List, NamedTuple, Optional,
+                    Pattern, Tuple, Union)
+
+from .serialio import SerialIO
+
+_DEFAULT_MAX_MATCH: int = 256  # Kept small, as the tail kept is rescanned with each chunk
+
+# re flags expressible as scoped inline flags, so patterns keep them once combined
+_INLINE_FLAGS: Tuple[Tuple[int, str], ...] = (
+    (re.IGNORECASE, 'i'), (re.MULTILINE, 'm'), (re.DOTALL, 's'), (re.VERBOSE, 'x'),
+    (re.ASCII, 'a'), (re.LOCALE, 'L'))
+_GLOBAL_FLAGS: Pattern[str] = re.compile(r'\(\?([aiLmsux]+)\)')  # eg: (?i) leading a pattern
+# Group names, in (?P<name>...), (?P=name) and (?(name)...)
+_GROUP_NAME: Pattern[str] = re.compile(r'\(\?P<(\w+)>|\(\?P=(\w+)\)|\(\?\((\w+)\)')
+
+PatternSpec = Union[bytes, Pattern[bytes]]
+
+
+class ExpectMatch(NamedTuple):
+    """One pattern matched in the received stream."""
+    handle: int  # As returned by SerialExpect.add()
+    offset: int  # Stream offset of the match start (bytes fed before it)
+    data: bytes  # Bytes matched
+    groups: Tuple[Optional[bytes], ...]  # As match.groups() of the pattern alone
+
+
+def _split_flags(source: str) -> Tuple[str, str]:
+    """Global inline flags leading regex source (eg: 'i' of '(?i)error'), and the rest."""
+    flags: str = ''
+    found_at: Optional['re.Match'] = _GLOBAL_FLAGS.match(source)
+    while found_at is not None:
+        flags += found_at.group(1)
+        source = source[found_at.end():]
+        found_at = _GLOBAL_FLAGS.match(source)
+    return (flags, source)
+
+
+def _rename_groups(source: str, prefix: str, verbose: bool) -> str:
+    """regex source with prefix added to each group name (and reference to one), so
+        patterns using the same names can be combined. Escapes, character classes and
+        comments are left alone.
+    """
+    out: List[str] = []
+    (i_char, in_class) = (0, False)
+    while i_char < len(source):
+        char: str = source[i_char]
+        i_next: int = i_char + 1
+        if char == '\\':
+            i_next += 1
+        elif in_class:
+            in_class = char != ']'
+        elif char == '[':
+            in_class = True
+            i_next += source.startswith('^', i_next)
+            i_next += source.startswith(']', i_next)  # A leading ']' is literal
+        elif char == '#' and verbose:
+            i_end: int = source.find('\n', i_next)
+            i_next = len(source) if i_end < 0 else i_end
+        elif source.startswith('(?#', i_char):
+            i_next = source.find(')', i_char) + 1 or len(source)
+        else:
+            found_at: Optional['re.Match'] = _GROUP_NAME.match(source, i_char)
+            if found_at is not None:
+                name: str = found_at.group(found_at.lastindex)
+                i_next = found_at.end()
+                if not name.isdigit():  # (?(1)...) refers to a group by number
+                    out.append(source[i_char:found_at.start(found_at.lastindex)] + prefix +
+                               source[found_at.end(found_at.lastindex):i_next])
+                    i_char = i_next
+                    continue
+        out.append(source[i_char:i_next])
+        i_char = i_next
+    return ''.join(out)
+
+
+def _wake(waiter: asyncio.Future, match: ExpectMatch) -> None:
+    if not waiter.done():
+        waiter.set_result(match)
+
+
+class SerialExpect():
+    """Matches many byte strings or bytes regexes against received data at once, calling
+        back (in the thread delivering data) as each is found. Patterns are combined into
+        one regex alternation, so each chunk is scanned once, in C, whatever the number
+        of patterns. The alternation searched has no groups of its own (which would stop
+        re from skipping ahead by the possible first bytes), and the pattern matched is
+        identified by a second alternation of named groups, tried only where a match
+        starts. Only the unmatched tail of up to max_match - 1 bytes is kept for
+        matches straddling chunks, so matches longer than max_match may be missed.
+        Matches are reported as soon as received data completes them, without overlaps.
+        Patterns may use groups (named ones are renamed within the alternations, so
+        may repeat across patterns) and flags, but not numbered backreferences.
+        Attached to a SerialIO as a recv listener, or fed data directly by feed().
+    """
+
+    def __init__(self, sio: Optional[SerialIO] = None,
+                 max_match: int = _DEFAULT_MAX_MATCH):
+        self._sio: Optional[SerialIO] = sio
+        self.max_match: int = max_match
+        # handle: (regex source, callback, once, number of groups)
+        self._patterns: Dict[int, Tuple[str, Callable[[ExpectMatch], None], bool, int]] = {}
+        self._next_handle: int = 0
+        self._search: Optional[Pattern[bytes]] = None  # Alternation locating matches
+        self._named: Optional[Pattern[bytes]] = None  # Alternation identifying them
+        self._lock: threading.Lock = threading.Lock()
+        self._tail: bytes = b''  # Unmatched end of the data scanned so far
+        self._offset: int = 0  # Stream offset of _tail
+        self.n_matches: int = 0
+        if sio is not None:
+            sio.add_recv_listener(self.feed)
+
+    def add(self, pattern: PatternSpec, callback: Callable[[ExpectMatch], None],
+            regex: bool = False, once: bool = False) -> int:
+        """Call callback(ExpectMatch) for each match of pattern (only the first if once),
+            returning a handle for remove(). pattern is a literal unless regex, or compiled.
+            Raises re.error for a pattern that is invalid, or cannot be combined.
+        """
+        flags: str = ''
+        if isinstance(pattern, bytes) and not regex:
+            source: str = re.escape(pattern).decode('latin-1')
+        else:
+            compiled: Pattern[bytes] = re.compile(pattern)  # Report a bad pattern here
+            (flags, source) = _split_flags(compiled.pattern.decode('latin-1'))
+            flags += ''.join(c for (flag, c) in _INLINE_FLAGS
+                             if compiled.flags & flag and c not in flags)
+        with self._lock:
+            handle: int = self._next_handle
+            source = _rename_groups(source, f'_h{handle}_', 'x' in flags)
+            if 'x' in flags:  # Newline ends any trailing comment before the group does
+                source = f'(?{flags}:{source}\n)'
+            elif flags:  # Scoped, as global flags must lead the whole alternation
+                source = f'(?{flags}:{source})'
+            n_groups: int = re.compile(source.encode('latin-1')).groups
+            self._patterns[handle] = (source, callback, once, n_groups)
+            self._search = None
+            try:
+                # Compile the alternations now, not on feed(), which only ever drops
+                # patterns from a combination that compiled
+                self._compiled()
+            except re.error:
+                del self._patterns[handle]
+                self._search = None
+                raise
+            self._next_handle += 1
+        return handle
+
+    def remove(self, handle: int) -> None:
+        """Stop matching the pattern added as handle (if not already removed)."""
+        with self._lock:
+            if self._patterns.pop(handle, None) is not None:
+                self._search = None
+
+    def __len__(self) -> int:
+        """Number of patterns."""
+        return len(self._patterns)
+
+    def _compiled(self) -> Optional[Pattern[bytes]]:
+        """Search alternation of every pattern, None if there are none, compiling it
+            and the named alternation as needed (caller holds _lock).
+        """
+        if self._search is None and self._patterns:
+            sources: List[Tuple[int, str]] = [
+                (handle, source) for (handle, (source, _, _, _)) in self._patterns.items()]
+            self._search = re.compile(
+                '|'.join(f'(?:{source})' for (_, source) in sources).encode('latin-1'))
+            self._named = re.compile('|'.join(
+                f'(?P<_h{handle}>{source})' for (handle, source) in sources).encode('latin-1'))
+        return self._search
+
+    def feed(self, data: ByteString) -> None:
+        """Scan newly received data, calling back for the matches it completes."""
+        found: List[Tuple[Callable[[ExpectMatch], None], ExpectMatch]] = []
+        with self._lock:
+            window: bytes = self._tail + bytes(data)
+            regex: Optional[Pattern[bytes]] = self._compiled()
+            pos: int = 0
+            while regex is not None:
+                found_at: Optional['re.Match'] = regex.search(window, pos)
+                if found_at is None:
+                    break
+                # Same alternatives in the same order, so the same one matches here
+                match: 're.Match' = self._named.match(window, found_at.start())
+                handle: int = int(match.lastgroup[2:])
+                (_, callback, once, n_groups) = self._patterns[handle]
+                i_group: int = match.lastindex  # The pattern's own groups follow its group
+                found.append((callback, ExpectMatch(
+                    handle, self._offset + match.start(), match.group(),
+                    match.groups()[i_group:i_group + n_groups])))
+                if once:
+                    del self._patterns[handle]
+                    self._search = None
+                    regex = self._compiled()
+                pos = match.end() if match.end() > match.start() else match.end() + 1
+            i_keep: int = max(min(pos, len(window)), len(window) - self.max_match + 1)
+            self._tail = window[i_keep:]
+            self._offset += i_keep
+            self.n_matches += len(found)
+        for (callback, found_match) in found:  # Outside the lock, so callbacks may add()
+            callback(found_match)
+
+    async def expect(self, patterns: Iterable[PatternSpec], regex: bool = False,
+                     timeout: Optional[float] = None,
+                     loop: Optional[asyncio.AbstractEventLoop] = None) -> ExpectMatch:
+        """The first match of any of patterns in data received from now on, raising
+            asyncio.TimeoutError if none arrives within timeout seconds.
+        """
+        loop = loop or asyncio.get_running_loop()
+        thread: int = threading.get_ident()
+        waiter: asyncio.Future = loop.create_future()
+
+        def resolve(match: ExpectMatch) -> None:
+            if threading.get_ident() == thread:
+                _wake(waiter, match)
+            else:  # Provider delivered data from another thread
+                loop.call_soon_threadsafe(_wake, waiter, match)
+
+        handles: List[int] = [self.add(pattern, resolve, regex=regex, once=True)
+                              for pattern in patterns]
+        try:
+            return await asyncio.wait_for(waiter, timeout)
+        finally:
+            for handle in handles:
+                self.remove(handle)
+
+    def close(self) -> None:
+        """Stop receiving from the SerialIO."""
+        if self._sio is not None:
+            self._sio.remove_recv_listener(self.feed)
+            self._sio = None
@@ -0,0 +1,167 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""Multicast of one SerialIOProvider's received data to several independent SerialIOs."""
+
+from typing import Any, ByteString, Callable, List, Optional
+
+from .ringbuffer import (OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST, OVERFLOW_RAISE,
+                         SerialBufferOverflow, _byte_view)
+from .serialio import SerialIO, SerialIOProvider
+
+LAG_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST, OVERFLOW_RAISE)
+
+
+class _FanoutTap(SerialIOProvider):
+    """Per-subscriber provider, receiving from a SerialFanout and writing through to
+        the shared provider.
+    """
+
+    def __init__(self, fanout: 'SerialFanout', max_lag: int, lag_policy: str):
+        self._fanout: SerialFanout = fanout
+        self._cb_recv: Optional[Callable[[ByteString], None]] = None
+        self.sio: Optional[SerialIO] = None
+        self.max_lag: int = max_lag
+        self.lag_policy: str = lag_policy
+        self.dropped: int = 0  # Bytes discarded by the lag policy
+        self.detached: bool = False
+        self.overflowed: bool = False  # Lag policy 'raise' was triggered
+
+    def on_recv(self, cb_recv: Optional[Callable[[ByteString], None]]) -> None:
+        self._cb_recv = cb_recv
+
+    def do_recv(self, buf: ByteString) -> None:
+        """Deliver a (read-only, shared) chunk, applying the lag limit."""
+        sio: SerialIO = self.sio
+        if self.max_lag > 0:
+            n_over: int = sio.in_waiting + len(buf) - self.max_lag
+            if n_over > 0:
+                if self.lag_policy == OVERFLOW_DROP_NEWEST:
+                    self.dropped += len(buf)
+                    return
+                if self.lag_policy == OVERFLOW_RAISE:
+                    self.overflowed = True
+                    self._fanout.unsubscribe(sio)
+                    return
+                # OVERFLOW_DROP_OLDEST, without copying (or counting as read) the discards
+                n_drop: int = sio._skip(n_over)  # pylint: disable=protected-access
+                self.dropped += n_drop
+                if n_over > n_drop:  # Chunk alone exceeds max_lag, keep its tail
+                    buf = _byte_view(buf)[n_over - n_drop:]
+                    self.dropped += n_over - n_drop
+        if self._cb_recv is not None:
+            self._cb_recv(buf)
+
+    def is_closed(self) -> bool:
+        return self._fanout.provider.is_closed()
+
+    def write_bytes(self, buf: ByteString) -> None:
+        self._fanout.provider.write_bytes(buf)
+
+    def flush(self) -> None:
+        self._fanout.provider.flush()
+
+    def wait_recv(self, timeout: Optional[float]) -> bool:
+        """Service the shared provider, which delivers to every subscriber.
+            Returns False once unsubscribed, as nothing more will arrive.
+        """
+        if self.detached:
+            return False
+        return self._fanout.provider.wait_recv(timeout)
+
+    def recv_error(self) -> Optional[Exception]:
+        if self.overflowed:
+            return SerialBufferOverflow("Subscriber fell behind by more than max_lag bytes")
+        return None
+
+    def out_waiting(self) -> int:
+        return self._fanout.provider.out_waiting()
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        return self._fanout.provider.drain(timeout)
+
+    def reset_output(self) -> None:
+        self._fanout.provider.reset_output()
+
+    def add_sent_listener(self, listener: Callable[[], None]) -> bool:
+        return self._fanout.provider.add_sent_listener(listener)
+
+    def remove_sent_listener(self, listener: Callable[[], None]) -> None:
+        self._fanout.provider.remove_sent_listener(listener)
+
+
+class SerialFanout():
+    """Takes over the single on_recv callback of a provider, delivering each received
+        chunk to every subscribed SerialIO. Mutable chunks are copied once, then the
+        same read-only chunk is queued by each subscriber (SerialIO deque mode holds it
+        without copying), so each subscriber's reads are an independent cursor over
+        shared chunks. Writes by any subscriber go to the shared provider.
+        With max_lag > 0 a subscriber may hold at most that many unread bytes, beyond
+        which lag_policy either discards its oldest data, discards the new chunk, or
+        ('raise') unsubscribes it, so once it has read the data received before that,
+        its reads raise SerialBufferOverflow (whatever its timeout).
+    """
+
+    def __init__(self, provider: SerialIOProvider, max_lag: int = 0,
+                 lag_policy: str = OVERFLOW_DROP_OLDEST):
+        if lag_policy not in LAG_POLICIES:
+            raise ValueError(f"lag_policy must be one of {LAG_POLICIES}")
+        self._siop: SerialIOProvider = provider
+        self._taps: List[_FanoutTap] = []
+        self._max_lag: int = max_lag
+        self._lag_policy: str = lag_policy
+        provider.on_recv(self._recv)
+
+    @property
+    def provider(self) -> SerialIOProvider:
+        """The shared provider."""
+        return self._siop
+
+    def __len__(self) -> int:
+        """Number of subscribers."""
+        return len(self._taps)
+
+    def _recv(self, buf: ByteString) -> None:
+        view: memoryview = _byte_view(buf)
+        if not view.readonly:  # Provider may reuse a mutable buffer, so copy it once
+            buf = view.tobytes()
+        for tap in tuple(self._taps):  # A tap may unsubscribe itself
+            tap.do_recv(buf)
+
+    def subscribe(self, max_lag: Optional[int] = None, lag_policy: Optional[str] = None,
+                  **kwargs: Any) -> SerialIO:
+        """New SerialIO receiving everything arriving from now on, constructed with kwargs.
+            max_lag and lag_policy override the fanout's defaults for this subscriber.
+        """
+        if lag_policy is not None and lag_policy not in LAG_POLICIES:
+            raise ValueError(f"lag_policy must be one of {LAG_POLICIES}")
+        tap = _FanoutTap(self, self._max_lag if max_lag is None else max_lag,
+                         lag_policy or self._lag_policy)
+        tap.sio = SerialIO(tap, **kwargs)
+        self._taps.append(tap)
+        return tap.sio
+
+    def _tap(self, sio: SerialIO) -> _FanoutTap:
+        for tap in self._taps:
+            if tap.sio is sio:
+                return tap
+        raise ValueError("Not a subscriber")
+
+    def unsubscribe(self, sio: SerialIO) -> None:
+        """Stop delivering to sio, whose waiting data can still be read."""
+        tap: _FanoutTap = self._tap(sio)
+        tap.detached = True
+        self._taps.remove(tap)
+
+    def dropped(self, sio: SerialIO) -> int:
+        """Bytes a subscriber lost by exceeding its lag limit."""
+        return self._tap(sio).dropped
+
+    def close(self) -> None:
+        """Unsubscribe everyone and release the provider's callback."""
+        for tap in tuple(self._taps):
+            self.unsubscribe(tap.sio)
+        self._siop.on_recv(None)
@@ -0,0 +1,291 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""Incremental packet framing codecs (COBS, SLIP, length-prefixed), and a stage running
+    one between a SerialIOProvider and the application.
+
+Decoders search received data with bytes.find() (not byte at a time), and return frames
+as read-only memoryviews of the received (or, for frames spanning chunks, joined)
+data, so frames needing no unescaping are never copied.
+"""
+
+import struct
+import time
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import ByteString, Callable, Deque, Iterator, List, Optional
+
+from .checksum import SerialChecksum
+from .ringbuffer import _byte_view
+from .serialio import SerialIOProvider
+
+_DEFAULT_MAX_FRAME: int = 2 ** 16
+
+
+def _readonly_view(data: ByteString) -> memoryview:
+    """Read-only byte view of data, copying it only if it is mutable."""
+    view: memoryview = _byte_view(data)
+    return view if view.readonly else memoryview(view.tobytes())
+
+
+class SerialFramer(ABC):
+    """Base of incremental framing codecs. decode() may be given data split anywhere,
+        carrying partial frames over to the next call. Frames longer than max_frame
+        are discarded and counted in n_errors, bounding the data carried over.
+    """
+
+    def __init__(self, max_frame: int = _DEFAULT_MAX_FRAME):
+        self.max_frame: int = max_frame
+        self.n_frames: int = 0  # Frames decoded
+        self.n_errors: int = 0  # Malformed or oversize frames discarded
+        self._carry: bytes = b''
+
+    @abstractmethod
+    def encode(self, payload: ByteString) -> bytes:
+        """Frame payload for sending."""
+
+    @abstractmethod
+    def decode(self, data: ByteString) -> List[memoryview]:
+        """Frames completed by data, oldest first."""
+
+    def reset(self) -> None:
+        """Discard any partial frame carried over."""
+        self._carry = b''
+
+    def _joined(self, data: ByteString) -> memoryview:
+        """Read-only view of the carried over data followed by data."""
+        if self._carry:
+            joined: memoryview = memoryview(self._carry + _byte_view(data).tobytes())
+            self._carry = b''
+            return joined
+        return _readonly_view(data)
+
+
+class _DelimitedFramer(SerialFramer):
+    """Framer whose frames end with a delimiter byte, which never occurs within them.
+        Once an oversize partial frame is discarded, so is data up to the next delimiter.
+    """
+
+    _DELIM: bytes = b''
+
+    def __init__(self, max_frame: int = _DEFAULT_MAX_FRAME):
+        super().__init__(max_frame)
+        self._discarding: bool = False  # Skipping the rest of an oversize frame
+
+    @abstractmethod
+    def _unframe(self, buf: bytes, view: memoryview, start: int,
+                 end: int) -> Optional[memoryview]:
+        """Payload of the frame at buf[start:end] (view being a view of buf),
+            or None if it is malformed.
+        """
+
+    def reset(self) -> None:
+        super().reset()
+        self._discarding = False
+
+    def decode(self, data: ByteString) -> List[memoryview]:
+        view: memoryview = self._joined(data)
+        # Search the underlying bytes object where possible, else a copy (as memoryview
+        # has no find), while frames are slices of the view
+        buf: bytes = view.obj if isinstance(view.obj, bytes) \
+            and len(view.obj) == len(view) else view.tobytes()
+        frames: List[memoryview] = []
+        start: int = 0
+        while True:
+            end: int = buf.find(self._DELIM, start)
+            if end < 0:
+                break
+            if self._discarding:
+                self._discarding = False
+            elif end - start > self.max_frame:
+                self.n_errors += 1
+            elif end > start:  # Empty frames (eg: a leading delimiter) are ignored
+                payload: Optional[memoryview] = self._unframe(buf, view, start, end)
+                if payload is None:
+                    self.n_errors += 1
+                else:
+                    frames.append(payload)
+            start = end + 1
+        if self._discarding:
+            pass
+        elif len(buf) - start > self.max_frame:  # Delimiter lost, skip through the next one
+            self.n_errors += 1
+            self._discarding = True
+        else:
+            self._carry = buf[start:]
+        self.n_frames += len(frames)
+        return frames
+
+
+class SerialCOBSFramer(_DelimitedFramer):
+    """Consistent Overhead Byte Stuffing: frames hold no zero bytes, each ending with one.
+        Decoding walks the code bytes (one per 254 bytes or zero byte of payload), copying
+        whole blocks; a frame of a single block (no zeros) is returned without copying.
+    """
+
+    _DELIM: bytes = b'\x00'
+
+    def encode(self, payload: ByteString) -> bytes:
+        out: bytearray = bytearray()
+        blocks: List[bytes] = _byte_view(payload).tobytes().split(b'\x00')
+        for (i_block, block) in enumerate(blocks):
+            n_full: int = 0
+            while len(block) >= 0xFE:  # Full blocks, which imply no zero after them
+                out.append(0xFF)
+                out += block[:0xFE]
+                block = block[0xFE:]
+                n_full += 1
+            if block or not n_full or i_block < len(blocks) - 1:
+                out.append(len(block) + 1)
+                out += block
+        out.append(0)
+        return bytes(out)
+
+    def _unframe(self, buf: bytes, view: memoryview, start: int,
+                 end: int) -> Optional[memoryview]:
+        if buf[start] == end - start:  # Single block, nothing to restore
+            return view[start + 1:end]
+        out: bytearray = bytearray()
+        i_code: int = start
+        while i_code < end:
+            code: int = buf[i_code]
+            i_next: int = i_code + code
+            if i_next > end:
+                return None
+            out += buf[i_code + 1:i_next]
+            if code < 0xFF and i_next < end:
+                out.append(0)
+            i_code = i_next
+        return memoryview(bytes(out))
+
+
+class SerialSLIPFramer(_DelimitedFramer):
+    """RFC 1055 SLIP: frames end with END (0xC0), escaped within as ESC (0xDB) ESC_END,
+        and ESC as ESC ESC_ESC. Frames without ESC are returned without copying, others
+        are unescaped by two bytes.replace() calls.
+    """
+
+    _DELIM: bytes = b'\xc0'
+
+    def __init__(self, max_frame: int = _DEFAULT_MAX_FRAME, leading_end: bool = True):
+        super().__init__(max_frame)
+        self.leading_end: bool = leading_end  # Encode with an END before each frame too
+
+    def encode(self, payload: ByteString) -> bytes:
+        body: bytes = _byte_view(payload).tobytes().replace(b'\xdb', b'\xdb\xdd') \
+            .replace(b'\xc0', b'\xdb\xdc')
+        return (b'\xc0' + body if self.leading_end else body) + b'\xc0'
+
+    def _unframe(self, buf: bytes, view: memoryview, start: int,
+                 end: int) -> Optional[memoryview]:
+        if buf.find(b'\xdb', start, end) < 0:
+            return view[start:end]
+        raw: bytes = buf[start:end]
+        body: bytes = raw.replace(b'\xdb\xdc', b'\xc0').replace(b'\xdb\xdd', b'\xdb')
+        if len(raw) - len(body) != raw.count(b'\xdb'):  # An ESC not starting an escape
+            return None
+        return memoryview(body)
+
+
+class SerialLengthFramer(SerialFramer):
+    """Frames prefixed by their payload length, as a struct format (eg: '<H').
+        A length beyond max_frame means the stream is corrupt (there is no delimiter
+        to resynchronize upon), so all carried data is discarded and counted in n_errors.
+    """
+
+    def __init__(self, header: str = '<H', max_frame: int = _DEFAULT_MAX_FRAME):
+        super().__init__(max_frame)
+        self._header: struct.Struct = struct.Struct(header)
+
+    def encode(self, payload: ByteString) -> bytes:
+        view: memoryview = _byte_view(payload)
+        return self._header.pack(len(view)) + view.tobytes()
+
+    def decode(self, data: ByteString) -> List[memoryview]:
+        view: memoryview = self._joined(data)
+        n_head: int = self._header.size
+        frames: List[memoryview] = []
+        start: int = 0
+        while len(view) - start >= n_head:
+            (n_payload,) = self._header.unpack_from(view, start)
+            if n_payload > self.max_frame:
+                self.n_errors += 1
+                start = len(view)
+                break
+            end: int = start + n_head + n_payload
+            if end > len(view):
+                break
+            frames.append(view[start + n_head:end])
+            start = end
+        self._carry = bytes(view[start:])
+        self.n_frames += len(frames)
+        return frames
+
+
+class SerialFrameStream():
+    """Runs a SerialFramer between a provider and the application, taking over the
+        provider's single on_recv callback. Frames are decoded as chunks arrive, then
+        passed to the on_frame callback if set, else queued for read_frame() or iteration.
+        write_frame() encodes and writes through the provider.
+        With a SerialChecksum, each batch of decoded frames is checked, passing on only
+        the payloads (without checksum) that pass, and write_frame() appends checksums.
+    """
+
+    def __init__(self, provider: SerialIOProvider, framer: SerialFramer,
+                 on_frame: Optional[Callable[[memoryview], None]] = None,
+                 checksum: Optional[SerialChecksum] = None):
+        self._siop: SerialIOProvider = provider
+        self.framer: SerialFramer = framer
+        self.checksum: Optional[SerialChecksum] = checksum
+        self._on_frame: Optional[Callable[[memoryview], None]] = on_frame
+        self._frames: Deque[memoryview] = deque()
+        provider.on_recv(self._recv)
+
+    def _recv(self, data: ByteString) -> None:
+        frames: List[memoryview] = self.framer.decode(data)
+        if self.checksum is not None and frames:
+            frames = self.checksum.check_batch(frames)
+        if self._on_frame is not None:
+            for frame in frames:
+                self._on_frame(frame)
+        else:
+            self._frames.extend(frames)
+
+    def on_frame(self, callback: Optional[Callable[[memoryview], None]]) -> None:
+        """Deliver frames to callback as they are decoded (or queue them if None)."""
+        self._on_frame = callback
+
+    def __len__(self) -> int:
+        """Frames queued."""
+        return len(self._frames)
+
+    def read_frame(self, timeout: Optional[float] = 0) -> Optional[memoryview]:
+        """Oldest queued frame, waiting up to timeout seconds (None for indefinitely)
+            while the provider delivers data. None if no frame arrived in time.
+        """
+        t_end: Optional[float] = None if timeout is None else time.monotonic() + timeout
+        while not self._frames and timeout != 0:
+            t_wait: Optional[float] = None if t_end is None else t_end - time.monotonic()
+            if t_wait is not None and t_wait <= 0:
+                break
+            if not self._siop.wait_recv(t_wait):
+                break
+        return self._frames.popleft() if self._frames else None
+
+    def __iter__(self) -> Iterator[memoryview]:
+        """Frames queued, without waiting for more."""
+        while self._frames:
+            yield self._frames.popleft()
+
+    def write_frame(self, payload: ByteString) -> None:
+        """Encode payload as a frame and write it through the provider."""
+        if self.checksum is not None:
+            payload = self.checksum.append(payload)
+        self._siop.write_bytes(self.framer.encode(payload))
+
+    def close(self) -> None:
+        """Release the provider's callback."""
+        self._siop.on_recv(None)
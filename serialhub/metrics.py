@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""Cheap counters and histograms updated by SerialIO and SerialHubWidget while enabled.
+    Owners hold None instead of a metrics object while disabled, so the hot path only
+    costs an "is not None" check, similar to their _dbglog handling.
+"""
+
+import time
+from collections import defaultdict, deque
+from typing import Any, ByteString, DefaultDict, Deque, Dict, List, Optional, Sequence, Tuple
+
+
+class Log2Histogram():
+    """Counts of non-negative integers in power-of-two buckets, where bucket i counts
+        values of bit_length i (ie: 2**(i-1) <= value < 2**i, with bucket 0 for zero).
+    """
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.buckets: List[int] = [0] * 65
+        self.count: int = 0
+        self.total: int = 0
+        self.max: int = 0
+
+    def add(self, value: int) -> None:
+        """Count one value."""
+        self.buckets[value.bit_length()] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, fraction: float) -> int:
+        """Upper bound (exclusive) of the bucket holding that fraction of the values."""
+        rank: float = fraction * self.count
+        n_seen: int = 0
+        for i_bucket, n_bucket in enumerate(self.buckets):
+            n_seen += n_bucket
+            if n_bucket and n_seen >= rank:
+                return 1 << i_bucket
+        return 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Summary as plain (JSON friendly) values, with buckets keyed by upper bound."""
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p99': self.percentile(0.99),
+            'buckets': {1 << i: n for (i, n) in enumerate(self.buckets) if n},
+        }
+
+
+class SerialIOMetrics():
+    """Receive queue and read/write activity of a SerialIO.
+        Latency is from a received chunk being queued until its first byte is read,
+        tracked as (stream offset, time) per chunk until reads pass that offset.
+    """
+
+    def __init__(self):
+        self.recv_chunks: int = 0
+        self.recv_bytes: int = 0
+        self.chunk_sizes: Log2Histogram = Log2Histogram()
+        self.hwm_chunks: int = 0  # High-water mark of chunks waiting (deque mode)
+        self.hwm_bytes: int = 0  # High-water mark of bytes waiting
+        self.dropped_bytes: int = 0  # Discarded by an overflow (or fanout lag) policy
+        self.read_calls: int = 0
+        self.empty_reads: int = 0
+        self.read_bytes: int = 0
+        self.write_calls: int = 0
+        self.write_bytes: int = 0
+        self.latency_ns: Log2Histogram = Log2Histogram()
+        self._pending: Deque[Tuple[int, int]] = deque()  # (offset of first byte, time)
+
+    def on_recv(self, n_bytes: int, n_dropped: int, pos_start: Optional[int],
+                n_chunks: int, n_waiting: int, pos_floor: int) -> None:
+        """Chunk of n_bytes arrived, n_dropped bytes were discarded by overflow, and the
+            first byte kept is at stream offset pos_start (None if none were kept).
+            That left n_chunks and n_waiting bytes queued, the oldest at offset pos_floor.
+        """
+        self.recv_chunks += 1
+        self.recv_bytes += n_bytes
+        self.chunk_sizes.add(n_bytes)
+        self.dropped_bytes += n_dropped
+        pending = self._pending
+        while pending and pending[0][0] < pos_floor:  # Discarded without being read
+            pending.popleft()
+        if pos_start is not None:
+            pending.append((pos_start, time.monotonic_ns()))
+        if n_chunks > self.hwm_chunks:
+            self.hwm_chunks = n_chunks
+        if n_waiting > self.hwm_bytes:
+            self.hwm_bytes = n_waiting
+
+    def on_read(self, pos_read: int, n_bytes: int) -> None:
+        """A read consumed n_bytes, so the next byte to read is at stream offset pos_read."""
+        self.read_calls += 1
+        if n_bytes <= 0:
+            self.empty_reads += 1
+            return
+        self.read_bytes += n_bytes
+        pending = self._pending
+        if pending and pending[0][0] < pos_read:
+            t_now: int = time.monotonic_ns()
+            while pending and pending[0][0] < pos_read:
+                self.latency_ns.add(t_now - pending.popleft()[1])
+
+    def on_skip(self, pos_read: int, n_bytes: int) -> None:
+        """n_bytes were discarded unread, so the next byte to read is at pos_read."""
+        self.dropped_bytes += n_bytes
+        pending = self._pending
+        while pending and pending[0][0] < pos_read:
+            pending.popleft()
+
+    def on_write(self, n_bytes: int) -> None:
+        """A write of n_bytes was passed to the provider."""
+        self.write_calls += 1
+        self.write_bytes += n_bytes
+
+    def on_reset(self) -> None:
+        """All waiting data was discarded."""
+        self._pending.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current values as plain (JSON friendly) values."""
+        return {
+            'recv_chunks': self.recv_chunks,
+            'recv_bytes': self.recv_bytes,
+            'chunk_sizes': self.chunk_sizes.snapshot(),
+            'hwm_chunks': self.hwm_chunks,
+            'hwm_bytes': self.hwm_bytes,
+            'dropped_bytes': self.dropped_bytes,
+            'read_calls': self.read_calls,
+            'empty_reads': self.empty_reads,
+            'read_bytes': self.read_bytes,
+            'write_calls': self.write_calls,
+            'write_bytes': self.write_bytes,
+            'latency_ns': self.latency_ns.snapshot(),
+        }
+
+
+class WidgetMetrics():
+    """Comm message traffic and write flow of a SerialHubWidget."""
+
+    def __init__(self):
+        self.msgs_in: DefaultDict[str, int] = defaultdict(int)  # By message type
+        self.msgs_out: DefaultDict[str, int] = defaultdict(int)
+        self.recv_sizes: Log2Histogram = Log2Histogram()  # Per RECV buffer
+        self.handle_ns: Log2Histogram = Log2Histogram()  # Time handling each message
+        self.send_bytes: int = 0
+        self.write_calls: int = 0
+        self.write_held: int = 0  # Writes held back for coalescing
+        self.write_wait_ns: Log2Histogram = Log2Histogram()  # Waits for write_window
+        self.hwm_out_waiting: int = 0
+        self.stats_published: int = 0
+
+    def on_msg(self, msgtype: str, buffers: Optional[Sequence[ByteString]],
+               t_handle: int) -> None:
+        """Message from the frontend was handled, taking t_handle nanoseconds."""
+        self.msgs_in[msgtype] += 1
+        if buffers:
+            for buf in buffers:
+                self.recv_sizes.add(len(buf))
+        self.handle_ns.add(t_handle)
+
+    def on_send(self, msgtype: str, buffers: Optional[Sequence[ByteString]]) -> None:
+        """Message was sent to the frontend."""
+        self.msgs_out[msgtype] += 1
+        if buffers:
+            for buf in buffers:
+                self.send_bytes += len(buf)
+
+    def on_out_waiting(self, n_out_waiting: int) -> None:
+        """Bytes not yet acknowledged by the frontend grew to n_out_waiting."""
+        if n_out_waiting > self.hwm_out_waiting:
+            self.hwm_out_waiting = n_out_waiting
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current values as plain (JSON friendly) values."""
+        return {
+            'msgs_in': dict(self.msgs_in),
+            'msgs_out': dict(self.msgs_out),
+            'recv_sizes': self.recv_sizes.snapshot(),
+            'handle_ns': self.handle_ns.snapshot(),
+            'send_bytes': self.send_bytes,
+            'write_calls': self.write_calls,
+            'write_held': self.write_held,
+            'write_wait_ns': self.write_wait_ns.snapshot(),
+            'hwm_out_waiting': self.hwm_out_waiting,
+            'stats_published': self.stats_published,
+        }
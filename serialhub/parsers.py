@@ -0,0 +1,392 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""Batch parsers turning received serial data into NumPy arrays (needs numpy)."""
+
+import re
+import struct
+import warnings
+from typing import ByteString, Dict, List, Optional, Pattern, Sequence, Tuple, Union
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency, only needed once a parser is constructed
+    np = None
+
+from .checksum import SerialChecksum
+from .serialio import SerialIO
+
+Columns = Sequence[Tuple[str, str]]  # (name, numpy dtype) per column
+
+# struct format characters as numpy type codes (without byte order)
+_STRUCT_TYPES: Dict[str, str] = {
+    'c': 'S1', 'b': 'i1', 'B': 'u1', '?': '?', 'h': 'i2', 'H': 'u2', 'i': 'i4', 'I': 'u4',
+    'l': 'i4', 'L': 'u4', 'q': 'i8', 'Q': 'u8', 'e': 'f2', 'f': 'f4', 'd': 'f8',
+}
+
+# Whitespace (as bytes.split() separates by) to 0, anything else to 1
+_FIELD_TABLE: bytes = bytes(0 if i in b' \t\n\r\x0b\x0c' else 1 for i in range(256))
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError("numpy is required for serialhub parsers: pip install numpy")
+
+
+def struct_dtype(fmt: str, names: Optional[Sequence[str]] = None) -> 'np.dtype':
+    """Structured numpy dtype laid out as struct.Struct(fmt), with fields named names
+        (default f0, f1, ...). Pad bytes ('x') are skipped, and 's' fields are bytes.
+    """
+    _require_numpy()
+    order: str = fmt[0] if fmt and fmt[0] in '@=<>!' else '@'
+    fields: List[Tuple[str, str]] = []
+    for (count, code) in re.findall(r'(\d*)([a-zA-Z?])', fmt):
+        n_repeat: int = int(count) if count else 1
+        if code == 'x':
+            fields.append(('', f'V{n_repeat}'))
+        elif code == 's':
+            fields.append(('', f'S{n_repeat}'))
+        elif code in _STRUCT_TYPES:
+            fields.extend([('', _STRUCT_TYPES[code])] * n_repeat)
+        else:
+            raise ValueError(f"Unsupported struct format character {code!r}")
+    n_named: int = sum(1 for (_, code) in fields if not code.startswith('V'))
+    names = [f'f{i}' for i in range(n_named)] if names is None else list(names)
+    if len(names) != n_named:
+        raise ValueError(f"{n_named} names needed for {fmt!r}")
+    prefix: str = {'@': '=', '!': '>'}.get(order, order)
+    spec: List[Tuple[str, str]] = []
+    i_name: int = 0
+    for (i_field, (_, code)) in enumerate(fields):
+        if code.startswith('V'):
+            spec.append((f'_pad{i_field}', code))
+        else:
+            spec.append((names[i_name], prefix + code))
+            i_name += 1
+    dtype = np.dtype(spec, align=(order == '@'))
+    if dtype.itemsize != struct.calcsize(fmt):  # eg: trailing alignment of native formats
+        raise ValueError(f"Can not match the layout of {fmt!r}, use an explicit byte order")
+    return dtype
+
+
+class _ColumnStore():
+    """Preallocated column arrays growing by doubling, or with max_rows a rolling
+        window of the latest rows (compacted once the 2 * max_rows allocation fills).
+    """
+
+    def __init__(self, columns: Columns, max_rows: int, capacity: int = 1024):
+        self.names: List[str] = [name for (name, _) in columns]
+        cap: int = 2 * max_rows if max_rows > 0 else capacity
+        self._arrays: Dict[str, 'np.ndarray'] = {
+            name: np.empty(cap, dtype) for (name, dtype) in columns}
+        self._max_rows: int = max_rows
+        self._start: int = 0  # Rolling window begins here
+        self._stop: int = 0
+
+    def __len__(self) -> int:
+        return self._stop - self._start
+
+    def _make_room(self, n_rows: int) -> None:
+        cap: int = len(self._arrays[self.names[0]])
+        if self._stop + n_rows <= cap:
+            return
+        n_keep: int = len(self)
+        if self._max_rows > 0:  # Only the latest max_rows survive
+            n_keep = min(n_keep, max(0, self._max_rows - n_rows))
+            cap = max(cap, 2 * max(self._max_rows, n_rows))
+        else:
+            while n_keep + n_rows > cap:
+                cap *= 2
+        for name in self.names:
+            old = self._arrays[name]
+            new = old if len(old) == cap else np.empty(cap, old.dtype)
+            new[:n_keep] = old[self._stop - n_keep:self._stop]
+            self._arrays[name] = new
+        (self._start, self._stop) = (0, n_keep)
+
+    def append(self, values: Sequence['np.ndarray']) -> None:
+        """Append equal length arrays, one per column."""
+        n_rows: int = len(values[0])
+        if self._max_rows > 0 and n_rows > self._max_rows:
+            values = [vals[-self._max_rows:] for vals in values]
+            n_rows = self._max_rows
+        self._make_room(n_rows)
+        for (name, vals) in zip(self.names, values):
+            self._arrays[name][self._stop:self._stop + n_rows] = vals
+        self._stop += n_rows
+        if self._max_rows > 0 and len(self) > self._max_rows:
+            self._start = self._stop - self._max_rows
+
+    def views(self) -> Dict[str, 'np.ndarray']:
+        return {name: arr[self._start:self._stop] for (name, arr) in self._arrays.items()}
+
+    def clear(self) -> None:
+        (self._start, self._stop) = (0, 0)
+
+
+class SerialLineParser():
+    """Parses batches of complete text lines into growable NumPy column arrays, carrying
+        an incomplete trailing line over to the next batch. Lines are described by
+        columns, a sequence of (name, dtype), and either:
+            pattern, a regex with one group per column, applied to a whole batch with a
+                single findall() (lines without a match are skipped and counted in
+                n_bad); use (?m)^...$ anchors to reject partial matches of garbage
+            or delimiter (None for whitespace), where every line holds only numbers once
+                bytes in skip (eg: b'[]:' for "[count]: value" lines) become whitespace,
+                parsed by numpy in C for a whole batch at once (integers via float64,
+                so exact below 2**53) once every line is checked to hold as many
+                fields as columns, falling back to line by line for malformed lines
+        The delimiter form avoids per-line Python objects entirely, so is several
+        times faster than a pattern (whose findall() creates a tuple per line).
+        With max_rows > 0 only the latest max_rows rows are kept, eg: for a live plot.
+    """
+
+    def __init__(self, columns: Columns, pattern: Union[bytes, str, None] = None,
+                 delimiter: Optional[bytes] = None, skip: bytes = b'',
+                 max_rows: int = 0):
+        _require_numpy()
+        if not columns:
+            raise ValueError("At least one column is required")
+        self._columns: List[Tuple[str, str]] = list(columns)
+        self._pattern: Optional[Pattern[bytes]] = None
+        if pattern is not None:
+            if isinstance(pattern, str):
+                pattern = pattern.encode()
+            self._pattern = re.compile(pattern)
+            if self._pattern.groups != len(self._columns):
+                raise ValueError("pattern needs exactly one group per column")
+        sep: bytes = b' ' if delimiter is None else delimiter
+        if len(sep) != 1:
+            raise ValueError("delimiter must be a single byte")
+        self._sep: bytes = sep
+        # Skipped bytes and CR (of CRLF line endings) become whitespace, which numpy
+        # ignores around delimiters, then newlines become delimiters for a whole batch
+        self._line_table: bytes = bytes.maketrans(skip + b'\r', b' ' * (len(skip) + 1))
+        self._store = _ColumnStore(self._columns, max_rows)
+        self._tail: bytes = b''  # Incomplete line carried over
+        self.n_rows: int = 0  # Rows parsed in total (including any rolled away)
+        self.n_bad: int = 0  # Lines not matching the format
+
+    def __len__(self) -> int:
+        """Rows currently held."""
+        return len(self._store)
+
+    @property
+    def columns(self) -> Dict[str, 'np.ndarray']:
+        """Views of the rows held, per column name (valid until the next feed)."""
+        return self._store.views()
+
+    def __getitem__(self, name: str) -> 'np.ndarray':
+        return self._store.views()[name]
+
+    def clear(self) -> None:
+        """Discard the rows held (but not a carried over partial line)."""
+        self._store.clear()
+
+    def feed(self, data: ByteString) -> int:
+        """Parse the complete lines of (any carried over line and) data, returning the
+            number of rows added.
+        """
+        if not isinstance(data, bytes):
+            data = bytes(data)
+        if self._tail:
+            data = self._tail + data
+        i_end: int = data.rfind(b'\n')
+        if i_end < 0:
+            self._tail = data
+            return 0
+        batch: bytes = data[:i_end + 1]
+        self._tail = data[i_end + 1:]
+        values: List['np.ndarray'] = self._parse(batch)
+        n_rows: int = len(values[0])
+        if n_rows:
+            self._store.append(values)
+            self.n_rows += n_rows
+        return n_rows
+
+    def read_from(self, sio: SerialIO) -> int:
+        """Parse whatever is waiting in sio (without blocking), returning rows added."""
+        return self.feed(b''.join(sio.read_chunks()))  # One batch, for one numpy pass
+
+    def _parse(self, batch: bytes) -> List['np.ndarray']:
+        if self._pattern is not None:
+            return self._parse_regex(batch)
+        n_lines: int = batch.count(b'\n')
+        lines: bytes = batch.translate(self._line_table)
+        flat = None
+        if self._fields_match(lines):
+            text: str = lines.replace(b'\n', self._sep).decode('latin-1')
+            try:
+                with warnings.catch_warnings():  # Older numpy warns of malformed data
+                    warnings.simplefilter('ignore', DeprecationWarning)
+                    flat = np.fromstring(text, dtype=np.float64,
+                                         sep=self._sep.decode('latin-1'))
+            except ValueError:  # Newer numpy raises for malformed data
+                flat = None
+        if flat is None or len(flat) != n_lines * len(self._columns):
+            flat = self._parse_lines(batch, n_lines)
+        table = flat.reshape(-1, len(self._columns))
+        return [table[:, i].astype(dtype) for (i, (_, dtype)) in enumerate(self._columns)]
+
+    def _fields_match(self, lines: bytes) -> bool:
+        """Does every line (of a batch ending with a newline) hold one field per column?
+            Counted per line with numpy, as a total alone lets short and long lines
+            balance out, shifting values between rows.
+        """
+        arr = np.frombuffer(lines, dtype=np.uint8)
+        ends = np.flatnonzero(arr == ord('\n'))
+        if self._sep == b' ':  # Starts of whitespace separated fields
+            is_field = np.frombuffer(b'\0' + lines.translate(_FIELD_TABLE), dtype=np.uint8)
+            marks = np.flatnonzero(is_field[1:] > is_field[:-1])
+            n_want: int = len(self._columns)
+        else:  # Delimiters
+            marks = np.flatnonzero(arr == self._sep[0])
+            n_want = len(self._columns) - 1
+        if len(marks) != len(ends) * n_want:
+            return False
+        if n_want == 0:
+            return True
+        # Line k holds marks k * n_want onwards, so its last is before its end, and the
+        # next line's first after it
+        return bool(np.all(marks[n_want - 1::n_want] < ends)
+                    and np.all(marks[n_want::n_want] > ends[:-1]))
+
+    def _parse_lines(self, batch: bytes, n_lines: int) -> 'np.ndarray':
+        """Slow path for a batch with malformed lines, skipping them."""
+        n_cols: int = len(self._columns)
+        sep: Optional[bytes] = None if self._sep == b' ' else self._sep
+        values: List[float] = []
+        for line in batch.split(b'\n', n_lines)[:n_lines]:
+            fields: List[bytes] = line.translate(self._line_table).split(sep)
+            if len(fields) == n_cols:
+                try:
+                    values.extend([float(field) for field in fields])
+                    continue
+                except ValueError:
+                    pass
+            self.n_bad += 1
+        return np.array(values, dtype=np.float64)
+
+    def _parse_regex(self, batch: bytes) -> List['np.ndarray']:
+        """One findall() over the batch, converting each column with numpy."""
+        found: List = self._pattern.findall(batch)
+        self.n_bad += max(0, batch.count(b'\n') - len(found))
+        if not found:
+            return [np.empty(0, dtype) for (_, dtype) in self._columns]
+        fields = np.array(found, dtype=np.bytes_).reshape(len(found), len(self._columns))
+        values: List['np.ndarray'] = []
+        for (i, (_, dtype)) in enumerate(self._columns):
+            try:
+                values.append(fields[:, i].astype(dtype))
+            except ValueError:  # eg: a group matched text that is not a number
+                return self._parse_regex_rows(found)
+        return values
+
+    def _parse_regex_rows(self, found: List) -> List['np.ndarray']:
+        """Slow path converting matches one at a time, skipping unconvertible ones."""
+        rows: List[Tuple] = []
+        for match in found:
+            if not isinstance(match, tuple):
+                match = (match,)
+            try:
+                rows.append(tuple(np.array(field).astype(dtype)
+                                  for (field, (_, dtype)) in zip(match, self._columns)))
+            except ValueError:
+                self.n_bad += 1
+        return [np.array([row[i] for row in rows], dtype)
+                for (i, (_, dtype)) in enumerate(self._columns)]
+
+
+class SerialRecordDecoder():
+    """Decodes a stream of fixed size binary records (a numpy dtype, or a struct format
+        via struct_dtype) into a growable structured array, carrying partial records over
+        to the next batch. Runs of complete records are decoded by one np.frombuffer().
+        With a sync word (the first bytes of every record, eg: a magic number), the sync
+        of every record in a run is checked at once, and after corrupted bytes the stream
+        is searched for the next sync word, counting the bytes skipped.
+        With max_records > 0 only the latest max_records records are kept.
+        With a SerialChecksum, records failing it are dropped (counted by the checksum),
+        checking each run of records at once.
+    """
+
+    def __init__(self, dtype: Union['np.dtype', str], sync: bytes = b'',
+                 names: Optional[Sequence[str]] = None, max_records: int = 0,
+                 checksum: Optional[SerialChecksum] = None):
+        _require_numpy()
+        self.dtype = struct_dtype(dtype, names) if isinstance(dtype, str) else np.dtype(dtype)
+        self._size: int = self.dtype.itemsize
+        if len(sync) > self._size:
+            raise ValueError("sync word is longer than a record")
+        self._sync: bytes = sync
+        self._sync_row = np.frombuffer(sync, dtype=np.uint8)
+        self._store = _ColumnStore([('records', self.dtype)], max_records)
+        self._tail: bytes = b''  # Partial record (or bytes that may start a sync word)
+        self._synced: bool = not sync  # Is _tail known to begin at a record boundary
+        self._checksum: Optional[SerialChecksum] = checksum
+        self.n_records: int = 0  # Records decoded in total (including any rolled away)
+        self.skipped: int = 0  # Bytes discarded while searching for a sync word
+
+    def __len__(self) -> int:
+        """Records currently held."""
+        return len(self._store)
+
+    @property
+    def records(self) -> 'np.ndarray':
+        """View of the records held (valid until the next feed)."""
+        return self._store.views()['records']
+
+    def clear(self) -> None:
+        """Discard the records held (but not a carried over partial record)."""
+        self._store.clear()
+
+    def feed(self, data: ByteString) -> int:
+        """Decode the complete records of (any carried over bytes and) data, returning
+            the number of records added.
+        """
+        buf: bytes = self._tail + bytes(data) if self._tail else bytes(data)
+        size: int = self._size
+        off: int = 0
+        n_added: int = 0
+        while True:
+            if not self._synced:
+                i_sync: int = buf.find(self._sync, off)
+                if i_sync < 0:  # Keep what could be the start of a sync word
+                    i_keep: int = max(off, len(buf) - len(self._sync) + 1)
+                    self.skipped += i_keep - off
+                    off = i_keep
+                    break
+                self.skipped += i_sync - off
+                off = i_sync
+                self._synced = True
+            n_run: int = (len(buf) - off) // size
+            if n_run <= 0:
+                break
+            run = np.frombuffer(buf, dtype=self.dtype, count=n_run, offset=off)
+            if self._sync:  # Records up to the first one lacking the sync word
+                heads = np.frombuffer(buf, dtype=np.uint8, count=n_run * size, offset=off)
+                bad = np.flatnonzero(
+                    (heads.reshape(n_run, size)[:, :len(self._sync)] != self._sync_row)
+                    .any(axis=1))
+                if len(bad):
+                    run = run[:bad[0]]
+                    self._synced = False
+            off += len(run) * size
+            if len(run) and self._checksum is not None:
+                run = run[self._checksum.check_records(run)]
+            if len(run):
+                self._store.append([run])
+                n_added += len(run)
+            if self._synced:
+                break
+            self.skipped += 1  # The corrupt record's first byte, then search onwards
+            off += 1
+        self._tail = buf[off:]
+        self.n_records += n_added
+        return n_added
+
+    def read_from(self, sio: SerialIO) -> int:
+        """Decode whatever is waiting in sio (without blocking), returning records added."""
+        return self.feed(b''.join(sio.read_chunks()))  # One batch, for one numpy pass
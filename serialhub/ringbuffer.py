@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""Preallocated byte ring buffer, usable as a bounded SerialIO receive queue."""
+
+from typing import ByteString, List
+
+# Overflow policies for SerialRingBuffer.write() when data does not fit
+OVERFLOW_DROP_OLDEST: str = 'drop_oldest'
+OVERFLOW_DROP_NEWEST: str = 'drop_newest'
+OVERFLOW_RAISE: str = 'raise'
+OVERFLOW_POLICIES = (OVERFLOW_DROP_OLDEST, OVERFLOW_DROP_NEWEST, OVERFLOW_RAISE)
+
+
+class SerialBufferOverflow(OSError):
+    """Received data did not fit in a ring buffer using the 'raise' policy."""
+
+
+def _byte_view(buf: ByteString) -> memoryview:
+    """Flat unsigned-byte memoryview of any buffer object (no copy)."""
+    view = memoryview(buf)
+    if view.format != 'B' or view.ndim != 1:
+        view = view.cast('B')
+    return view
+
+
+class SerialRingBuffer():
+    """Fixed capacity contiguous byte FIFO with O(1) length and selectable overflow policy.
+        Storage is allocated once, so memory stays bounded regardless of input rate.
+    """
+
+    def __init__(self, capacity: int, overflow: str = OVERFLOW_DROP_OLDEST):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"overflow must be one of {OVERFLOW_POLICIES}")
+        self._buf: bytearray = bytearray(capacity)
+        self._cap: int = capacity
+        self._head: int = 0  # Index of oldest stored byte
+        self._size: int = 0  # Number of stored bytes
+        self._overflow: str = overflow
+        self.dropped: int = 0  # Total bytes discarded by the overflow policy
+        self.removed: int = 0  # Total bytes ever removed from the front (read or discarded)
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of bytes that can be stored."""
+        return self._cap
+
+    @property
+    def overflow(self) -> str:
+        """Overflow policy applied by write()."""
+        return self._overflow
+
+    @property
+    def free(self) -> int:
+        """Number of bytes that can be written without overflow."""
+        return self._cap - self._size
+
+    def __len__(self) -> int:
+        return self._size
+
+    def write(self, data: ByteString) -> int:
+        """Append data, applying the overflow policy if it does not fit.
+            Returns the number of incoming bytes actually stored.
+        """
+        view = _byte_view(data)
+        n_data: int = len(view)
+        n_free: int = self._cap - self._size
+        if n_data > n_free:
+            if self._overflow == OVERFLOW_RAISE:
+                raise SerialBufferOverflow(
+                    f"Ring buffer overflow: {n_data} bytes arrived, {n_free} free")
+            if self._overflow == OVERFLOW_DROP_NEWEST:
+                self.dropped += n_data - n_free
+                view = view[:n_free]
+                n_data = n_free
+            elif n_data >= self._cap:  # OVERFLOW_DROP_OLDEST, data alone fills buffer
+                self.dropped += self._size + n_data - self._cap
+                view = view[n_data - self._cap:]
+                n_data = self._cap
+                self.skip(self._size)
+            else:  # OVERFLOW_DROP_OLDEST, discard just enough of the oldest bytes
+                self.skip(n_data - n_free)
+                self.dropped += n_data - n_free
+        if n_data <= 0:
+            return 0
+        tail: int = (self._head + self._size) % self._cap
+        n_first: int = min(n_data, self._cap - tail)
+        self._buf[tail:tail + n_first] = view[:n_first]
+        if n_first < n_data:  # Wrap around to the start of storage
+            self._buf[:n_data - n_first] = view[n_first:]
+        self._size += n_data
+        return n_data
+
+    def readinto(self, ba_into: ByteString) -> int:
+        """Move up to len(ba_into) of the oldest bytes into ba_into, returning count."""
+        view = _byte_view(ba_into)
+        n_read: int = min(len(view), self._size)
+        if n_read <= 0:
+            return 0
+        head: int = self._head
+        n_first: int = min(n_read, self._cap - head)
+        view[:n_first] = self._buf[head:head + n_first]
+        if n_first < n_read:
+            view[n_first:n_read] = self._buf[:n_read - n_first]
+        self.skip(n_read)
+        return n_read
+
+    def segments(self) -> List[memoryview]:
+        """Views (at most two) of stored data in order, valid until next write/read."""
+        if self._size <= 0:
+            return []
+        mv_buf = memoryview(self._buf)
+        end: int = self._head + self._size
+        if end <= self._cap:
+            return [mv_buf[self._head:end]]
+        return [mv_buf[self._head:], mv_buf[:end - self._cap]]
+
+    def skip(self, n_skip: int) -> int:
+        """Discard up to n_skip of the oldest bytes, returning count discarded."""
+        n_skip = min(n_skip, self._size)
+        self._size -= n_skip
+        self.removed += n_skip
+        self._head = 0 if self._size == 0 else (self._head + n_skip) % self._cap
+        return n_skip
+
+    def find(self, sep: bytes, start: int = 0, end: int = -1) -> int:
+        """Offset (relative to oldest byte) of the first sep wholly within [start:end], or -1."""
+        n_sep: int = len(sep)
+        if end < 0 or end > self._size:
+            end = self._size
+        if n_sep <= 0 or end - start < n_sep:
+            return -1
+        head: int = self._head
+        n_first: int = self._cap - head  # Stored bytes before the wrap point
+        if start < n_first:  # Search the part before the wrap point
+            idx: int = self._buf.find(sep, head + start, head + min(end, n_first))
+            if idx >= 0:
+                return idx - head
+            if end <= n_first:
+                return -1
+            # A sep straddling the wrap point needs a small joined window
+            w_lo: int = max(start, n_first - n_sep + 1)
+            window: bytes = (bytes(self._buf[head + w_lo:])
+                             + bytes(self._buf[:min(n_sep - 1, end - n_first)]))
+            idx = window.find(sep)
+            if idx >= 0:
+                return w_lo + idx
+            start = n_first
+        idx = self._buf.find(sep, start - n_first, end - n_first)
+        return -1 if idx < 0 else idx + n_first
+
+    def clear(self) -> None:
+        """Discard all stored bytes."""
+        self.skip(self._size)
+        self._head = 0
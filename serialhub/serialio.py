@@ -7,10 +7,42 @@
 """Wrapper class to make serialhub.SerialHubPort access similar to regular IO."""
 
 import io
+import re
+import sys
+import time
 from collections import deque
-from typing import ByteString, Optional, NoReturn, Callable, TextIO, Deque
+from typing import (ByteString, Optional, NoReturn, Callable, TextIO, Deque, List, Tuple,
+                    Dict, Pattern, Any)
 from abc import abstractmethod  # ABCMeta
 
+from .ringbuffer import SerialRingBuffer, OVERFLOW_DROP_OLDEST, _byte_view
+from .metrics import SerialIOMetrics
+from .trace import (SerialTrace, EV_OPEN, EV_RECV, EV_READ, EV_DISC, EV_WRITE, EV_LOST,
+                    EV_RESET_IN, EV_RESET_OUT)
+
+_SEP_PATTERNS: Dict[bytes, Pattern[bytes]] = {}  # Cache for _sep_pattern()
+
+
+def _sep_pattern(sep: bytes) -> Pattern[bytes]:
+    """Compiled regex matching literal sep, since re can search memoryviews (bytes.find
+        can not) without first copying them.
+    """
+    pat: Optional[Pattern[bytes]] = _SEP_PATTERNS.get(sep)
+    if pat is None:
+        pat = re.compile(re.escape(sep))
+        if len(_SEP_PATTERNS) < 64:  # Only a handful of separators are used in practice
+            _SEP_PATTERNS[sep] = pat
+    return pat
+
+
+def _readonly(view: memoryview) -> memoryview:
+    """Read-only version of view (where supported by Python 3.8+), without copying."""
+    return view.toreadonly() if hasattr(view, 'toreadonly') else view
+
+
+class SerialWriteTimeout(OSError):
+    """Written data could not be accepted within the provider's write timeout."""
+
 
 class SerialIOProvider():
     """Base class defining an "interface" providing serial data to SerialIO."""
@@ -31,16 +63,96 @@ class SerialIOProvider():
     def write_bytes(self, buf: ByteString) -> None:
         """Send data to serial port."""
 
+    def flush(self) -> None:
+        """Send any data that write_bytes held back (Does nothing by default)."""
+
+    def wait_recv(self, timeout: Optional[float]) -> bool:
+        """Wait up to timeout seconds (None for indefinitely) while servicing whatever
+            delivers data to do_recv. Returns False if no more data can arrive by waiting,
+            which is the default for providers that only deliver data synchronously.
+        """
+        return False
+
+    def recv_error(self) -> Optional[Exception]:
+        """Error that ended reception, which SerialIO raises from reads once the data
+            received before it is consumed (None by default).
+        """
+        return None
+
+    def out_waiting(self) -> int:
+        """Bytes written but not yet confirmed as sent (Always zero by default)."""
+        return 0
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """Send any held back data, then wait up to timeout seconds until out_waiting()
+            is zero. Returns True if it is, which is immediate by default.
+        """
+        self.flush()
+        return self.out_waiting() == 0
+
+    def reset_output(self) -> None:
+        """Discard written data that is not yet sent, or stop waiting upon it."""
+
+    def add_sent_listener(self, listener: Callable[[], None]) -> bool:
+        """Call listener() whenever out_waiting() decreases, if the provider can tell.
+            Returns False (as by default) if it never will, so callers must poll instead.
+        """
+        return False
+
+    def remove_sent_listener(self, listener: Callable[[], None]) -> None:
+        """Stop calling a listener added by add_sent_listener."""
+
 
 #typing.BinaryIO(typing.IO[bytes])
 class SerialIO(io.RawIOBase):
-    """Serial IO to be proxied to frontend browser Web Serial API"""
-
-    def __init__(self, provider: SerialIOProvider, dbglog: TextIO = None):
+    """Serial IO to be proxied to frontend browser Web Serial API
+        Received data is queued as a deque of memoryviews of the received buffers (read-only
+        buffers are held without copying, mutable ones are copied once), unless ring_capacity is given
+        to use a preallocated SerialRingBuffer of that many bytes instead, which
+        bounds memory and discards or rejects data according to ring_overflow.
+        With gather=True each readinto()/read() drains as many queued buffers as fit,
+        otherwise a read stops at the end of the first buffer that supplied data.
+        Line oriented reads (readline, readuntil, readlines, iteration) always gather.
+        Like pyserial, timeout=None blocks reads until satisfied, timeout=0 (the default)
+        never blocks, and a positive timeout limits the wait to that many seconds, while
+        inter_byte_timeout ends a read early once data stops arriving for that long.
+        Blocking reads call SerialIOProvider.wait_recv() so data can keep arriving.
+        With metrics=True (or after enable_metrics()) stats() reports counters and
+        histograms of receive queue and read/write activity.
+        Unlike dbglog (which formats and flushes every message), a trace only records
+        compact events into a SerialTrace ring, cheap enough to leave on at full rate.
+    """
+
+    def __init__(self, provider: SerialIOProvider, dbglog: TextIO = None,
+                 ring_capacity: int = 0, ring_overflow: str = OVERFLOW_DROP_OLDEST,
+                 gather: bool = False, timeout: Optional[float] = 0,
+                 inter_byte_timeout: Optional[float] = None, metrics: bool = False,
+                 trace: Optional[SerialTrace] = None):
         super().__init__()  # Perhaps not necessary for RawIOBase?
         self._siop: SerialIOProvider = provider
-        self._qread: Deque[io.BytesIO] = deque()
+        self._qread: Deque[memoryview] = deque()
+        self._head_off: int = 0  # Bytes of _qread[0] already read
+        self._gather: bool = gather
+        self.timeout: Optional[float] = timeout
+        self.inter_byte_timeout: Optional[float] = inter_byte_timeout
+        self._ring: Optional[SerialRingBuffer] = None
+        if ring_capacity > 0:
+            self._ring = SerialRingBuffer(ring_capacity, ring_overflow)
+        # Single writer counters, in_waiting being their difference (deque mode)
+        self._pos_recv: int = 0  # Total bytes ever queued, only updated by cb_recv
+        self._pos_read: int = 0  # Stream offset of next byte to read, only updated by reads
+        self._nchunks_gone: int = 0  # Count of chunks ever removed from the deque
+        # Memory of an unsuccessful separator scan: (sep, offset, chunk number, chunk offset)
+        self._scan: Optional[Tuple[bytes, int, int, int]] = None
+        self._listeners: List[Callable[[ByteString], None]] = []
         self._dbglog: Optional[TextIO] = dbglog
+        self._metrics: Optional[SerialIOMetrics] = None  # Only while enabled
+        self._metrics_data: Optional[SerialIOMetrics] = None  # Kept while paused
+        if metrics:
+            self.enable_metrics()
+        self._trace: Optional[SerialTrace] = trace
+        if trace is not None:
+            trace.record(EV_OPEN, id(self))
         self._dbg(f'Constructing {ascii(self)}\n')
 
         # Wrap callback method in a callback function...
@@ -56,11 +168,47 @@ class SerialIO(io.RawIOBase):
             self._dbglog.flush()
 
     def cb_recv(self, data: ByteString) -> None:
-        """Append received data to our deque as BytesIO."""
-        bio_data = io.BytesIO(data)
-        self._qread.append(bio_data)
-        if self._dbglog is not None:  # Avoid creating message unless needed
-            self._dbg(f'  +RECV: {len(data)} {ascii(data)} 0x{id(bio_data):X}\n')
+        """Append received data to our deque (or copy into the ring buffer)."""
+        metrics: Optional[SerialIOMetrics] = self._metrics
+        if self._ring is not None:
+            ring: SerialRingBuffer = self._ring
+            n_dropped: int = ring.dropped
+            n_stored: int = ring.write(data)
+            if self._dbglog is not None:  # Avoid creating message unless needed
+                self._dbg(f'  +RING: {len(data)} {n_stored} {ascii(data)}\n')
+            if self._trace is not None:
+                self._trace.record(EV_RECV, id(self), len(data),
+                                   ring.removed + len(ring) - n_stored, n_stored)
+            if metrics is not None:
+                metrics.on_recv(len(data), ring.dropped - n_dropped,
+                                ring.removed + len(ring) - n_stored if n_stored else None,
+                                0, len(ring), ring.removed)
+        else:
+            chunk: memoryview = _byte_view(data)
+            if not chunk.readonly:  # Sender may reuse a mutable buffer, so keep a copy
+                chunk = memoryview(chunk.tobytes())
+            if len(chunk) > 0:
+                self._qread.append(chunk)
+                self._pos_recv += len(chunk)
+            if self._dbglog is not None:  # Avoid creating message unless needed
+                self._dbg(f'  +RECV: {len(data)} {ascii(data)} 0x{id(chunk):X}\n')
+            if self._trace is not None:
+                self._trace.record(EV_RECV, id(self), len(data),
+                                   self._pos_recv - len(chunk), len(chunk))
+            if metrics is not None:
+                metrics.on_recv(len(chunk), 0, self._pos_recv - len(chunk) if chunk else None,
+                                len(self._qread), self._pos_recv - self._pos_read,
+                                self._pos_read)
+        for listener in self._listeners:
+            listener(data)
+
+    def add_recv_listener(self, listener: Callable[[ByteString], None]) -> None:
+        """Call listener(data) after each received buffer has been queued for reading."""
+        self._listeners.append(listener)
+
+    def remove_recv_listener(self, listener: Callable[[ByteString], None]) -> None:
+        """Stop calling a listener added by add_recv_listener."""
+        self._listeners.remove(listener)
 
     def closed(self) -> bool:
         """Rely on the widget/provider to report closed status."""
@@ -73,63 +221,281 @@ class SerialIO(io.RawIOBase):
         if len(data) <= 0:
             return None
         self._siop.write_bytes(data)
+        if self._metrics is not None:
+            self._metrics.on_write(len(data))
+        if self._trace is not None:
+            self._trace.record(EV_WRITE, id(self), len(data))
         return len(data)  # Assume all data gets written
 
+    def flush(self) -> None:
+        """Have the SerialIOProvider send any data it held back, and wait until all
+            written data is confirmed as sent (or the provider's write timeout passes).
+        """
+        self._siop.drain()
+
+    def close(self) -> None:
+        """Have the SerialIOProvider send any data it held back, without waiting for it
+            to drain, since IOBase also calls close() during garbage collection.
+            The provider itself stays open, so closed() is unaffected.
+        """
+        self._siop.flush()
+
     def readinto(self, ba_into: bytearray) -> Optional[int]:
         if self.closed():
             raise ValueError("Stream closed")
         if len(ba_into) <= 0:
             return None
-        # Examine deque from left, looking for first readable stream
-        while len(self._qread) > 0:  # While deque MIGHT have more data avail
-            n_written: Optional[int] = self._qread[0].readinto(ba_into)
-            if n_written is not None and n_written > 0:  # If something written...
-                if self._dbglog is not None:  # Avoid details of message unless needed
-                    # View of the written portion
-                    ba_part: bytearray = ba_into[:n_written]
-                    # Take note of current offset
-                    ba_off: int = self._qread[0].tell()
-                    self._dbg(
-                        f'  =RDIN: {n_written} {len(ba_into)} {ba_off} {repr(ba_part)}\n')
-                return n_written  # Return first successful chunk, even more might be available
-            # Unsuccessful nested readint(), discard the depleated BytesIO stream
-            disc_bio: io.BytesIO = self._qread.popleft()  # Discard zeroth/left-most element
+        n_read: int
+        if self.timeout != 0:  # Blocking read waits to fill all of ba_into, then gathers
+            n_want: int = len(ba_into)
+            if self._ring is not None:
+                n_want = min(n_want, self._ring.capacity)
+            self._wait(lambda: self.in_waiting >= n_want)
+            n_read = self._readinto_gather(ba_into)
+        elif self._ring is not None:
+            n_read = self._readinto_ring(ba_into)
             if self._dbglog is not None:  # Avoid details of message unless needed
-                disc_byt: bytes = disc_bio.getvalue()
-                disc_off: int = disc_bio.tell()
-                self._dbg(
-                    f'  -DISC: {len(disc_byt)} {disc_off} {repr(disc_byt)} 0x{id(disc_bio):X}\n')
-            disc_bio.close()  # Hopefully this releases referenced bytes as if detach()
-            del disc_bio  # Promote opportunity for GC to free buffers ASAP???
-        # Empty, return 0/None as though non-blocking (rather than zero length)???
-        return 0
+                self._dbg(f'  =RING: {n_read} {len(ba_into)} {len(self._ring)}\n')
+        elif self._gather:
+            n_read = self._readinto_gather(ba_into)
+        else:
+            # Read from the first chunk only, even if more might be available
+            # Empty, return 0/None as though non-blocking (rather than zero length)???
+            n_read = self._readinto_chunks(ba_into, True)
+        if n_read == 0:
+            self._check_recv_error()
+        return n_read
+
+    def _check_recv_error(self) -> None:
+        """A read found nothing waiting, so raise the provider's recv_error() if any."""
+        if self.in_waiting == 0:
+            exc: Optional[Exception] = self._siop.recv_error()
+            if exc is not None:
+                raise exc
+
+    def _wait(self, is_ready: Callable[[], bool]) -> bool:
+        """Let the provider deliver data until is_ready() or a timeout expires, first
+            sending any writes it holds back (eg: a command awaiting its response).
+            Returns the final is_ready() result.
+        """
+        if is_ready():
+            return True
+        if self.timeout == 0:
+            return False
+        self._siop.flush()  # Held back writes may have no chance to go while waiting
+        t_now: float = time.monotonic()
+        t_end: Optional[float] = None if self.timeout is None else t_now + self.timeout
+        t_byte: float = t_now  # Time of most recent arrival
+        n_last: int = self.in_waiting
+        while True:
+            t_wait: Optional[float] = None if t_end is None else t_end - t_now
+            if self.inter_byte_timeout is not None and n_last > 0:
+                t_gap: float = t_byte + self.inter_byte_timeout - t_now
+                t_wait = t_gap if t_wait is None else min(t_wait, t_gap)
+            if t_wait is not None and t_wait <= 0:
+                return False
+            if not self._siop.wait_recv(t_wait) or self.closed():
+                return is_ready()
+            if is_ready():
+                return True
+            t_now = time.monotonic()
+            n_have: int = self.in_waiting
+            if n_have != n_last:
+                n_last = n_have
+                t_byte = t_now
+
+    def _discard_head(self) -> None:
+        """Remove the zeroth/left-most (depleted) chunk from the deque."""
+        disc_mv: memoryview = self._qread.popleft()  # Discard zeroth/left-most element
+        self._nchunks_gone += 1
+        self._head_off = 0
+        if self._trace is not None:
+            self._trace.record(EV_DISC, id(self), len(disc_mv), self._nchunks_gone - 1)
+        if self._dbglog is not None:  # Avoid details of message unless needed
+            self._dbg(f'  -DISC: {len(disc_mv)} 0x{id(disc_mv):X}\n')
+
+    def _readinto_chunks(self, ba_into: bytearray, one_chunk: bool) -> int:
+        """Copy queued chunks into ba_into (one memoryview slice assignment per chunk),
+            stopping after the first chunk if one_chunk. Returns bytes written.
+        """
+        n_total: int = 0
+        qread: Deque[memoryview] = self._qread
+        with memoryview(ba_into) as mv_raw:  # Release export before caller resizes
+            mv_into: memoryview = _byte_view(mv_raw)
+            n_want: int = len(mv_into)
+            while n_total < n_want and len(qread) > 0:
+                chunk: memoryview = qread[0]
+                off: int = self._head_off
+                n_part: int = min(n_want - n_total, len(chunk) - off)
+                mv_into[n_total:n_total + n_part] = chunk[off:off + n_part]
+                if self._dbglog is not None:  # Avoid details of message unless needed
+                    self._dbg(f'  =RDIN: {n_part} {n_want} {off} '
+                              f'{ascii(chunk[off:off + n_part].tobytes())}\n')
+                n_total += n_part
+                if off + n_part < len(chunk):
+                    self._head_off = off + n_part
+                else:
+                    self._discard_head()
+                if one_chunk:
+                    break
+        self._pos_read += n_total
+        if self._metrics is not None:
+            self._metrics.on_read(self._pos_read, n_total)
+        if self._trace is not None:
+            self._trace.record(EV_READ, id(self), n_total, self._pos_read, n_want)
+        return n_total
+
+    def _readinto_ring(self, ba_into: bytearray) -> int:
+        """Fill ba_into from the ring buffer, returning bytes written."""
+        n_ring: int = self._ring.readinto(ba_into)
+        if self._metrics is not None:
+            self._metrics.on_read(self._ring.removed, n_ring)
+        if self._trace is not None:
+            self._trace.record(EV_READ, id(self), n_ring, self._ring.removed, len(ba_into))
+        return n_ring
+
+    def _readinto_gather(self, ba_into: bytearray) -> int:
+        """Fill ba_into from as many queued buffers as fit, returning bytes written."""
+        if self._ring is not None:
+            return self._readinto_ring(ba_into)  # Ring is contiguous, always gathers
+        n_total: int = self._readinto_chunks(ba_into, False)
+        if self._dbglog is not None:  # Avoid details of message unless needed
+            self._dbg(f'  =GATH: {n_total} {len(ba_into)} {len(self._qread)}\n')
+        return n_total
+
+    def peek_chunks(self) -> List[memoryview]:
+        """Read-only views of all data waiting, without copying or consuming it.
+            Views of the deque remain valid, but views of a ring buffer are only
+            valid until more data arrives or is read.
+        """
+        if self._ring is not None:
+            return [_readonly(seg) for seg in self._ring.segments()]
+        views: List[memoryview] = list(self._qread)
+        if views and self._head_off:
+            views[0] = views[0][self._head_off:]
+        return views
+
+    def read_chunks(self, size: int = -1) -> List[memoryview]:
+        """Read up to size bytes (or all waiting if negative) as a list of read-only views
+            of the received buffers, without copying (eg: for numpy.frombuffer).
+            A ring buffer reuses its storage, so its data is copied instead.
+        """
+        if self.closed():
+            raise ValueError("Stream closed")
+        if size < 0:
+            size = self.in_waiting
+        if self._ring is not None:
+            return [memoryview(self._read_gather(size))] if size > 0 else []
+        views: List[memoryview] = []
+        n_total: int = 0
+        qread: Deque[memoryview] = self._qread
+        while n_total < size and len(qread) > 0:
+            chunk: memoryview = qread[0]
+            off: int = self._head_off
+            n_part: int = min(size - n_total, len(chunk) - off)
+            views.append(chunk[off:off + n_part])
+            n_total += n_part
+            if off + n_part < len(chunk):
+                self._head_off = off + n_part
+            else:
+                self._discard_head()
+        self._pos_read += n_total
+        if self._metrics is not None:
+            self._metrics.on_read(self._pos_read, n_total)
+        if self._trace is not None:
+            self._trace.record(EV_READ, id(self), n_total, self._pos_read, size)
+        if not views:
+            self._check_recv_error()
+        return views
+
+    def _skip(self, size: int) -> int:
+        """Discard up to size of the oldest bytes waiting, counted by metrics as dropped
+            rather than read, and traced as EV_RESET_IN. Returns bytes discarded.
+        """
+        if self._ring is not None:
+            n_total: int = self._ring.skip(size)
+        else:
+            n_total = 0
+            qread: Deque[memoryview] = self._qread
+            while n_total < size and len(qread) > 0:
+                n_part: int = min(size - n_total, len(qread[0]) - self._head_off)
+                n_total += n_part
+                if self._head_off + n_part < len(qread[0]):
+                    self._head_off += n_part
+                else:
+                    self._discard_head()
+            self._pos_read += n_total
+        if self._metrics is not None:
+            self._metrics.on_skip(
+                self._pos_read if self._ring is None else self._ring.removed, n_total)
+        if self._trace is not None:
+            self._trace.record(EV_RESET_IN, id(self), n_total)
+        return n_total
+
+    def readall(self) -> bytes:
+        """Read all data waiting, in a single pass over the queued buffers (never blocks)."""
+        if self.closed():
+            raise ValueError("Stream closed")
+        data: bytes = self._read_gather(-1)
+        if not data:
+            self._check_recv_error()
+        return data
 
     def reset_input_buffer(self) -> None:
         """Clear all data waiting to be read (Data that has arrived at backend)."""
-        old_deque = self._qread
+        if self._trace is not None:
+            self._trace.record(EV_RESET_IN, id(self), self.in_waiting)
+        if self._ring is not None:
+            self._ring.clear()
+        self._pos_read = self._pos_recv
+        self._nchunks_gone += len(self._qread)
         self._qread = deque()  # Replace deque with a blank one
+        self._head_off = 0
+        if self._metrics is not None:
+            self._metrics.on_reset()
         self._dbg('reset_input_buffer() called\n')
-        for rio in old_deque:
-            rio.close()
-        old_deque.clear()
 
     @property
     def in_waiting(self) -> int:
         """Number of bytes waiting in backend read buffers."""
-        t_bytes: int = 0
-        for rio in self._qread:
-            # Total buffer minus seek position
-            t_bytes += len(rio.getbuffer()) - rio.tell()
-        return t_bytes
+        if self._ring is not None:
+            return len(self._ring)
+        return self._pos_recv - self._pos_read
+
+    def enable_metrics(self, enabled: bool = True) -> None:
+        """Start updating the counters reported by stats(), or pause with enabled=False."""
+        if enabled and self._metrics_data is None:
+            self._metrics_data = SerialIOMetrics()
+        self._metrics = self._metrics_data if enabled else None
+
+    def reset_metrics(self) -> None:
+        """Zero the counters reported by stats()."""
+        self._metrics_data = SerialIOMetrics()
+        if self._metrics is not None:
+            self._metrics = self._metrics_data
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of current queue state, plus any metrics counted while enabled."""
+        snap: Dict[str, Any] = {
+            'metrics_enabled': self._metrics is not None,
+            'in_waiting': self.in_waiting,
+            'chunks_waiting': len(self._qread),
+        }
+        if self._metrics_data is not None:
+            snap.update(self._metrics_data.snapshot())
+        return snap
 
     def reset_output_buffer(self) -> None:
-        """Clear data waiting to be written (Does nothing)."""
+        """Clear data waiting to be written."""
         self._dbg('reset_output_buffer() called\n')
+        if self._trace is not None:
+            self._trace.record(EV_RESET_OUT, id(self), self.out_waiting)
+        self._siop.reset_output()
 
     @property
     def out_waiting(self) -> int:
-        """Number of bytes outgoing buffers (Always zero)"""
-        return 0
+        """Number of bytes written but not yet confirmed as sent by the provider."""
+        return self._siop.out_waiting()
 
     def readable(self) -> bool:
         return True
@@ -160,19 +526,138 @@ class SerialIO(io.RawIOBase):
         if self.closed():
             raise ValueError('I/O operation on closed file.')
 
-    def readlines(self, hint: int = -1) -> NoReturn:
-        """readlines is unimplemented."""
-        raise OSError("Unimplemented")
+    def _find_sep(self, sep: bytes, limit: int = -1) -> int:
+        """Count of waiting bytes through the end of the first sep, or -1 if not found.
+            With limit >= 0 the sep must end within the first limit bytes.
+            Progress of an unsuccessful scan is remembered, so calling again with the
+            same sep only searches data that arrived since (O(1) amortized per line).
+        """
+        n_sep: int = len(sep)
+        if n_sep <= 0:
+            raise ValueError("Empty separator")
+        if limit < 0:
+            limit = sys.maxsize
+        scan: Optional[Tuple[bytes, int, int, int]] = self._scan
+        if scan is not None and scan[0] != sep:
+            scan = None
+        if self._ring is not None:
+            pos_ring: int = self._ring.removed  # Stream offset of oldest byte in ring
+            start: int = 0 if scan is None else max(0, scan[1] - pos_ring)
+            idx: int = self._ring.find(sep, start, limit)
+            if idx >= 0:
+                self._scan = None
+                return idx + n_sep
+            n_done: int = min(len(self._ring), limit)
+            self._scan = (sep, pos_ring + max(start, n_done - n_sep + 1), 0, 0)
+            return -1
+        qread: Deque[memoryview] = self._qread
+        pat: Pattern[bytes] = _sep_pattern(sep)
+        pos_end: int = self._pos_read + limit  # Separator must end at or before here
+        pos_from: int = self._pos_read  # No separator begins before this stream offset
+        i_chunk: int = 0
+        chunk_off: int = self._pos_read - self._head_off  # Stream offset of scanned chunk
+        if scan is not None and scan[2] >= self._nchunks_gone:
+            pos_from = max(pos_from, scan[1])
+            i_chunk = scan[2] - self._nchunks_gone
+            chunk_off = scan[3]
+        i_hint: int = i_chunk  # Index and offset of the chunk containing pos_from
+        hint_off: int = chunk_off
+        carry: bytes = b''  # Trailing bytes of prior chunks that a separator could start in
+        while i_chunk < len(qread):
+            val: memoryview = qread[i_chunk]
+            lo: int = max(0, pos_from - chunk_off)
+            hi: int = max(lo, min(len(val), pos_end - chunk_off))
+            if carry:  # Check for a separator straddling the chunk boundary
+                idx: int = (carry + val[:n_sep - 1].tobytes()).find(sep)
+                if 0 <= idx < len(carry) and chunk_off - len(carry) + idx + n_sep <= pos_end:
+                    self._scan = None
+                    return chunk_off - len(carry) + idx + n_sep - self._pos_read
+            found = pat.search(val, lo, hi)
+            if found is not None:
+                self._scan = None
+                return chunk_off + found.end() - self._pos_read
+            pos_from = max(pos_from, chunk_off + hi - n_sep + 1)
+            while i_hint < i_chunk and hint_off + len(qread[i_hint]) <= pos_from:
+                hint_off += len(qread[i_hint])
+                i_hint += 1
+            self._scan = (sep, pos_from, self._nchunks_gone + i_hint, hint_off)
+            if hi < len(val):  # Reached the limit within this chunk
+                break
+            if n_sep > 1:
+                carry = (carry + val[max(lo, len(val) - n_sep + 1):].tobytes())[1 - n_sep:]
+            chunk_off += len(val)
+            i_chunk += 1
+        return -1
+
+    def _read_gather(self, size: int) -> bytes:
+        """Read up to size bytes (or all if negative) regardless of gather mode."""
+        if size < 0:
+            size = self.in_waiting
+        ba_read: bytearray = bytearray(size)
+        n_read: int = self._readinto_gather(ba_read)
+        del ba_read[n_read:]
+        return bytes(ba_read)
+
+    def readuntil(self, sep: bytes = b'\n', size: int = -1) -> bytes:
+        """Read through the next sep, or b'' (leaving data queued) if it has not arrived
+            before the timeout. With size >= 0 at most size bytes are returned, and once
+            size bytes are waiting without a sep they are returned anyway.
+        """
+        if self.closed():
+            raise ValueError("Stream closed")
+        if size == 0:
+            return b''
+        def has_line() -> bool:
+            return self._find_sep(sep, size) >= 0 or 0 <= size <= self.in_waiting
+        if not self._wait(has_line):
+            self._check_recv_error()
+            return b''
+        n_line: int = self._find_sep(sep, size)
+        return self._read_gather(size if n_line < 0 else n_line)
+
+    def readline(self, size: int = -1) -> bytes:
+        """Read through the next newline, otherwise whatever is waiting (up to size)."""
+        line: bytes = self.readuntil(b'\n', size)
+        if line or size == 0:
+            return line
+        return self._read_gather(size)  # Partial line
+
+    def readlines(self, hint: int = -1) -> List[bytes]:
+        """List of complete lines waiting, stopping once hint bytes were returned.
+            An unterminated trailing line is left queued, as with iteration.
+        """
+        lines: List[bytes] = []
+        n_total: int = 0
+        for line in self:
+            lines.append(line)
+            n_total += len(line)
+            if 0 < hint <= n_total:
+                break
+        return lines
+
+    def __iter__(self) -> 'SerialIO':
+        self._checkClosed()
+        return self
+
+    def __next__(self) -> bytes:
+        """Iteration yields complete lines only, stopping at a partial line or no data."""
+        line: bytes = self.readuntil(b'\n')
+        if not line:
+            raise StopIteration
+        return line
 
 
 class SerialIOLoopbackProvider(SerialIOProvider):
     """Dummy SerialIOProvider which logs output and loops back to input callback."""
 
-    def __init__(self, dbglog: TextIO = None):
+    def __init__(self, dbglog: TextIO = None, trace: Optional[SerialTrace] = None):
         #Don't need to call super().__init__ since SerialIOProvider is fully abstract
         self._cb_recv: Optional[Callable[[ByteString], None]] = None
         self._dbglog: TextIO = dbglog
+        self._trace: Optional[SerialTrace] = trace
         self._closed = False
+        if trace is not None:
+            trace.record(EV_OPEN, id(self))
         if self._dbglog:
             self._dbglog.write(f'Constructed {ascii(self)}\n')
 
@@ -186,11 +671,16 @@ class SerialIOLoopbackProvider(SerialIOProvider):
         """A buffer arrived, handle it."""
         if self._cb_recv:
             self._cb_recv(buf)
-        elif self._dbglog:
+            return
+        if self._trace is not None:
+            self._trace.record(EV_LOST, id(self), len(buf))
+        if self._dbglog:
             self._dbglog.write(f'Provider-LOST: {len(buf)} {ascii(buf)}\n')
 
     def write_bytes(self, buf: ByteString) -> None:
         """Would send data to serial port."""
+        if self._trace is not None:
+            self._trace.record(EV_WRITE, id(self), len(buf))
         if self._dbglog:
             self._dbglog.write(f'Provider-WRITELOOP: {len(buf)} {ascii(buf)}\n')
         self.do_recv(buf)  # Loopback to our own recv method
@@ -0,0 +1,242 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""asyncio stream style reader/writer pair built around SerialIO."""
+
+import asyncio
+import threading
+from typing import ByteString, Iterable, Optional, Tuple
+
+from .serialio import SerialIO, SerialIOProvider
+
+#pylint: disable=protected-access
+
+_DEFAULT_LIMIT: int = 2 ** 16  # Same default line length limit as asyncio streams
+_DRAIN_POLL_MAX: float = 0.05  # Longest delay (seconds) between drain() checks
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    """Resolve a waiter future unless it was already resolved or cancelled."""
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class SerialStreamReader():
+    """Coroutine based reads from a SerialIO, similar to asyncio.StreamReader.
+        Waiting coroutines are woken directly by SerialIO.cb_recv, rather than polling.
+        The SerialIO is never blocked upon, regardless of its timeout setting.
+    """
+
+    def __init__(self, sio: SerialIO, limit: int = _DEFAULT_LIMIT,
+                 loop: Optional[asyncio.AbstractEventLoop] = None):
+        self._sio: SerialIO = sio
+        self._limit: int = limit
+        # Constructed within the loop (as asyncio streams are), unless one is given
+        self._loop: asyncio.AbstractEventLoop = loop or asyncio.get_running_loop()
+        self._thread: int = threading.get_ident()  # Thread running self._loop
+        self._waiter: Optional[asyncio.Future] = None
+        self._eof: bool = False
+        self._listening: bool = True
+        sio.add_recv_listener(self._cb_recv)
+
+    @property
+    def sio(self) -> SerialIO:
+        """The SerialIO being read from."""
+        return self._sio
+
+    def _cb_recv(self, data: ByteString) -> None:  #pylint: disable=unused-argument
+        """Wake the waiting coroutine (if any) since data arrived."""
+        self._wakeup()
+
+    def _wakeup(self) -> None:
+        waiter: Optional[asyncio.Future] = self._waiter
+        if waiter is None:
+            return
+        self._waiter = None
+        if threading.get_ident() == self._thread:
+            _wake(waiter)
+        else:  # Provider delivered data from another thread
+            self._loop.call_soon_threadsafe(_wake, waiter)
+
+    async def _wait_for_data(self, func_name: str) -> None:
+        """Wait until cb_recv (or feed_eof) signals that something changed."""
+        if self._waiter is not None:
+            raise RuntimeError(
+                f'{func_name}() called while another coroutine is already waiting for data')
+        self._waiter = self._loop.create_future()
+        try:
+            await self._waiter
+        finally:
+            self._waiter = None
+
+    def feed_eof(self) -> None:
+        """Signal that no more data will arrive, waking any waiting coroutine."""
+        self._eof = True
+        self._wakeup()
+
+    def _detach(self) -> None:
+        """Stop listening to the SerialIO, whose data stays readable (once closed)."""
+        if self._listening:
+            self._listening = False
+            self._sio.remove_recv_listener(self._cb_recv)
+
+    def at_eof(self) -> bool:
+        """True if no data is waiting and the stream has ended or closed."""
+        return self._sio.in_waiting == 0 and (self._eof or self._sio.closed())
+
+    async def read(self, n: int = -1) -> bytes:
+        """Read up to n bytes once some are available, or until EOF if n is negative."""
+        if n == 0:
+            return b''
+        if n < 0:
+            while not self._eof and not self._sio.closed():
+                await self._wait_for_data('read')
+            return self._sio._read_gather(-1)
+        while self._sio.in_waiting == 0 and not self.at_eof():
+            await self._wait_for_data('read')
+        return self._sio._read_gather(n)
+
+    async def readexactly(self, n: int) -> bytes:
+        """Read exactly n bytes, raising asyncio.IncompleteReadError if EOF comes first."""
+        if n < 0:
+            raise ValueError('readexactly size can not be less than zero')
+        while self._sio.in_waiting < n:
+            if self._eof or self._sio.closed():
+                raise asyncio.IncompleteReadError(self._sio._read_gather(-1), n)
+            await self._wait_for_data('readexactly')
+        return self._sio._read_gather(n)
+
+    async def readuntil(self, separator: bytes = b'\n') -> bytes:
+        """Read through separator, raising asyncio.IncompleteReadError if EOF comes first,
+            or asyncio.LimitOverrunError if more than limit bytes arrive without it.
+        """
+        while True:
+            n_line: int = self._sio._find_sep(separator)
+            if n_line >= 0:
+                if n_line > self._limit:
+                    raise asyncio.LimitOverrunError(
+                        'Separator is found, but chunk is longer than limit', n_line)
+                return self._sio._read_gather(n_line)
+            if self._sio.in_waiting > self._limit:
+                raise asyncio.LimitOverrunError(
+                    'Separator is not found, and chunk exceed the limit', self._sio.in_waiting)
+            if self._eof or self._sio.closed():
+                raise asyncio.IncompleteReadError(self._sio._read_gather(-1), None)
+            await self._wait_for_data('readuntil')
+
+    async def readline(self) -> bytes:
+        """Read through newline, or return the partial line at EOF."""
+        try:
+            return await self.readuntil(b'\n')
+        except asyncio.IncompleteReadError as err:
+            return err.partial
+
+    def __aiter__(self) -> 'SerialStreamReader':
+        return self
+
+    async def __anext__(self) -> bytes:
+        line: bytes = await self.readline()
+        if not line:
+            raise StopAsyncIteration
+        return line
+
+
+class SerialStreamWriter():
+    """Writes to a SerialIO, similar to asyncio.StreamWriter.
+        drain() is woken by the provider's sent notifications where it has them
+        (eg: SerialHubWidget SENT acknowledgements), otherwise it polls.
+    """
+
+    def __init__(self, sio: SerialIO, reader: Optional[SerialStreamReader] = None):
+        self._sio: SerialIO = sio
+        self._reader: Optional[SerialStreamReader] = reader
+        self._closing: bool = False
+        self._waiter: Optional[asyncio.Future] = None
+        self._thread: int = 0  # Thread running the loop of _waiter
+        self._notified: bool = sio._siop.add_sent_listener(self._cb_sent)
+
+    @property
+    def sio(self) -> SerialIO:
+        """The SerialIO being written to."""
+        return self._sio
+
+    def write(self, data: ByteString) -> None:
+        """Send data, which is handed to the SerialIOProvider immediately.
+            Call drain() to wait until the provider confirms it was sent.
+        """
+        if self._closing:
+            raise ValueError("Stream closed")
+        self._sio.write(data)
+
+    def writelines(self, data: Iterable[ByteString]) -> None:
+        """Write each of an iterable of buffers."""
+        for buf in data:
+            self.write(buf)
+
+    def can_write_eof(self) -> bool:
+        """Serial ports have no notion of half-closing."""
+        return False
+
+    def _cb_sent(self) -> None:
+        """Wake a waiting drain(), since the provider confirmed sending data."""
+        waiter: Optional[asyncio.Future] = self._waiter
+        if waiter is None:
+            return
+        self._waiter = None
+        if threading.get_ident() == self._thread:
+            _wake(waiter)
+        else:  # Provider acknowledged from another thread
+            waiter.get_loop().call_soon_threadsafe(_wake, waiter)
+
+    async def drain(self) -> None:
+        """Wait until the provider confirms all written data was sent (see
+            SerialIO.out_waiting). Woken by the provider's sent notifications, if any,
+            checking at most every _DRAIN_POLL_MAX seconds whether it closed meanwhile.
+            Otherwise polls, with a growing delay between checks.
+        """
+        delay: float = 0.001
+        while not self._sio._siop.drain(0) and not self._sio.closed():
+            if self._notified:
+                self._thread = threading.get_ident()
+                waiter: asyncio.Future = asyncio.get_running_loop().create_future()
+                self._waiter = waiter
+                try:
+                    await asyncio.wait([waiter], timeout=_DRAIN_POLL_MAX)
+                finally:
+                    self._waiter = None
+                    waiter.cancel()
+            else:
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, _DRAIN_POLL_MAX)
+        await asyncio.sleep(0)  # Always yield, as asyncio.StreamWriter.drain() may
+
+    def close(self) -> None:
+        """Stop writing, and signal EOF to the paired reader (the provider stays open).
+            Both stop listening to the SerialIO, so may be discarded while it is reused.
+        """
+        if not self._closing and self._notified:
+            self._sio._siop.remove_sent_listener(self._cb_sent)
+        self._closing = True
+        if self._reader is not None:
+            self._reader.feed_eof()
+            self._reader._detach()
+
+    def is_closing(self) -> bool:
+        """True once close() was called."""
+        return self._closing
+
+    async def wait_closed(self) -> None:
+        """Nothing to wait for, provided for asyncio.StreamWriter compatibility."""
+
+
+def open_serial_connection(provider: SerialIOProvider, limit: int = _DEFAULT_LIMIT,
+                           **kwargs) -> Tuple[SerialStreamReader, SerialStreamWriter]:
+    """Wrap a SerialIOProvider in a new SerialIO (constructed using kwargs),
+        returning a (reader, writer) pair like asyncio.open_connection().
+    """
+    sio = SerialIO(provider, **kwargs)
+    reader = SerialStreamReader(sio, limit=limit)
+    return reader, SerialStreamWriter(sio, reader)
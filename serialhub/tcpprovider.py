@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""SerialIOProvider for a serial port exposed by a TCP bridge (eg: ser2net in raw mode)."""
+
+import socket
+from typing import List, Optional, TextIO, Tuple
+
+from ._pollprovider import PollingProvider
+
+
+class SerialTCPProvider(PollingProvider):
+    """SerialIOProvider connected to host:port (or using an already connected socket),
+        delivering each recv() of up to read_size bytes to do_recv, read by a reader
+        thread (start()), an asyncio loop (attach()) or blocking SerialIO reads.
+        Held back writes are sent with vectored sendmsg() where available.
+        is_closed() becomes True once close() is called or the connection fails (eg: is
+        reset), while an orderly shutdown by the bridge only sets at_eof, so data
+        received before it may still be read.
+    """
+
+    def __init__(self, host: Optional[str] = None, port: Optional[int] = None,
+                 sock: Optional[socket.socket] = None,
+                 connect_timeout: Optional[float] = None, read_size: int = 2 ** 16,
+                 write_timeout: Optional[float] = None, nodelay: bool = True,
+                 dbglog: TextIO = None):
+        super().__init__(read_size, write_timeout, dbglog)
+        if sock is None:
+            if host is None or port is None:
+                raise ValueError("Either host and port, or sock, are required")
+            sock = socket.create_connection((host, port), connect_timeout)
+        self._sock: socket.socket = sock
+        self._failed: bool = False
+        sock.setblocking(False)
+        if nodelay and sock.family in (socket.AF_INET, socket.AF_INET6):
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._fd = sock.fileno()
+        if self._dbglog:
+            self._dbglog.write(f'Constructed {ascii(self)} {self.peername}\n')
+
+    @property
+    def peername(self) -> Optional[Tuple]:
+        """Address of the bridge, or None if not connected."""
+        try:
+            return self._sock.getpeername()
+        except OSError:
+            return None
+
+    def _lost(self, exc: OSError) -> None:
+        """The connection failed, so neither direction can work any more."""
+        self._failed = True
+        self._eof = True
+        self.error = exc
+        if self._dbglog:
+            self._dbglog.write(f'TCP-LOST: {exc!r}\n')
+
+    def _read_raw(self) -> bytes:
+        try:
+            return self._sock.recv(self._read_size)
+        except ConnectionError as exc:  # Not BlockingIOError, which is no ConnectionError
+            self._lost(exc)
+            return b''
+
+    def _write_raw(self, bufs: List[memoryview]) -> int:
+        try:
+            if hasattr(self._sock, 'sendmsg'):
+                return self._sock.sendmsg(bufs)
+            return self._sock.send(bufs[0])  # eg: Windows lacks sendmsg
+        except ConnectionError as exc:
+            self._lost(exc)
+            raise
+
+    def _close_raw(self) -> None:
+        self._sock.close()
+
+    def is_closed(self) -> bool:
+        """True once close() is called, or the connection failed."""
+        return self._fd is None or self._failed
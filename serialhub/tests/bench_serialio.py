@@ -0,0 +1,253 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""\
+Throughput and latency benchmarks of SerialIO, run headless over SerialIOLoopbackProvider.
+    Sweeps chunk sizes, queue depths (chunks queued before reading) and read sizes for
+    each receive queue mode, saving results as JSON so versions can be compared:
+        python -m serialhub.tests.bench_serialio --out new.json [--quick] [--compare old.json]
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .. import SerialIO, SerialIOLoopbackProvider
+from .._version import __version__
+
+CHUNK_SIZES: Tuple[int, ...] = (1, 16, 256, 4096, 65536)
+QUEUE_DEPTHS: Tuple[int, ...] = (1, 16, 256)
+READ_SIZES: Tuple[int, ...] = (1, 64, 4096, 65536)
+MODES: Tuple[str, ...] = ('deque', 'gather', 'ring')
+QUICK: Dict[str, Tuple] = {  # Reduced sweep, eg: for a smoke test
+    'chunk_sizes': (1, 4096),
+    'queue_depths': (16,),
+    'read_sizes': (64,),
+}
+
+_MAX_FILL: int = 2 ** 22  # Most bytes queued for one round of a benchmark
+_MAX_CALLS: int = 20000  # Most calls (of the smallest read size) in one round
+_IN_WAITING_CALLS: int = 1000
+_LINE: bytes = b'x' * 63 + b'\n'  # Received data is lines of 64 bytes
+
+Result = Dict[str, Any]
+# Runs one round upon a prepared SerialIO, returning (calls made, bytes transferred)
+RoundFunc = Callable[[SerialIO], Tuple[int, int]]
+
+
+def _new_sio(mode: str, n_fill: int, metrics: bool) -> SerialIO:
+    """SerialIO using the receive queue mode, able to hold n_fill bytes."""
+    if mode == 'ring':
+        return SerialIO(SerialIOLoopbackProvider(), ring_capacity=n_fill, metrics=metrics)
+    return SerialIO(SerialIOLoopbackProvider(), gather=(mode == 'gather'), metrics=metrics)
+
+
+def _chunks(chunk_size: int, depth: int) -> List[bytes]:
+    """depth consecutive chunks of a stream of lines, so lines span chunks."""
+    n_total: int = chunk_size * depth
+    stream: bytes = _LINE * (n_total // len(_LINE) + 1)
+    return [stream[off:off + chunk_size] for off in range(0, n_total, chunk_size)]
+
+
+def _round_read(size: int) -> RoundFunc:
+    def run(sio: SerialIO) -> Tuple[int, int]:
+        read = sio.read
+        n_calls: int = 0
+        n_bytes: int = 0
+        while True:
+            data: bytes = read(size)
+            n_calls += 1
+            if not data:
+                return n_calls, n_bytes
+            n_bytes += len(data)
+    return run
+
+
+def _round_readinto(size: int) -> RoundFunc:
+    def run(sio: SerialIO) -> Tuple[int, int]:
+        readinto = sio.readinto
+        ba_into: bytearray = bytearray(size)
+        n_calls: int = 0
+        n_bytes: int = 0
+        while True:
+            n_read: int = readinto(ba_into)
+            n_calls += 1
+            if not n_read:
+                return n_calls, n_bytes
+            n_bytes += n_read
+    return run
+
+
+def _round_readline(sio: SerialIO) -> Tuple[int, int]:
+    readline = sio.readline
+    n_calls: int = 0
+    n_bytes: int = 0
+    while True:
+        line: bytes = readline()
+        n_calls += 1
+        if not line:
+            return n_calls, n_bytes
+        n_bytes += len(line)
+
+
+def _round_readall(sio: SerialIO) -> Tuple[int, int]:
+    return 1, len(sio.readall())
+
+
+def _round_in_waiting(sio: SerialIO) -> Tuple[int, int]:
+    for _ in range(_IN_WAITING_CALLS):
+        sio.in_waiting  #pylint: disable=pointless-statement
+    return _IN_WAITING_CALLS, 0
+
+
+def _measure(mode: str, chunks: List[bytes], fill: bool, run: Optional[RoundFunc],
+             min_time: float, metrics: bool) -> Tuple[int, int, int, int]:
+    """Repeat rounds of run (each upon a fresh SerialIO, with chunks queued if fill,
+        else written) until min_time seconds were measured. Only run is timed.
+        Returns (rounds, calls, bytes, nanoseconds).
+    """
+    n_rounds: int = 0
+    n_calls: int = 0
+    n_bytes: int = 0
+    t_total: int = 0
+    n_fill: int = sum(len(chunk) for chunk in chunks)
+    while n_rounds == 0 or t_total < min_time * 1e9:
+        sio: SerialIO = _new_sio(mode, n_fill, metrics)
+        if fill:
+            for chunk in chunks:
+                sio.cb_recv(chunk)
+            t_start: int = time.perf_counter_ns()
+            (calls, nbytes) = run(sio)
+        else:
+            write = sio.write
+            t_start = time.perf_counter_ns()
+            for chunk in chunks:
+                write(chunk)
+            (calls, nbytes) = (len(chunks), n_fill)
+        t_total += time.perf_counter_ns() - t_start
+        n_rounds += 1
+        n_calls += calls
+        n_bytes += nbytes
+    return n_rounds, n_calls, n_bytes, t_total
+
+
+def run_benchmarks(modes: Sequence[str] = MODES,
+                   chunk_sizes: Sequence[int] = CHUNK_SIZES,
+                   queue_depths: Sequence[int] = QUEUE_DEPTHS,
+                   read_sizes: Sequence[int] = READ_SIZES,
+                   min_time: float = 0.02, metrics: bool = False,
+                   progress: Optional[Callable[[Result], None]] = None) -> List[Result]:
+    """Run the sweep, returning one result dict per benchmark case.
+        With metrics=True the SerialIO metrics are enabled, to measure their overhead.
+    """
+    results: List[Result] = []
+
+    def bench(op: str, mode: str, chunk_size: int, depth: int, read_size: Optional[int],
+              fill: bool, run: Optional[RoundFunc]) -> None:
+        limit: int = _MAX_FILL if read_size is None else min(_MAX_FILL, read_size * _MAX_CALLS)
+        depth = max(1, min(depth, limit // chunk_size))
+        (rounds, calls, nbytes, t_ns) = _measure(mode, _chunks(chunk_size, depth), fill,
+                                                 run, min_time, metrics)
+        result: Result = {
+            'op': op, 'mode': mode, 'chunk_size': chunk_size, 'queue_depth': depth,
+            'read_size': read_size, 'rounds': rounds, 'calls': calls, 'bytes': nbytes,
+            'seconds': t_ns / 1e9,
+            'bytes_per_s': nbytes * 1e9 / t_ns if t_ns else 0.0,
+            'ns_per_call': t_ns / calls if calls else 0.0,
+        }
+        results.append(result)
+        if progress is not None:
+            progress(result)
+
+    for mode in modes:
+        for chunk_size in chunk_sizes:
+            for depth in queue_depths:
+                bench('write', mode, chunk_size, depth, None, False, None)
+                bench('in_waiting', mode, chunk_size, depth, None, True, _round_in_waiting)
+                bench('readall', mode, chunk_size, depth, None, True, _round_readall)
+                bench('readline', mode, chunk_size, depth, None, True, _round_readline)
+                for size in read_sizes:
+                    bench('read', mode, chunk_size, depth, size, True, _round_read(size))
+                    bench('readinto', mode, chunk_size, depth, size, True,
+                          _round_readinto(size))
+    return results
+
+
+CASE_KEYS: Tuple[str, ...] = ('op', 'mode', 'chunk_size', 'queue_depth', 'read_size')
+
+
+def compare(old: List[Result], new: List[Result], threshold: float = 0.2,
+            keys: Sequence[str] = CASE_KEYS, metric: str = 'ns_per_call') -> List[Result]:
+    """Cases (identified by keys) present in both runs whose metric grew by more than
+        threshold (as a fraction), each a copy of the new result with an added 'ratio'.
+    """
+    old_by_key: Dict[Tuple, Result] = {tuple(res[key] for key in keys): res for res in old}
+    slower: List[Result] = []
+    for res in new:
+        prior: Optional[Result] = old_by_key.get(tuple(res[key] for key in keys))
+        if prior is None or prior[metric] <= 0:
+            continue
+        ratio: float = res[metric] / prior[metric]
+        if ratio > 1.0 + threshold:
+            slower.append(dict(res, ratio=ratio))
+    return slower
+
+
+def _describe(result: Result) -> str:
+    read_size: str = '' if result['read_size'] is None else str(result['read_size'])
+    return (f"{result['op']:>10} {result['mode']:>6} {result['chunk_size']:>6} "
+            f"{result['queue_depth']:>5} {read_size:>6} "
+            f"{result['bytes_per_s'] / 1e6:>10.2f} MB/s {result['ns_per_call']:>10.0f} ns")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point, returning an exit status (1 if regressions found)."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument('--out', help='file to save JSON results to')
+    parser.add_argument('--quick', action='store_true', help='run a reduced sweep')
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=list(MODES))
+    parser.add_argument('--min-time', type=float, default=0.02,
+                        help='seconds to repeat each case for (default 0.02)')
+    parser.add_argument('--metrics', action='store_true',
+                        help='enable SerialIO metrics, to measure their overhead')
+    parser.add_argument('--compare', metavar='OLD_JSON',
+                        help='report cases slower than in this earlier results file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='slowdown fraction reported by --compare (default 0.2)')
+    parser.add_argument('--quiet', action='store_true', help='do not print each result')
+    args = parser.parse_args(argv)
+
+    sweep: Dict[str, Tuple] = dict(QUICK) if args.quick else {}
+    progress = None if args.quiet else (lambda res: print(_describe(res)))
+    results: List[Result] = run_benchmarks(modes=args.modes, min_time=args.min_time,
+                                           metrics=args.metrics, progress=progress, **sweep)
+    report: Dict[str, Any] = {
+        'benchmark': 'serialio',
+        'metrics': args.metrics,
+        'serialhub_version': __version__,
+        'python': sys.version,
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': results,
+    }
+    if args.out:
+        with open(args.out, 'w') as fout:
+            json.dump(report, fout, indent=1)
+    if args.compare:
+        with open(args.compare) as fold:
+            slower: List[Result] = compare(json.load(fold)['results'], results,
+                                           args.threshold)
+        for res in slower:
+            print(f"SLOWER x{res['ratio']:.2f} {_describe(res)}")
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""\
+End-to-end benchmark of SerialHubWidget comm message handling, with a simulated frontend.
+    FrontendComm (a MockComm) plays the browser side of the RECV/SEND/SENT/RSTS protocol
+    at a configurable message rate and size, counting what the widget sends in return:
+        python -m serialhub.tests.bench_widget --out new.json [--quick] [--compare old.json]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import sys
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .. import SerialHubWidget
+from .._version import __version__
+from .bench_serialio import compare
+from .conftest import MockComm
+
+SCENARIOS: Tuple[str, ...] = ('recv', 'recv_scrollback', 'send', 'send_window', 'rsts')
+MSG_SIZES: Tuple[int, ...] = (16, 1024, 65536)
+STATS_INTERVALS: Tuple[float, ...] = (0.0, 0.1)
+CASE_KEYS: Tuple[str, ...] = ('scenario', 'msg_size', 'stats_interval', 'rate')
+QUICK: Dict[str, Any] = {  # Reduced sweep, eg: for a smoke test
+    'msg_sizes': (1024,),
+    'stats_intervals': (0.0, 0.1),
+    'messages': 50,
+}
+
+_LINE: bytes = b'x' * 63 + b'\n'  # Received data is lines of text
+
+Result = Dict[str, Any]
+
+
+class FrontendComm(MockComm):
+    """MockComm counting messages sent by the widget (rather than logging them), which
+        acknowledges each SEND with a SENT message, as the browser does once written.
+        Like a real comm, the SENT arrives later, from the event loop, not within send().
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.widget: Optional[SerialHubWidget] = None
+        self.n_sync: int = 0  # Traitlet sync ('update') messages
+        self.n_custom: int = 0
+        self._stat_send: List[int] = [0, 0]  # As the frontend pkt_send_front
+
+    def send(self, data=None, metadata=None, buffers=None):  #pylint: disable=arguments-differ
+        method: str = data.get('method')
+        if method == 'update':
+            self.n_sync += 1
+        elif method == 'custom':
+            self.n_custom += 1
+            if data['content'].get('type') == 'SEND' and self.widget is not None:
+                n_bytes: int = sum(len(buf) for buf in buffers)
+                self._stat_send = [self._stat_send[0] + n_bytes, self._stat_send[1] + 1]
+                asyncio.get_running_loop().call_soon(self.deliver, {
+                    'type': 'SENT', 'acked': n_bytes, 'offset': data['content']['offset'],
+                    'stat_client': list(self._stat_send)})
+
+    def deliver(self, content: Mapping[str, Any], buffers: Sequence[memoryview] = ()) -> None:
+        """Pass a custom message to the widget, as ipywidgets does for comm messages."""
+        self.widget._handle_msg({
+            'content': {'data': {'method': 'custom', 'content': content}},
+            'buffers': list(buffers)
+        })
+
+
+async def _run_case(scenario: str, msg_size: int, stats_interval: float,
+                    messages: int, rate: float) -> Result:
+    """Send messages (at rate per second, or as fast as possible if 0) for one case."""
+    comm = FrontendComm()
+    shw = SerialHubWidget(stats_interval=stats_interval)
+    shw.comm = comm
+    comm.widget = shw
+    payload = memoryview((_LINE * (msg_size // len(_LINE) + 1))[:msg_size])
+    step: Callable[[], None]
+    ready: Callable[[], bool] = lambda: True  # Else yields to the event loop until True
+    if scenario in ('recv', 'recv_scrollback'):
+        if scenario == 'recv':
+            shw.on_recv(lambda buf: None)
+        else:
+            shw.scrollback_lines = 1000
+        n_recv: List[int] = [0, 0]
+        def step() -> None:
+            n_recv[0] += msg_size
+            n_recv[1] += 1
+            comm.deliver({'type': 'RECV', 'pkt_recv_front': n_recv}, [payload])
+    elif scenario in ('send', 'send_window'):
+        shw.status = 'Connected'  # So drain() waits for acknowledgements
+        if scenario == 'send_window':
+            shw.write_window = 4 * msg_size
+            # Outside a kernel, write_bytes() cannot wait for SENT, so wait here instead
+            ready = lambda: shw.out_waiting() + msg_size <= shw.write_window
+        def step() -> None:
+            shw.write_bytes(payload)
+    else:  # 'rsts'
+        def step() -> None:
+            comm.deliver({'type': 'RSTS'})
+    (n_sync0, n_custom0) = (comm.n_sync, comm.n_custom)
+    t_gap: float = 1.0 / rate if rate > 0 else 0.0
+    t_busy: int = 0
+    t_cpu: float = time.process_time()
+    t_wall: float = time.perf_counter()
+    t_next: float = t_wall
+    for i_msg in range(messages):
+        if t_gap > 0:
+            t_next += t_gap
+            await asyncio.sleep(max(0.0, t_next - time.perf_counter()))
+        elif i_msg % 16 == 0:
+            await asyncio.sleep(0)  # Let timers (eg: throttled stats) run
+        while not ready():
+            await asyncio.sleep(0)
+        t_start: int = time.perf_counter_ns()
+        step()
+        t_busy += time.perf_counter_ns() - t_start
+    shw.flush()
+    t_drain: float = time.perf_counter() + 1.0
+    while shw.out_waiting() > 0 and time.perf_counter() < t_drain:
+        await asyncio.sleep(0)  # Let the remaining SENT acknowledgements arrive
+    t_wall = time.perf_counter() - t_wall
+    t_cpu = time.process_time() - t_cpu
+    n_sync: int = comm.n_sync - n_sync0
+    n_custom: int = comm.n_custom - n_custom0
+    n_out: int = shw.out_waiting()
+    shw.close()
+    return {
+        'scenario': scenario, 'msg_size': msg_size, 'stats_interval': stats_interval,
+        'rate': rate, 'messages': messages, 'bytes': messages * msg_size,
+        'wall_s': t_wall, 'busy_s': t_busy / 1e9, 'cpu_s': t_cpu,
+        'msgs_per_s': messages * 1e9 / t_busy if t_busy else 0.0,
+        'cpu_us_per_msg': t_cpu * 1e6 / messages,
+        'sync_per_msg': n_sync / messages,
+        'custom_per_msg': n_custom / messages,
+        'out_waiting': n_out,
+    }
+
+
+def run_benchmarks(scenarios: Sequence[str] = SCENARIOS,
+                   msg_sizes: Sequence[int] = MSG_SIZES,
+                   stats_intervals: Sequence[float] = STATS_INTERVALS,
+                   messages: int = 2000, rate: float = 0.0,
+                   progress: Optional[Callable[[Result], None]] = None) -> List[Result]:
+    """Run the sweep, returning one result dict per benchmark case.
+        msgs_per_s is how many messages the widget absorbs per second of handling them,
+        while cpu_us_per_msg also includes timers and sync traffic caused meanwhile.
+    """
+    results: List[Result] = []
+    for scenario in scenarios:
+        for stats_interval in stats_intervals:
+            sizes: Sequence[int] = (0,) if scenario == 'rsts' else msg_sizes
+            for msg_size in sizes:
+                result: Result = asyncio.run(
+                    _run_case(scenario, msg_size, stats_interval, messages, rate))
+                results.append(result)
+                if progress is not None:
+                    progress(result)
+    return results
+
+
+def _describe(result: Result) -> str:
+    return (f"{result['scenario']:>15} {result['msg_size']:>6} {result['stats_interval']:>4}"
+            f" {result['msgs_per_s']:>10.0f} msg/s {result['cpu_us_per_msg']:>8.1f} us"
+            f" {result['sync_per_msg']:>5.2f} sync/msg {result['custom_per_msg']:>5.2f} custom/msg")
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    """Command line entry point, returning an exit status (1 if regressions found)."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument('--out', help='file to save JSON results to')
+    parser.add_argument('--quick', action='store_true', help='run a reduced sweep')
+    parser.add_argument('--scenarios', nargs='+', choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument('--sizes', nargs='+', type=int, help='message sizes in bytes')
+    parser.add_argument('--messages', type=int, help='messages per case (default 2000)')
+    parser.add_argument('--rate', type=float, default=0.0,
+                        help='messages per second (default 0, as fast as possible)')
+    parser.add_argument('--compare', metavar='OLD_JSON',
+                        help='report cases using more CPU than in this earlier results file')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='slowdown fraction reported by --compare (default 0.2)')
+    parser.add_argument('--quiet', action='store_true', help='do not print each result')
+    args = parser.parse_args(argv)
+
+    sweep: Dict[str, Any] = dict(QUICK) if args.quick else {}
+    if args.sizes:
+        sweep['msg_sizes'] = args.sizes
+    if args.messages:
+        sweep['messages'] = args.messages
+    progress = None if args.quiet else (lambda res: print(_describe(res)))
+    results: List[Result] = run_benchmarks(scenarios=args.scenarios, rate=args.rate,
+                                           progress=progress, **sweep)
+    report: Dict[str, Any] = {
+        'benchmark': 'widget',
+        'serialhub_version': __version__,
+        'python': sys.version,
+        'platform': platform.platform(),
+        'time': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'results': results,
+    }
+    if args.out:
+        with open(args.out, 'w') as fout:
+            json.dump(report, fout, indent=1)
+    if args.compare:
+        with open(args.compare) as fold:
+            slower: List[Result] = compare(json.load(fold)['results'], results,
+                                           args.threshold, CASE_KEYS, 'cpu_us_per_msg')
+        for res in slower:
+            print(f"SLOWER x{res['ratio']:.2f} {_describe(res)}")
+        return 1 if slower else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
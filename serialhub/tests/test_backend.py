@@ -6,7 +6,21 @@
 
 """Tests of custom Jupyter widget."""
 
-#import pytest
+import itertools
+import os
+import queue
+import types
+import typing
+from collections import deque
+
+import pytest
+import zmq
+from jupyter_client.manager import start_new_kernel
+from jupyter_client.session import Session
+from tornado.queues import Queue
+
+from .. import backend
+from .conftest import MockComm
 
 #from serialhub import _jupyter_labextension_paths, SerialHubWidget
 #from ..backend import SerialHubWidget
@@ -25,6 +39,7 @@ def test_backend_creation_blank():
     assert isinstance(shw.serial_options, dict)
     assert shw.pkt_send_front == shw.pkt_send_back == (0, 0)
     assert shw.pkt_recv_front == shw.pkt_recv_back == (0, 0)
+    assert shw.recv_batch_ms == shw.recv_batch_bytes == 0
     #Confirm some semi-internal settings under our control
     assert shw._model_name == 'SerialHubModel'
     assert shw._model_module == 'serialhub'
@@ -43,3 +58,141 @@ def test_backend_labextension():
     # Some sanity checks:
     assert len(path) == 1
     assert isinstance(path[0], dict)
+
+def test_backend_wait_unsupported():
+    """Waiting for data is pointless until the frontend supports Web Serial."""
+    from .. import SerialHubWidget  # pylint: disable=import-outside-toplevel
+    shw = SerialHubWidget()
+    assert shw.is_closed()
+    assert shw.wait_recv(0.01) is False
+
+
+class FakeShellStream():
+    """Shell stream of FakeKernel, whose socket holds the messages that arrived."""
+
+    def __init__(self, kernel: 'FakeKernel'):
+        self.kernel = kernel
+        self.arrived: typing.Deque[typing.List[zmq.Frame]] = deque()
+        self.socket = self
+
+    def poll(self, timeout_ms: int) -> bool:  #pylint: disable=unused-argument
+        return bool(self.arrived)
+
+    def flush(self) -> None:
+        while self.arrived:
+            self.kernel.schedule_dispatch(self.kernel.dispatch_shell, self.arrived.popleft())
+
+
+class FakeKernel():
+    """Shell message handling as in ipykernel 6, with signed messages."""
+
+    def __init__(self, widget: 'backend.SerialHubWidget'):
+        self.widget = widget
+        self.session = Session(key=b'secret')
+        self.client = Session(key=b'secret')
+        self.msg_queue: Queue = Queue()
+        self.shell_stream = FakeShellStream(self)
+        self.dispatched: typing.List[str] = []
+        self._parent_ident = {'shell': [b'cell']}
+        self._parents = {'shell': {'msg_id': 'cell'}}
+        self._counter = itertools.count()
+
+    def get_parent(self, channel: str = 'shell') -> typing.Dict:
+        return self._parents[channel]
+
+    def set_parent(self, ident: typing.Any, parent: typing.Dict, channel: str = 'shell'):
+        self._parent_ident[channel] = ident
+        self._parents[channel] = parent
+
+    def schedule_dispatch(self, dispatch: typing.Callable, *args: typing.Any) -> None:
+        self.msg_queue.put_nowait((next(self._counter), dispatch, args))
+
+    async def dispatch_shell(self, msg_list: typing.List[zmq.Frame]) -> None:
+        (idents, msg_list) = self.session.feed_identities(msg_list, copy=False)
+        msg = self.session.deserialize(msg_list, copy=False)  # Rejects duplicate signatures
+        self.set_parent(idents, msg, 'shell')
+        self.dispatched.append(msg['header']['msg_type'])
+        if msg['header']['msg_type'] == 'comm_msg':
+            self.widget.msg_custom(self.widget, msg['content']['data'], [])
+
+    def arrive(self, msg_type: str, content: typing.Dict) -> None:
+        """A message from the frontend reaches the shell socket."""
+        parts = self.client.serialize(self.client.msg(msg_type, content), ident=[b'fe'])
+        self.shell_stream.arrived.append([zmq.Frame(part) for part in parts])
+
+
+def test_backend_pump_kernel(mock_comm: MockComm, monkeypatch: pytest.MonkeyPatch):
+    """Comm messages are handled while waiting, while other requests are requeued"""
+    from .. import SerialHubWidget  # pylint: disable=import-outside-toplevel
+    shw = SerialHubWidget(write_window=4, write_timeout=5.0)
+    shw.comm = mock_comm
+    shw.set_trait('is_supported', True)
+    kernel = FakeKernel(shw)
+    monkeypatch.setattr(backend, 'get_ipython', lambda: types.SimpleNamespace(kernel=kernel))
+    monkeypatch.setattr(backend, '_kernel_version', lambda: (6, 29, 5))
+    shw.write_bytes(b'1234')
+    kernel.arrive('execute_request', {'code': 'next_cell()'})
+    kernel.arrive('comm_msg', {'data': {'type': 'SENT', 'acked': 4, 'stat_client': [4, 1]}})
+    shw.write_bytes(b'5678')  # Waits for the window, handling the SENT on the way
+    assert kernel.dispatched == ['comm_msg']
+    assert shw.out_waiting() == 4
+    assert kernel.get_parent('shell') == {'msg_id': 'cell'}  # Restored for the running cell
+    assert kernel._parent_ident['shell'] == [b'cell']
+    assert kernel.msg_queue.qsize() == 1
+    (_, dispatch, args) = kernel.msg_queue.get_nowait()  # As the kernel would after the cell
+    backend._run_now(dispatch(*args))
+    assert kernel.dispatched == ['comm_msg', 'execute_request']
+    assert shw.wait_recv(0) is True
+    monkeypatch.setattr(backend, '_kernel_version', lambda: (8, 0, 0))
+    with pytest.raises(RuntimeError):
+        shw.wait_recv(0)
+
+
+def _iopub_text(client: typing.Any, msg_ids: typing.List[str],
+                timeout: float = 30.0) -> typing.List[typing.Tuple[str, str]]:
+    """(msg_id, text) printed by each of msg_ids (of execute requests), in order of
+        arrival, once all have finished.
+    """
+    printed: typing.List[typing.Tuple[str, str]] = []
+    waiting: typing.Set[str] = set(msg_ids)
+    while waiting:
+        msg = client.get_iopub_msg(timeout=timeout)  # Raises queue.Empty if stuck
+        msg_id: str = msg['parent_header'].get('msg_id', '')
+        if msg['msg_type'] == 'stream' and msg_id in msg_ids:
+            printed.append((msg_id, msg['content']['text'].strip()))
+        elif msg['msg_type'] == 'status' and msg['content']['execution_state'] == 'idle':
+            waiting.discard(msg_id)
+    return printed
+
+def test_backend_pump_installed_kernel():
+    """Within the installed ipykernel, a running cell handles SENT messages while it
+        waits for write_window, and the cells queued behind it run afterwards
+    """
+    env = dict(os.environ)
+    paths: typing.List[str] = [os.path.dirname(os.path.dirname(backend.__file__))]
+    if env.get('PYTHONPATH'):
+        paths.append(env['PYTHONPATH'])
+    env['PYTHONPATH'] = os.pathsep.join(paths)  # The kernel imports this serialhub
+    (manager, client) = start_new_kernel(kernel_name='python3', env=env)
+    try:
+        msg_id: str = client.execute(
+            "from serialhub import SerialHubWidget\n"
+            "shw = SerialHubWidget(write_window=4, write_timeout=20.0)\n"
+            "shw.set_trait('is_supported', True)\n"
+            "print(shw.comm.comm_id)")
+        [(_, comm_id)] = _iopub_text(client, [msg_id])
+        id_wait: str = client.execute(
+            "shw.write_bytes(b'1234')\n"
+            "shw.write_bytes(b'5678')\n"  # Waits for the SENT below
+            "print('waited', shw.out_waiting())")
+        id_next: str = client.execute("print('next')")
+        client.shell_channel.send(client.session.msg('comm_msg', {
+            'comm_id': comm_id, 'data': {'method': 'custom', 'content': {
+                'type': 'SENT', 'acked': 4, 'stat_client': [4, 1]}}}))
+        assert _iopub_text(client, [id_wait, id_next]) == [
+            (id_wait, 'waited 4'), (id_next, 'next')]
+    except queue.Empty:
+        pytest.fail("Kernel stopped responding")
+    finally:
+        client.stop_channels()
+        manager.shutdown_kernel(now=True)
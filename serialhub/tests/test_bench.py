@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""Smoke tests keeping the benchmark suites runnable (not measuring anything)."""
+
+import json
+
+from . import bench_serialio, bench_widget
+
+
+def test_bench_serialio(tmp_path) -> None:
+    """A quick sweep saves results, and comparing them against themselves passes."""
+    out = str(tmp_path / 'serialio.json')
+    assert bench_serialio.main(['--quick', '--min-time', '0', '--quiet', '--out', out]) == 0
+    with open(out) as fin:
+        report = json.load(fin)
+    results = report['results']
+    assert {res['op'] for res in results} == {
+        'write', 'in_waiting', 'readall', 'readline', 'read', 'readinto'}
+    assert {res['mode'] for res in results} == set(bench_serialio.MODES)
+    assert all(res['calls'] > 0 for res in results)
+    assert all(res['bytes'] > 0 for res in results if res['op'] != 'in_waiting')
+    assert bench_serialio.compare(results, results) == []
+    slower = [dict(res, ns_per_call=res['ns_per_call'] * 2) for res in results[:3]]
+    assert len(bench_serialio.compare(results, slower)) == 3
+
+
+def test_bench_widget(tmp_path) -> None:
+    """A quick sweep of the simulated frontend counts the sync traffic per message."""
+    out = str(tmp_path / 'widget.json')
+    assert bench_widget.main(['--quick', '--quiet', '--out', out]) == 0
+    with open(out) as fin:
+        results = json.load(fin)['results']
+    assert {res['scenario'] for res in results} == set(bench_widget.SCENARIOS)
+    by_case = {(res['scenario'], res['stats_interval']): res for res in results}
+    assert by_case[('recv', 0.0)]['sync_per_msg'] == 1.0  # Stats published every message
+    assert by_case[('recv', 0.1)]['sync_per_msg'] < 1.0  # Throttled
+    assert by_case[('send', 0.0)]['custom_per_msg'] == 1.0  # A SEND for each write
+    assert by_case[('recv_scrollback', 0.0)]['custom_per_msg'] < 1.0  # Merged deltas
+    assert all(res['msgs_per_s'] > 0 for res in results)
+    assert all(res['out_waiting'] == 0 for res in results)  # All acknowledged once drained
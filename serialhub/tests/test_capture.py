@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""Tests of recording serial traffic to capture files."""
+
+import asyncio
+import os
+import time
+import pytest
+
+from .. import SerialIO, SerialIOLoopbackProvider, SerialHubWidget, SerialBufferOverflow
+from .. import SerialCaptureWriter, SerialCaptureReader, SerialCaptureProvider
+from .. import SerialIOReplayProvider
+from ..capture import DIR_RECV, DIR_SEND, capture_segments
+from .conftest import MockComm
+
+#pylint: disable=protected-access
+
+
+def test_capture_provider(tmp_path) -> None:
+    """Traffic in both directions is recorded, while still reaching SerialIO."""
+    path = str(tmp_path / 'dev.cap')
+    siop = SerialCaptureProvider(SerialIOLoopbackProvider(), path)
+    sio = SerialIO(siop)
+    sio.write(b'PING\n')  # Loopback provider receives what was sent
+    siop.do_recv(bytearray(b'PONG\n'))
+    assert sio.readall() == b'PING\nPONG\n'
+    siop.close()
+    records = list(SerialCaptureReader(path))
+    assert [(rec.direction, rec.data) for rec in records] == [
+        (DIR_SEND, b'PING\n'), (DIR_RECV, b'PING\n'), (DIR_RECV, b'PONG\n')]
+    assert records[0].time_ns <= records[1].time_ns <= records[2].time_ns
+    seg_size = os.path.getsize(path + '.0')
+    assert seg_size < 2 ** 24  # Truncated to the space used when closed
+
+def test_capture_provider_forwards(tmp_path, mock_comm: MockComm) -> None:
+    """Write acknowledgements and reception errors pass through from the wrapped provider."""
+    shw = SerialHubWidget(write_window=16, write_timeout=0)
+    shw.comm = mock_comm
+    siop = SerialCaptureProvider(shw, str(tmp_path / 'ack.cap'))
+    acked = []
+    listener = lambda: acked.append(siop.out_waiting())
+    assert siop.add_sent_listener(listener)
+    siop.write_bytes(b'PING\n')
+    assert siop.out_waiting() == 5
+    shw.msg_custom(shw, {'type': 'SENT', 'offset': 5, 'acked': 5, 'stat_client': [5, 1]})
+    assert acked == [0]
+    siop.remove_sent_listener(listener)
+    shw.reset_output()
+    assert acked == [0]
+    siop.close()
+
+    class FailedProvider(SerialIOLoopbackProvider):
+        def recv_error(self):
+            return SerialBufferOverflow('Lost data')
+    siop = SerialCaptureProvider(FailedProvider(), str(tmp_path / 'err.cap'))
+    sio = SerialIO(siop, timeout=1.0)
+    siop.do_recv(b'OK')
+    assert sio.read(2) == b'OK'
+    with pytest.raises(SerialBufferOverflow):
+        sio.read(1)
+    siop.close()
+
+def test_capture_rotation(tmp_path) -> None:
+    """Full segments rotate, and only max_segments of the newest are kept."""
+    path = str(tmp_path / 'rot.cap')
+    with SerialCaptureWriter(path, data_capacity=10, index_capacity=3,
+                             max_segments=2) as cap:
+        for i in range(6):
+            cap.append(b'%d' % i)  # Index fills first, after 3 entries
+        assert capture_segments(path) == [path + '.0', path + '.1']
+        cap.append(b'ABCDEFGHIJKLMNOPQRSTUVWXYZ')  # Split across three segments
+        assert cap.path == path + '.4'
+        live = [rec.data for rec in SerialCaptureReader(path)]
+        assert live == [b'KLMNOPQRST', b'UVWXYZ']  # Readable while being written
+    assert capture_segments(path) == [path + '.3', path + '.4']
+    with pytest.raises(ValueError):
+        cap.append(b'late')
+    with SerialCaptureWriter(path) as cap2:  # Numbering continues after prior capture
+        assert cap2.path == path + '.5'
+    with SerialCaptureWriter(path, max_segments=2) as cap3:  # Prior segments count too
+        assert cap3.path == path + '.6'
+        assert capture_segments(path) == [path + '.5', path + '.6']
+
+def _record(path: str, chunks, gap: float) -> None:
+    """Capture chunks received gap seconds apart, with a sent chunk in between."""
+    with SerialCaptureWriter(path) as cap:
+        for chunk in chunks:
+            cap.append(chunk)
+            cap.append(b'ignored', DIR_SEND)
+            time.sleep(gap)
+
+def test_replay_fast(tmp_path) -> None:
+    """Replay as fast as possible delivers received chunks in order."""
+    path = str(tmp_path / 'fast.cap')
+    _record(path, [b'one\n', b'two\n', b'three\n'], 0.05)
+    siop = SerialIOReplayProvider(path, speed=0)
+    sio = SerialIO(siop)
+    assert list(sio) == []  # Nothing delivered until waited for
+    sio.write(b'discarded')
+    assert siop.replay(1) == 1
+    assert sio.readline() == b'one\n'
+    assert siop.replay() == 2
+    assert siop.finished
+    assert siop.replay() == 0
+    assert list(sio) == [b'two\n', b'three\n']
+    siop = SerialIOReplayProvider(path, speed=0)
+    sio = SerialIO(siop, timeout=None)
+    t_start = time.monotonic()
+    assert list(sio) == [b'one\n', b'two\n', b'three\n']  # Blocking reads deliver
+    assert time.monotonic() - t_start < 0.05
+    assert sio.read(1) == b''  # Blocking read ends since no more can arrive
+
+def test_replay_timing(tmp_path) -> None:
+    """Replay keeps the recorded timing between chunks, scaled by speed."""
+    path = str(tmp_path / 'timed.cap')
+    _record(path, [b'A', b'B', b'C'], 0.1)
+    sio = SerialIO(SerialIOReplayProvider(path, speed=1.0), timeout=None)
+    t_start = time.monotonic()
+    assert sio.read(3) == b'ABC'
+    assert 0.15 < time.monotonic() - t_start < 1.0
+    siop = SerialIOReplayProvider(path, speed=4.0)
+    sio = SerialIO(siop)
+    t_start = time.monotonic()
+    asyncio.run(siop.play())
+    assert 0.04 < time.monotonic() - t_start < 0.15
+    assert sio.readall() == b'ABC'
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""\
+Tests of SerialChecksum, alone and within the frame and record pipelines.
+"""
+
+import struct
+import pytest
+
+from .. import (SerialChecksum, SerialCOBSFramer, SerialFrameStream, SerialRecordDecoder,
+                SerialIOLoopbackProvider)
+from ..checksum import ALGORITHMS
+
+
+def test_checksum_known_values() -> None:
+    """Checksums of '123456789' match the catalogued check values"""
+    data = b'123456789'
+    assert SerialChecksum('crc16-ccitt').compute(data) == 0x29B1
+    assert SerialChecksum('crc16-xmodem').compute(data) == 0x31C3
+    assert SerialChecksum('crc32').compute(data) == 0xCBF43926
+    assert SerialChecksum('sum8').compute(data) == 0xDD
+    assert SerialChecksum('sum16').compute(data) == 0x01DD
+    assert SerialChecksum().append(data) == data + b'\x29\xb1'
+    assert SerialChecksum('crc32').append(data) == data + b'\x26\x39\xf4\xcb'
+    with pytest.raises(ValueError):
+        SerialChecksum('md5')
+
+def test_check_batch() -> None:
+    """Frames passing are returned as views without the checksum, and all are counted"""
+    csum = SerialChecksum('crc32')
+    good = [csum.append(bytes([i]) * i) for i in range(10)]
+    bad = bytearray(good[5])
+    bad[0] ^= 1
+    passed = csum.check_batch(good[:5] + [bad, b'xy'] + good[5:])
+    assert [bytes(p) for p in passed] == [bytes([i]) * i for i in range(10)]
+    assert passed[3].obj is good[3]
+    assert (csum.n_passed, csum.n_rejected) == (10, 2)
+    assert csum.check(bad) is None
+    assert csum.check(good[1]) == b'\x01'
+
+@pytest.mark.parametrize('algorithm', list(ALGORITHMS))
+def test_check_records(algorithm: str) -> None:
+    """The vectorized record check agrees with the per-frame check"""
+    np = pytest.importorskip('numpy')
+    for byteorder in ('big', 'little'):
+        csum = SerialChecksum(algorithm, byteorder)
+        records = [csum.append(struct.pack('<Hhf', i, -i, i / 4) + bytes([i % 256]) * 5)
+                   for i in range(300)]
+        corrupt = {7, 100, 299}
+        rows = np.frombuffer(b''.join(records), dtype=np.uint8).reshape(300, -1).copy()
+        for i in corrupt:
+            rows[i, 3] ^= 0x10
+        mask = csum.check_records(rows)
+        assert list(np.flatnonzero(~mask)) == sorted(corrupt)
+        assert (csum.n_passed, csum.n_rejected) == (297, 3)
+
+def test_checksum_pipelines() -> None:
+    """Frame streams and record decoders drop what fails the checksum"""
+    np = pytest.importorskip('numpy')
+    prov = SerialIOLoopbackProvider()
+    stream = SerialFrameStream(prov, SerialCOBSFramer(), checksum=SerialChecksum())
+    stream.write_frame(b'checked')
+    prov.do_recv(SerialCOBSFramer().encode(b'no checksum'))
+    assert [bytes(f) for f in stream] == [b'checked']
+    assert stream.checksum.n_rejected == 1
+    csum = SerialChecksum('sum8')
+    dtype = [('magic', 'u1'), ('value', '<u2'), ('sum', 'u1')]
+    decoder = SerialRecordDecoder(np.dtype(dtype), sync=b'\xa5', checksum=csum)
+    data = b''.join(csum.append(struct.pack('<BH', 0xA5, i)) for i in range(5))
+    corrupt = bytearray(data)
+    corrupt[4 * 2 + 1] ^= 1  # Value of record 2, still in sync
+    assert decoder.feed(bytes(corrupt[:7])) == 1
+    assert decoder.feed(bytes(corrupt[7:])) == 3
+    assert list(decoder.records['value']) == [0, 1, 3, 4]
+    assert (csum.n_passed, csum.n_rejected) == (4, 1)
+    assert decoder.skipped == 0
@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""\
+Tests of SerialExpect matching patterns incrementally in received data.
+"""
+
+import asyncio
+import re
+import threading
+import typing
+import pytest
+
+from .. import SerialExpect, SerialIO, SerialIOLoopbackProvider
+from ..expect import ExpectMatch
+
+
+def test_expect_straddling() -> None:
+    """Matches split across chunks are found once each, at their stream offsets"""
+    stream = b'U-Boot 2020.1\r\nlogin: ERROR 42\r\n$ ok\r\nERROR 7\r\n$ '
+    for n_chunk in (1, 2, 3, 7, len(stream)):
+        found: typing.List[ExpectMatch] = []
+        exp = SerialExpect()
+        h_boot = exp.add(b'U-Boot', found.append)
+        h_prompt = exp.add(b'$ ', found.append)
+        h_error = exp.add(rb'ERROR (\d+)\r\n', found.append, regex=True)
+        exp.add(b'login: ', found.append, once=True)
+        for i in range(0, len(stream), n_chunk):
+            exp.feed(stream[i:i + n_chunk])
+        assert [(m.handle, m.offset, m.data) for m in found] == [
+            (h_boot, 0, b'U-Boot'), (3, 15, b'login: '), (h_error, 22, b'ERROR 42\r\n'),
+            (h_prompt, 32, b'$ '), (h_error, 38, b'ERROR 7\r\n'), (h_prompt, 47, b'$ ')]
+        assert [m.groups for m in found if m.handle == h_error] == [(b'42',), (b'7',)]
+        assert len(exp) == 3 and exp.n_matches == 6
+        exp.remove(h_prompt)
+        exp.feed(b'$ login: ')
+        assert len(found) == 6
+
+def test_expect_bounded_tail() -> None:
+    """Only up to max_match - 1 unmatched bytes are kept between chunks"""
+    exp = SerialExpect(max_match=16)
+    found: typing.List[ExpectMatch] = []
+    exp.add(re.compile(b'done', re.IGNORECASE), found.append)
+    for _ in range(1000):
+        exp.feed(b'x' * 100)
+        assert len(exp._tail) <= 15  #pylint: disable=protected-access
+    exp.feed(b'xxD')
+    exp.feed(b'ONE')
+    assert [(m.offset, m.data) for m in found] == [(100002, b'DONE')]
+    with pytest.raises(re.error):
+        exp.add(b'(', found.append, regex=True)
+
+def test_expect_flags_and_names() -> None:
+    """Global flags and repeated group names combine with other patterns"""
+    exp = SerialExpect()
+    found: typing.List[ExpectMatch] = []
+    h_error = exp.add(rb'(?i)error', found.append, regex=True)
+    h_boot = exp.add(re.compile(rb'(?i)boot'), found.append)
+    h_volts = exp.add(rb'V=(?P<v>\d+)(?(v)V)', found.append, regex=True)
+    h_amps = exp.add(rb'A=(?P<v>\d+)(?P=v)', found.append, regex=True)
+    h_ok = exp.add(re.compile(rb'''ok [(?P<v>]  # Class and comment are literal''', re.X),
+                   found.append)
+    exp.feed(b'Error BOOT V=5V A=77 ok> ERROR')
+    assert [(m.handle, m.data, m.groups) for m in found] == [
+        (h_error, b'Error', ()), (h_boot, b'BOOT', ()), (h_volts, b'V=5V', (b'5',)),
+        (h_amps, b'A=77', (b'7',)), (h_ok, b'ok>', ()), (h_error, b'ERROR', ())]
+    assert exp.add(b'plain (?P<v>', found.append) == h_ok + 1
+    exp.feed(b'plain (?P<v>')
+    assert found[-1].data == b'plain (?P<v>'
+    with pytest.raises(re.error):  # Fails alone, so is not added
+        exp.add(rb'(?P<v>x)(?P<v>y)', found.append, regex=True)
+    assert len(exp) == 6
+
+def test_expect_sio_async() -> None:
+    """expect() resolves with the first match, including from a provider thread"""
+    prov = SerialIOLoopbackProvider()
+    sio = SerialIO(prov)
+    exp = SerialExpect(sio)
+
+    async def scenario() -> None:
+        task = asyncio.ensure_future(exp.expect([b'OK', b'FAIL']))
+        await asyncio.sleep(0)
+        prov.do_recv(b'...F')
+        prov.do_recv(b'AIL...OK')
+        match = await task
+        assert (match.offset, match.data) == (3, b'FAIL')
+        assert len(exp) == 0
+        task = asyncio.ensure_future(exp.expect([rb'\d+'], regex=True, timeout=5.0))
+        await asyncio.sleep(0)
+        threading.Thread(target=prov.do_recv, args=(b'v123 ',)).start()
+        assert (await task).data == b'123'
+        with pytest.raises(asyncio.TimeoutError):
+            await exp.expect([b'never'], timeout=0.01)
+        assert len(exp) == 0
+
+    asyncio.run(scenario())
+    assert sio.readall() == b'...FAIL...OKv123 '  # Reads are unaffected
+    exp.close()
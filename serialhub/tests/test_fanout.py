@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""\
+Tests of SerialFanout delivering one provider's data to several SerialIOs.
+"""
+
+import pytest
+
+from .. import SerialFanout, SerialIOLoopbackProvider, SerialBufferOverflow, SerialTrace
+from ..trace import EV_READ, EV_RESET_IN
+
+#pylint: disable=protected-access
+
+
+def test_fanout_shared_chunks() -> None:
+    """Every subscriber reads everything, from the same (copied once) chunk objects"""
+    prov = SerialIOLoopbackProvider()
+    fanout = SerialFanout(prov)
+    sio_a = fanout.subscribe()
+    sio_b = fanout.subscribe(gather=True)
+    assert len(fanout) == 2
+    mutable = bytearray(b'line 1\n')
+    prov.do_recv(mutable)
+    mutable[:] = b'XXXXXXX'  # Reused by the provider, without affecting subscribers
+    prov.do_recv(b'line 2\n')
+    assert sio_a._qread[0].obj is sio_b._qread[0].obj  # Shared, not copied per subscriber
+    assert sio_a._qread[1].obj is sio_b._qread[1].obj
+    assert sio_a.readline() == b'line 1\n'
+    assert sio_b.read(100) == b'line 1\nline 2\n'
+    assert sio_a.readline() == b'line 2\n'
+    sio_b.write(b'loop')  # Writes go through the shared provider, back to both
+    assert sio_a.read(10) == sio_b.read(10) == b'loop'
+    fanout.unsubscribe(sio_a)
+    prov.do_recv(b'only b')
+    assert sio_a.read(10) == b''
+    assert sio_b.read(10) == b'only b'
+    with pytest.raises(ValueError):
+        fanout.unsubscribe(sio_a)
+    with pytest.raises(ValueError):
+        SerialFanout(prov, lag_policy='bogus')
+    fanout.close()
+    assert len(fanout) == 0
+
+def test_fanout_lag_policies() -> None:
+    """A slow subscriber is limited to max_lag unread bytes, without affecting others"""
+    prov = SerialIOLoopbackProvider()
+    fanout = SerialFanout(prov, max_lag=8)
+    fast = fanout.subscribe(max_lag=0)
+    oldest = fanout.subscribe()
+    newest = fanout.subscribe(lag_policy='drop_newest')
+    failing = fanout.subscribe(lag_policy='raise', timeout=1.0)
+    for chunk in (b'12345', b'6789', b'abcdefghijkl'):
+        prov.do_recv(chunk)
+    assert fast.readall() == b'123456789abcdefghijkl'
+    assert oldest.readall() == b'efghijkl'
+    assert fanout.dropped(oldest) == 13
+    assert newest.readall() == b'12345'
+    assert fanout.dropped(newest) == 16
+    assert len(fanout) == 3  # failing was unsubscribed upon exceeding max_lag
+    assert failing.read(5) == b'12345'  # What arrived before it fell behind
+    with pytest.raises(SerialBufferOverflow):
+        failing.read(1)
+    with pytest.raises(SerialBufferOverflow):
+        failing.readline()
+
+def test_fanout_lag_nonblocking() -> None:
+    """Non-blocking readers see overflow too, and dropped data is not counted as read"""
+    prov = SerialIOLoopbackProvider()
+    fanout = SerialFanout(prov, max_lag=8)
+    trace = SerialTrace()
+    oldest = fanout.subscribe(metrics=True, trace=trace)
+    failing = fanout.subscribe(lag_policy='raise')
+    ringed = fanout.subscribe(ring_capacity=64, metrics=True)
+    for chunk in (b'12345', b'6789', b'abcdefghijkl'):
+        prov.do_recv(chunk)
+    assert failing.read(10) == b'12345'
+    with pytest.raises(SerialBufferOverflow):
+        failing.read(10)
+    with pytest.raises(SerialBufferOverflow):
+        failing.readall()
+    with pytest.raises(SerialBufferOverflow):
+        failing.read_chunks()
+    assert oldest.readall() == b'efghijkl'
+    stats = oldest.stats()
+    assert (stats['read_calls'], stats['read_bytes']) == (1, 8)
+    # The last chunk's head never reached the SerialIO, so only 9 left its queue
+    assert (stats['recv_bytes'], stats['dropped_bytes']) == (17, 9)
+    events = trace.events()
+    assert sum(ev.length for ev in events if ev.event == EV_READ) == 8
+    assert sum(ev.length for ev in events if ev.event == EV_RESET_IN) == 9
+    assert ringed.readall() == b'efghijkl'
+    assert ringed.stats()['read_bytes'] == 8
+    assert fanout.dropped(ringed) == 13
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""\
+Tests of the COBS, SLIP and length-prefixed framers, and SerialFrameStream.
+"""
+
+import random
+import typing
+import pytest
+
+from .. import (SerialCOBSFramer, SerialSLIPFramer, SerialLengthFramer, SerialFrameStream,
+                SerialIOLoopbackProvider)
+from ..framing import SerialFramer, _DelimitedFramer
+
+PAYLOADS = [b'', b'a', b'\x00', b'\x00\x00', b'abc\x00def\x00', b'\xc0\xdb\xdc\xdd',
+            bytes(range(1, 255)), bytes(range(1, 255)) + b'\x00',
+            b'\x00' + bytes(range(1, 255)), bytes(range(256)) * 3, bytes(1000)]
+
+FRAMERS = [SerialCOBSFramer, SerialSLIPFramer, SerialLengthFramer]
+
+
+def _decode_split(framer: typing.Any, data: bytes, seed: int) -> typing.List[bytes]:
+    """Decode data delivered in randomly sized chunks."""
+    rand = random.Random(seed)
+    frames: typing.List[bytes] = []
+    start: int = 0
+    while start < len(data):
+        end: int = start + rand.randint(1, 300)
+        frames.extend(bytes(frame) for frame in framer.decode(data[start:end]))
+        start = end
+    return frames
+
+
+@pytest.mark.parametrize('cls', FRAMERS)
+def test_framer_roundtrip(cls: typing.Any) -> None:
+    """Frames survive encoding and decoding from arbitrarily split chunks"""
+    wanted = [p for p in PAYLOADS if p or cls is not SerialSLIPFramer]  # SLIP drops empty
+    stream: bytes = b''.join(cls().encode(payload) for payload in wanted)
+    for seed in range(20):
+        framer = cls()
+        assert _decode_split(framer, stream, seed) == wanted
+        assert framer.n_frames == len(wanted)
+        assert framer.n_errors == 0
+
+def test_cobs_encoding() -> None:
+    """COBS output matches the reference examples, with no zero before the end"""
+    framer = SerialCOBSFramer()
+    assert framer.encode(b'\x00') == b'\x01\x01\x00'
+    assert framer.encode(b'\x11\x22\x00\x33') == b'\x03\x11\x22\x02\x33\x00'
+    assert framer.encode(bytes(range(1, 255))) == b'\xff' + bytes(range(1, 255)) + b'\x00'
+    assert framer.encode(bytes(range(255))) == \
+        b'\x01\xff' + bytes(range(1, 255)) + b'\x00'
+    assert b'\x00' not in framer.encode(bytes(range(256)) * 4)[:-1]
+
+def test_zero_copy_frames() -> None:
+    """Frames needing no unescaping are views of the received chunk"""
+    chunk: bytes = SerialCOBSFramer().encode(b'abc') + SerialCOBSFramer().encode(b'def')
+    frames = SerialCOBSFramer().decode(chunk)
+    assert [bytes(f) for f in frames] == [b'abc', b'def']
+    assert all(f.obj is chunk and f.readonly for f in frames)
+    chunk = SerialSLIPFramer().encode(b'plain')
+    assert SerialSLIPFramer().decode(chunk)[0].obj is chunk
+    chunk = SerialLengthFramer().encode(b'xyz')
+    assert SerialLengthFramer().decode(chunk)[0].obj is chunk
+    mutable = bytearray(SerialSLIPFramer().encode(b'held'))
+    (frame,) = SerialSLIPFramer().decode(mutable)
+    mutable[:] = bytes(len(mutable))  # Frames of mutable chunks are unaffected by reuse
+    assert frame == b'held'
+
+def test_framer_errors() -> None:
+    """Malformed and oversize frames are counted and skipped, resyncing on delimiters"""
+    framer = SerialSLIPFramer(max_frame=8)
+    frames = framer.decode(b'\xc0ok\xc0bad\xdbx\xc0' + b'y' * 20)
+    assert [bytes(f) for f in frames] == [b'ok']
+    assert framer.n_errors == 2  # Bad escape, then a partial frame beyond max_frame
+    frames = framer.decode(b'yyy\xc0next\xc0')  # Rest of the oversize frame is skipped
+    assert [bytes(f) for f in frames] == [b'next']
+    assert framer.n_errors == 2
+    framer = SerialCOBSFramer()
+    assert framer.decode(b'\x05ab\x00\x02c\x00') == [b'c']  # Code runs past the end
+    assert framer.n_errors == 1
+    framer = SerialLengthFramer('<H', max_frame=4)
+    assert framer.decode(b'\x02\x00hi\x09\x00junk') == [b'hi']
+    assert framer.n_errors == 1
+    framer.reset()
+    assert framer.decode(b'\x01\x00!') == [b'!']
+
+def test_framer_abstract() -> None:
+    """Framers missing a codec method fail when created, not when first used"""
+    class NoDecode(SerialFramer):  # pylint: disable=abstract-method
+        def encode(self, payload: typing.Any) -> bytes:
+            return bytes(payload)
+
+    class NoUnframe(_DelimitedFramer):  # pylint: disable=abstract-method
+        _DELIM = b'\n'
+
+        def encode(self, payload: typing.Any) -> bytes:
+            return bytes(payload) + b'\n'
+
+    for cls in (SerialFramer, _DelimitedFramer, NoDecode, NoUnframe):
+        with pytest.raises(TypeError):
+            cls()
+
+def test_frame_stream() -> None:
+    """A frame stream decodes as chunks arrive, queueing or calling back with frames"""
+    prov = SerialIOLoopbackProvider()
+    stream = SerialFrameStream(prov, SerialCOBSFramer())
+    stream.write_frame(b'one\x00')
+    encoded: bytes = SerialCOBSFramer().encode(b'two')
+    prov.do_recv(encoded[:2])
+    assert len(stream) == 1
+    prov.do_recv(encoded[2:])
+    assert [bytes(f) for f in stream] == [b'one\x00', b'two']
+    assert stream.read_frame(timeout=0.01) is None  # Loopback delivers nothing by waiting
+    received: typing.List[bytes] = []
+    stream.on_frame(lambda frame: received.append(bytes(frame)))
+    stream.write_frame(b'three')
+    assert received == [b'three']
+    assert stream.read_frame() is None
+    stream.close()
+    prov.do_recv(encoded)
+    assert received == [b'three']
@@ -0,0 +1,166 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""\
+Tests of SerialLineParser batch parsing into NumPy column arrays.
+"""
+
+import struct
+import pytest
+
+from .. import SerialIO, SerialIOLoopbackProvider, SerialLineParser, SerialRecordDecoder
+from ..parsers import struct_dtype
+
+np = pytest.importorskip('numpy')
+
+MEASURE_COLUMNS = [('count', 'i8'), ('volts', 'f8')]  # As devnotes/measure.ino prints
+
+
+def test_parser_delimited() -> None:
+    """Whole batches parse at once, carrying partial lines and skipping malformed ones"""
+    parser = SerialLineParser(MEASURE_COLUMNS, skip=b'[]:')
+    assert parser.feed(b'[0]: 1.250\r\n[1]: 1.5') == 1
+    assert parser.feed(b'00\r\n[2') == 1
+    assert parser.feed(b']: 3.300\r\n') == 1
+    assert parser['count'].tolist() == [0, 1, 2]
+    assert parser['count'].dtype == np.int64
+    assert parser['volts'].tolist() == [1.25, 1.5, 3.3]
+    assert parser.feed(b'[3]: 0.5\r\nnoise\r\n[4]: 0.25 extra\r\n[5]: 0.125\r\n') == 2
+    assert parser['count'].tolist() == [0, 1, 2, 3, 5]
+    assert parser.n_bad == 2
+    csv = SerialLineParser([('a', 'f4'), ('b', 'i4'), ('c', 'f8')], delimiter=b',')
+    assert csv.feed(b'1.5,2,3\n4, 5 ,6\n') == 2
+    assert csv.columns['b'].tolist() == [2, 5]
+    with pytest.raises(ValueError):
+        SerialLineParser(MEASURE_COLUMNS, delimiter=b', ')
+
+def test_parser_balanced_lines() -> None:
+    """Short and long lines balancing out in total are still caught per line"""
+    triple = SerialLineParser([('a', 'i4'), ('b', 'i4')])
+    assert triple.feed(b'1 2 3\n4\n5 6\n') == 1
+    assert triple['a'].tolist() == [5]
+    assert triple['b'].tolist() == [6]
+    assert triple.n_bad == 2
+    parser = SerialLineParser(MEASURE_COLUMNS, skip=b'[]:')
+    assert parser.feed(b'[1]: 2.5\n[2]:\n[3]: 1.5 9\n') == 1
+    assert parser['count'].tolist() == [1]
+    assert parser['volts'].tolist() == [2.5]
+    assert parser.n_bad == 2
+    csv = SerialLineParser([('a', 'i4'), ('b', 'i4')], delimiter=b',')
+    assert csv.feed(b'1,2,3\n4\n5,6\n') == 1
+    assert csv['a'].tolist() == [5]
+    assert csv.n_bad == 2
+
+def test_parser_pattern() -> None:
+    """A regex with one group per column parses matching lines of each batch"""
+    parser = SerialLineParser(MEASURE_COLUMNS + [('unit', 'U2')],
+                              pattern=r'(?m)^\[(\d+)\]: ([-\d.]+) ?(\w*)\r?$')
+    assert parser.feed(b'[7]: -1.5 mV\r\njunk [8]: 2\r\n[9]: 2.5\r\n') == 2
+    assert parser['count'].tolist() == [7, 9]
+    assert parser['volts'].tolist() == [-1.5, 2.5]
+    assert parser['unit'].tolist() == ['mV', '']
+    assert parser.n_bad == 1
+    assert parser.feed(b'[10]: 1.2.3 V\n') == 0  # Matches, but is not a number
+    assert parser.n_bad == 2
+    with pytest.raises(ValueError):
+        SerialLineParser(MEASURE_COLUMNS, pattern=r'(\d+)')
+
+def test_parser_growth_and_window() -> None:
+    """Columns grow beyond their preallocation, or keep only the latest max_rows"""
+    data = b''.join(b'[%d]: %d.5\r\n' % (i, i) for i in range(5000))
+    parser = SerialLineParser(MEASURE_COLUMNS, skip=b'[]:')
+    for i_start in range(0, len(data), 777):  # Chunks split lines anywhere
+        parser.feed(data[i_start:i_start + 777])
+    assert len(parser) == parser.n_rows == 5000
+    assert parser['count'].tolist() == list(range(5000))
+    window = SerialLineParser(MEASURE_COLUMNS, skip=b'[]:', max_rows=100)
+    for i_start in range(0, len(data), 333):
+        window.feed(data[i_start:i_start + 333])
+        assert len(window) <= 100
+    assert window['count'].tolist() == list(range(4900, 5000))
+    assert window['volts'][-1] == 4999.5
+    assert window.n_rows == 5000
+    window.feed(data)  # A batch larger than the window
+    assert window['count'].tolist() == list(range(4900, 5000))
+    window.clear()
+    assert len(window) == 0
+
+def test_parser_read_from() -> None:
+    """read_from() parses whatever a SerialIO has waiting"""
+    sio = SerialIO(SerialIOLoopbackProvider())
+    parser = SerialLineParser(MEASURE_COLUMNS, skip=b'[]:')
+    sio.write(b'[0]: 0.1\r\n[1]: 0.')
+    sio.write(b'2\r\n[2]: ')
+    assert parser.read_from(sio) == 2
+    assert sio.in_waiting == 0
+    assert parser.read_from(sio) == 0
+    sio.write(b'0.3\r\n')
+    assert parser.read_from(sio) == 1
+    assert parser['volts'].tolist() == [0.1, 0.2, 0.3]
+
+RECORD_FORMAT = '<2sHIf'  # sync word, sequence, timestamp, value
+RECORD_NAMES = ['sync', 'seq', 't', 'value']
+
+
+def _records(first: int, count: int) -> bytes:
+    return b''.join(struct.pack(RECORD_FORMAT, b'\xaa\x55', i, 1000 * i, i / 4)
+                    for i in range(first, first + count))
+
+def test_struct_dtype() -> None:
+    """struct formats translate to structured dtypes of the same layout"""
+    dtype = struct_dtype(RECORD_FORMAT, RECORD_NAMES)
+    assert dtype.itemsize == struct.calcsize(RECORD_FORMAT) == 12
+    assert dtype.names == tuple(RECORD_NAMES)
+    assert dtype['t'] == np.dtype('<u4')
+    padded = struct_dtype('>h3xd')
+    assert padded.itemsize == 13
+    assert padded['f1'] == np.dtype('>f8')
+    assert struct_dtype('@bi').itemsize == struct.calcsize('@bi')
+    with pytest.raises(ValueError):
+        struct_dtype('<hP')
+    with pytest.raises(ValueError):
+        struct_dtype('<hh', ['only_one'])
+
+def test_record_decoder() -> None:
+    """Records split anywhere across chunks decode in order, in runs"""
+    data = _records(0, 1000)
+    decoder = SerialRecordDecoder(RECORD_FORMAT, sync=b'\xaa\x55', names=RECORD_NAMES)
+    for i_start in range(0, len(data), 97):
+        decoder.feed(data[i_start:i_start + 97])
+    assert len(decoder) == decoder.n_records == 1000
+    assert decoder.records['seq'].tolist() == list(range(1000))
+    assert decoder.records['value'][-1] == 999 / 4
+    assert decoder.skipped == 0
+    plain = SerialRecordDecoder(np.dtype([('a', '<u2'), ('b', '<i2')]), max_records=2)
+    assert plain.feed(b'\x01\x00\xff\xff\x02\x00') == 1
+    assert plain.feed(b'\xfe\xff\x03\x00\x00\x00') == 2
+    assert plain.records['a'].tolist() == [2, 3]
+    assert plain.records['b'].tolist() == [-2, 0]
+    with pytest.raises(ValueError):
+        SerialRecordDecoder('<h', sync=b'abc')
+
+def test_record_decoder_resync() -> None:
+    """Corrupted records and stray bytes are skipped by resynchronizing on the sync word"""
+    data = bytearray(_records(0, 10))
+    data[3 * 12 + 1] = 0  # Corrupt the sync word of record 3
+    data[6 * 12:6 * 12] = b'junk'  # Stray bytes before record 6
+    data[0:0] = b'\x55noise\xaa'  # Joining partway through a stream
+    decoder = SerialRecordDecoder(RECORD_FORMAT, sync=b'\xaa\x55', names=RECORD_NAMES)
+    assert decoder.feed(bytes(data[:8])) == 0
+    assert decoder.skipped == 7  # All but the last byte, which may start a sync word
+    decoder.feed(bytes(data[8:]))
+    assert decoder.records['seq'].tolist() == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+    assert decoder.skipped == 7 + 12 + 4
+
+def test_record_decoder_read_from() -> None:
+    """read_from() decodes whatever a SerialIO has waiting"""
+    sio = SerialIO(SerialIOLoopbackProvider())
+    decoder = SerialRecordDecoder(RECORD_FORMAT, sync=b'\xaa\x55', names=RECORD_NAMES)
+    data = _records(0, 5)
+    sio.write(data[:30])
+    sio.write(data[30:])
+    assert decoder.read_from(sio) == 5
+    assert decoder.records['t'].tolist() == [0, 1000, 2000, 3000, 4000]
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""Tests of SerialRingBuffer and its use as the SerialIO receive queue."""
+
+import sys
+import pytest
+
+from .. import SerialIO, SerialIOLoopbackProvider, SerialRingBuffer, SerialBufferOverflow
+
+#pylint: disable=protected-access
+
+
+def test_ring_wraparound() -> None:
+    """Writes and reads that straddle the end of storage."""
+    ring = SerialRingBuffer(8)
+    assert ring.capacity == 8
+    assert len(ring) == 0
+    assert ring.write(b'ABCDEF') == 6
+    ba1 = bytearray(4)
+    assert ring.readinto(ba1) == 4
+    assert ba1 == b'ABCD'
+    assert ring.write(b'GHIJKL') == 6  # Wraps around the end
+    assert len(ring) == 8
+    assert ring.free == 0
+    assert b''.join(bytes(seg) for seg in ring.segments()) == b'EFGHIJKL'
+    ba2 = bytearray(10)
+    assert ring.readinto(ba2) == 8
+    assert ba2[:8] == b'EFGHIJKL'
+    assert len(ring) == 0
+    assert ring.segments() == []
+    assert ring.dropped == 0
+
+def test_ring_drop_oldest() -> None:
+    """Default policy discards the oldest bytes to make room."""
+    ring = SerialRingBuffer(6)
+    ring.write(b'12345')
+    ring.write(b'678')
+    assert ring.dropped == 2
+    ba1 = bytearray(6)
+    assert ring.readinto(ba1) == 6
+    assert ba1 == b'345678'
+    ring.write(b'ABCDEFGHIJ')  # Larger than capacity, keeps the newest bytes
+    assert ring.dropped == 2 + 4
+    assert ring.readinto(ba1) == 6
+    assert ba1 == b'EFGHIJ'
+
+def test_ring_drop_newest() -> None:
+    """Incoming bytes that do not fit are discarded."""
+    ring = SerialRingBuffer(6, 'drop_newest')
+    assert ring.write(b'12345') == 5
+    assert ring.write(b'678') == 1
+    assert ring.write(b'9') == 0
+    assert ring.dropped == 3
+    ba1 = bytearray(6)
+    assert ring.readinto(ba1) == 6
+    assert ba1 == b'123456'
+
+def test_ring_raise() -> None:
+    """Overflow raises, leaving contents untouched."""
+    ring = SerialRingBuffer(4, 'raise')
+    ring.write(b'1234')
+    with pytest.raises(SerialBufferOverflow):
+        ring.write(b'5')
+    assert len(ring) == 4
+    assert ring.dropped == 0
+    with pytest.raises(ValueError):
+        SerialRingBuffer(4, 'bogus')
+    with pytest.raises(ValueError):
+        SerialRingBuffer(0)
+
+def test_serialio_ring() -> None:
+    """SerialIO using a ring buffer rather than a deque."""
+    siop = SerialIOLoopbackProvider(sys.stderr)
+    sio = SerialIO(siop, sys.stderr, ring_capacity=16)
+    assert sio._ring is not None
+    siop.do_recv(b'BUF1\n')
+    siop.do_recv(b'BUF2\n')
+    assert len(sio._qread) == 0  # Deque unused
+    assert sio.in_waiting == 10
+    assert sio.read(7) == b'BUF1\nBU'  # Not limited by arrival boundaries
+    assert sio.in_waiting == 3
+    siop.do_recv(b'0123456789ABCDEF')  # Overflows, dropping oldest
+    assert sio.in_waiting == 16
+    assert sio._ring.dropped == 3
+    assert sio.readline() == b'0123456789ABCDEF'
+    siop.do_recv(b'DISCARD')
+    sio.reset_input_buffer()
+    assert sio.in_waiting == 0
+    assert sio.write(b'LOOP') == 4
+    assert sio.readall() == b'LOOP'
@@ -6,8 +6,11 @@
 
 """Tests of serialhub widget in a JupyterLab environment."""
 
-#import pytest
-from .. import SerialHubWidget
+import asyncio
+import time
+import pytest
+from .. import SerialHubWidget, SerialIO, SerialWriteTimeout, open_serial_connection
+from .. import backend, streams
 #from ..serialio import SerialIOLoopbackProvider
 from .conftest import MockComm
 
@@ -23,3 +26,290 @@ def test_widget(mock_comm: MockComm):
     print(mock_comm.log_send)
     print(mock_comm.log_close)
     #assert 0, mock_comm
+
+def test_write_coalesce(mock_comm: MockComm):
+    """Small writes are held back and sent together."""
+    shw = SerialHubWidget()
+    shw.comm = mock_comm  # Capture messages sent by this widget
+    async def scenario() -> None:  # Within a loop, which could send held back writes later
+        shw.write_coalesce_bytes = 8
+        shw.write_bytes(b'AB')
+        shw.write_bytes(bytearray(b'CD'))
+        assert shw.pkt_send_back == (0, 0)
+        assert not any(kw['data']['method'] == 'custom' for (_, kw) in mock_comm.log_send)
+        shw.write_bytes(b'EFGH')  # Reaches the threshold, so all three get sent
+        sends = [kw for (_, kw) in mock_comm.log_send if kw['data']['method'] == 'custom']
+        assert len(sends) == 1
+        assert sends[0]['data']['content'] == {'type': 'SEND', 'offset': 8}
+        assert sends[0]['buffers'] == [b'AB', b'CD', b'EFGH']
+        assert shw.pkt_send_back == (8, 3)
+        shw.write_coalesce_join = True
+        shw.write_str('XY')
+        shw.write_str('Z')
+        shw.flush()  # Explicit flush, joined into a single buffer
+        shw.flush()  # Nothing left to send
+        sends = [kw for (_, kw) in mock_comm.log_send if kw['data']['method'] == 'custom']
+        assert len(sends) == 2
+        assert sends[1]['buffers'] == [b'XYZ']
+        assert shw.pkt_send_back == (11, 4)
+    asyncio.run(scenario())
+    shw.write_str('NOW')  # Without an event loop to send it later, sent at once
+    assert shw.pkt_send_back == (14, 5)
+
+def test_write_coalesce_blocking_read(mock_comm: MockComm):
+    """A blocking read sends writes held back for coalescing before it waits."""
+    shw = SerialHubWidget(write_coalesce_bytes=1024, write_coalesce_delay=60.0)
+    shw.comm = mock_comm
+    shw.set_trait('is_supported', True)
+    sio = SerialIO(shw, timeout=0.01)
+    async def scenario() -> None:
+        sio.write(b'AT\r')
+        assert shw.out_waiting() == 3  # Held back, the timer being a minute away
+        assert sio.readline() == b''  # No kernel to deliver a response, so times out
+        sends = [kw for (_, kw) in mock_comm.log_send if kw['data']['method'] == 'custom']
+        assert [kw['buffers'] for kw in sends] == [[b'AT\r']]
+    asyncio.run(scenario())
+
+def test_write_coalesce_timer(mock_comm: MockComm):
+    """Held back writes are sent after write_coalesce_delay on the event loop."""
+    shw = SerialHubWidget(write_coalesce_bytes=1024, write_coalesce_delay=0.01)
+    shw.comm = mock_comm
+    async def scenario() -> None:
+        shw.write_bytes(b'TICK')
+        assert shw.pkt_send_back == (0, 0)
+        await asyncio.sleep(0.05)
+        assert shw.pkt_send_back == (4, 1)
+    asyncio.run(scenario())
+
+def test_stats_on_demand(mock_comm: MockComm):
+    """Statistics only reach the traitlets (and frontend) when published."""
+    shw = SerialHubWidget(stats_interval=-1)
+    shw.comm = mock_comm
+    shw.on_recv(lambda buf: None)  # Avoid updates to "value"
+    for _ in range(5):
+        shw.write_bytes(b'12')
+        shw.msg_custom(shw, {'type': 'RECV'}, [b'abc', b'd'])
+    assert shw.pkt_send_back == shw.pkt_recv_back == (0, 0)
+    assert not any(kw['data']['method'] == 'update' for (_, kw) in mock_comm.log_send)
+    shw.publish_stats()
+    assert shw.pkt_send_back == (10, 5)
+    assert shw.pkt_recv_back == (20, 10)
+    updates = [kw for (_, kw) in mock_comm.log_send if kw['data']['method'] == 'update']
+    assert len(updates) == 1  # Both traitlets in a single sync message
+    assert mock_comm.log_send[-1][1]['data']['content'] == {'type': 'STAT'}
+    shw.msg_custom(shw, {'type': 'RSTS'}, [])
+    assert shw.pkt_send_back == shw.pkt_recv_back == (0, 0)
+
+def test_stats_throttled(mock_comm: MockComm):
+    """With stats_interval > 0, many packets cause a single publish per interval."""
+    shw = SerialHubWidget(stats_interval=0.02)
+    shw.comm = mock_comm
+    async def scenario() -> None:
+        shw.write_bytes(b'1')  # First change publishes at once
+        for _ in range(20):
+            shw.write_bytes(b'2')
+        assert shw.pkt_send_back == (1, 1)
+        await asyncio.sleep(0.05)
+        assert shw.pkt_send_back == (21, 21)
+    asyncio.run(scenario())
+    shw.pkt_send_back = (0, 0)  # Direct assignment also resets the counters
+    shw.stats_interval = 0
+    shw.write_bytes(b'3')
+    assert shw.pkt_send_back == (1, 1)
+
+def test_scrollback(mock_comm: MockComm):
+    """Scrollback mode sends only deltas, keeping a bounded tail of lines."""
+    shw = SerialHubWidget(scrollback_lines=2)
+    shw.comm = mock_comm
+    for text in (b'one\ntw', b'o\nthree\n', b'four\r\nfi'):
+        shw.msg_custom(shw, {'type': 'RECV'}, [text])
+    assert shw.value == ''
+    assert shw.scrollback == 'three\nfour\\r\nfi'
+    deltas = [kw['data']['content'] for (_, kw) in mock_comm.log_send
+              if kw['data']['method'] == 'custom']
+    assert deltas[-1] == {'type': 'VDLT', 'text': 'four\\r\nfi'}
+    shw.msg_custom(shw, {'type': 'MSGV', 'text': 'x' * 20}, [])
+    assert shw.scrollback == 'three\nfour\\r\nfi' + 'x' * 20  # Partial last line is kept
+    shw.scrollback_chars = 8
+    shw.append_value('12345')
+    assert shw.scrollback == 'xxx12345'
+    shw.clear_scrollback()
+    assert shw.scrollback == ''
+    assert mock_comm.log_send[-1][1]['data']['content'] == {'type': 'VCLR'}
+
+def test_scrollback_late_view(mock_comm: MockComm):
+    """A view rendering after deltas were sent receives the scrollback so far."""
+    shw = SerialHubWidget(scrollback_chars=6)
+    shw.comm = mock_comm
+    shw.msg_custom(shw, {'type': 'RECV'}, [b'early\nlate'])
+    shw.msg_custom(shw, {'type': 'VREQ'}, [])  # As sent by a view once rendered
+    assert mock_comm.log_send[-1][1]['data']['content'] == {'type': 'VSET', 'text': 'y\nlate'}
+    shw.scrollback_chars = 0
+    n_sent = len(mock_comm.log_send)
+    shw.msg_custom(shw, {'type': 'VREQ'}, [])  # Not in scrollback mode, "value" suffices
+    assert len(mock_comm.log_send) == n_sent
+
+def test_scrollback_interval(mock_comm: MockComm):
+    """Deltas within scrollback_interval are merged, or replaced by VSET once they exceed
+        the scrollback. Clearing the scrollback discards them.
+    """
+    def vmsgs():
+        return [kw['data']['content'] for (_, kw) in mock_comm.log_send
+                if kw['data']['method'] == 'custom']
+    async def scenario() -> None:
+        shw = SerialHubWidget(scrollback_chars=8, scrollback_interval=0.02)
+        shw.comm = mock_comm
+        for text in ('a', 'b', 'c'):
+            shw.append_value(text)
+        assert vmsgs() == [{'type': 'VDLT', 'text': 'a'}]  # At once, then throttled
+        await asyncio.sleep(0.05)
+        assert vmsgs()[1:] == [{'type': 'VDLT', 'text': 'bc'}]
+        shw.append_value('d')
+        shw.append_value('0123456789')
+        await asyncio.sleep(0.05)
+        assert vmsgs()[2:] == [{'type': 'VDLT', 'text': 'd'},
+                               {'type': 'VSET', 'text': '23456789'}]
+        shw.append_value('e')
+        shw.append_value('f')
+        shw.clear_scrollback()
+        await asyncio.sleep(0.05)
+        assert vmsgs()[4:] == [{'type': 'VDLT', 'text': 'e'}, {'type': 'VCLR'}]
+    asyncio.run(scenario())
+
+def test_write_window(mock_comm: MockComm):
+    """Writes beyond write_window wait for SENT acknowledgements from the frontend."""
+    shw = SerialHubWidget(write_window=10, write_timeout=0)
+    shw.comm = mock_comm
+    sio = SerialIO(shw)
+    shw.write_bytes(b'123456')
+    assert sio.out_waiting == 6
+    with pytest.raises(SerialWriteTimeout):
+        shw.write_bytes(b'789abc')  # No acknowledgement can arrive while waiting
+    assert sio.out_waiting == 6
+    shw.msg_custom(shw, {'type': 'SENT', 'acked': 6, 'stat_client': [6, 1]}, [])
+    assert shw.drain(0) is True
+    shw.write_bytes(b'789abc')
+    shw.write_bytes(b'defg')
+    assert shw.drain(0) is False
+    shw.msg_custom(shw, {'type': 'SENT', 'acked': 20, 'stat_client': [12, 2]}, [])
+    assert sio.out_waiting == 0  # Acknowledgements never exceed bytes sent
+    shw.write_coalesce_bytes = 100
+    async def scenario() -> None:  # Within a loop, so the write can be held back
+        shw.write_bytes(b'held')
+        assert sio.out_waiting == 4
+        sio.reset_output_buffer()
+        assert sio.out_waiting == 0
+    asyncio.run(scenario())
+    sends = [kw for (_, kw) in mock_comm.log_send if kw['data']['method'] == 'custom']
+    assert len(sends) == 3  # Held back write was discarded
+
+def test_write_acked_offsets(mock_comm: MockComm):
+    """SENT echoes the offset of its SEND, so acknowledgements are neither lost when
+        handled within send(), nor credited to later data after reset_output().
+    """
+    shw = SerialHubWidget(write_window=10, write_timeout=0)
+    shw.comm = mock_comm
+    def ack_at_once(content, buffers):  # A frontend acknowledging within send()
+        if content.get('type') == 'SEND':
+            shw.msg_custom(shw, {'type': 'SENT', 'offset': content['offset'],
+                                 'acked': sum(map(len, buffers)), 'stat_client': [0, 0]})
+    shw.send = ack_at_once
+    shw.write_bytes(b'123456')
+    assert shw.out_waiting() == 0
+    del shw.send
+    shw.write_bytes(b'789')
+    shw.write_bytes(b'abc')
+    (offset_a, offset_b) = [kw['data']['content']['offset'] for (_, kw) in mock_comm.log_send
+                            if kw['data']['method'] == 'custom']
+    assert (offset_a, offset_b) == (9, 12)
+    shw.reset_output()
+    shw.write_bytes(b'defg')
+    shw.msg_custom(shw, {'type': 'SENT', 'offset': offset_a, 'acked': 3,
+                         'stat_client': [0, 0]})  # Late, for data before the reset
+    assert shw.out_waiting() == 4
+    shw.msg_custom(shw, {'type': 'SENT', 'offset': offset_b, 'acked': 3,
+                         'stat_client': [0, 0]})
+    assert shw.out_waiting() == 4
+    shw.msg_custom(shw, {'type': 'SENT', 'offset': 16, 'acked': 4, 'stat_client': [4, 1]})
+    assert shw.out_waiting() == 0
+
+def test_widget_metrics(mock_comm: MockComm):
+    """Widget metrics count messages each way while enabled."""
+    shw = SerialHubWidget()
+    shw.comm = mock_comm
+    shw.on_recv(lambda buf: None)
+    shw.msg_custom(shw, {'type': 'RECV'}, [b'abc'])
+    shw.enable_metrics()
+    shw.msg_custom(shw, {'type': 'RECV'}, [b'abc', b'defgh'])
+    shw.write_bytes(b'1234')
+    shw.msg_custom(shw, {'type': 'SENT', 'acked': 4, 'stat_client': [4, 1]}, [])
+    stats = shw.stats()
+    assert stats['recv_back'] == [11, 3]
+    assert stats['out_waiting'] == 0
+    assert stats['msgs_in'] == {'RECV': 1, 'SENT': 1}
+    assert stats['msgs_out'] == {'SEND': 1}
+    assert stats['recv_sizes']['count'] == 2
+    assert (stats['send_bytes'], stats['write_calls'], stats['hwm_out_waiting']) == (4, 1, 4)
+    assert stats['stats_published'] == 2
+    shw.enable_metrics(False)
+    shw.write_bytes(b'5678')
+    assert shw.stats()['write_calls'] == 1
+
+def test_stream_drain_notified(mock_comm: MockComm, monkeypatch: pytest.MonkeyPatch):
+    """SerialStreamWriter.drain() is woken by SENT acknowledgements, not by polling."""
+    shw = SerialHubWidget()
+    shw.comm = mock_comm
+    shw.set_trait('is_supported', True)
+    monkeypatch.setattr(streams, '_DRAIN_POLL_MAX', 60.0)  # Would time out if polling
+    async def scenario() -> None:
+        (_, writer) = open_serial_connection(shw)
+        writer.write(b'DATA')
+        assert shw.out_waiting() == 4
+        asyncio.get_running_loop().call_later(
+            0.01, shw.msg_custom, shw, {'type': 'SENT', 'acked': 4, 'stat_client': [4, 1]})
+        await asyncio.wait_for(writer.drain(), 5.0)
+        assert shw.out_waiting() == 0
+        writer.close()
+        assert not shw._sent_listeners
+    asyncio.run(scenario())
+
+def test_write_window_coalesced(mock_comm: MockComm):
+    """Held back writes are sent, rather than waited upon, when the window is full."""
+    shw = SerialHubWidget(write_window=8, write_timeout=0, write_coalesce_bytes=16)
+    shw.comm = mock_comm
+    async def scenario() -> None:
+        shw.write_bytes(b'123456')
+        assert shw.pkt_send_back == (0, 0)
+        with pytest.raises(SerialWriteTimeout):
+            shw.write_bytes(b'789abc')  # Sent the held back write, but no ack can arrive
+        sends = [kw for (_, kw) in mock_comm.log_send if kw['data']['method'] == 'custom']
+        assert [kw['buffers'] for kw in sends] == [[b'123456']]
+        shw.msg_custom(shw, {'type': 'SENT', 'acked': 6, 'stat_client': [6, 1]}, [])
+        shw.write_bytes(b'789abc')
+        assert shw.out_waiting() == 6
+    asyncio.run(scenario())
+
+def test_flush_no_view(mock_comm: MockComm, monkeypatch: pytest.MonkeyPatch):
+    """Flushing returns promptly while no view acknowledges (or writes) data."""
+    def pump_nothing(timeout):  # A kernel where no SENT message ever arrives
+        time.sleep(0.01 if timeout is None else min(timeout, 0.01))
+        return True
+    monkeypatch.setattr(backend, '_pump_kernel', pump_nothing)
+    monkeypatch.setattr(backend, '_DEFAULT_DRAIN_TIMEOUT', 0.05)
+    shw = SerialHubWidget()
+    shw.comm = mock_comm
+    shw.set_trait('is_supported', True)
+    sio = SerialIO(shw)
+    t_start = time.monotonic()
+    sio.write(b'unacknowledged\n')
+    sio.flush()  # No write_window, so nothing to wait for
+    assert time.monotonic() - t_start < 0.04
+    assert shw.out_waiting() == 15
+    shw.write_window = 100
+    assert shw.drain() is False  # No port open, so no acknowledgement can arrive
+    assert time.monotonic() - t_start < 0.04
+    shw.status = 'Connected'
+    assert shw.drain() is False  # Gives up after _DEFAULT_DRAIN_TIMEOUT
+    assert 0.04 <= time.monotonic() - t_start < 1.0
+    shw.write_timeout = 0.0
+    assert shw.drain() is False
@@ -12,6 +12,7 @@ Tests related to SerialIO basics and stream reading.
 
 import sys
 import io
+import time
 import collections
 import typing
 import pytest
@@ -68,7 +69,7 @@ def test_protected(sio: SerialIO) -> None:
 
 def test_cb_recv(sio: SerialIO) -> None:
     """Indirectly SerialIO.cb_recv() is called by SerialIOProvider.do_recv()."""
-    assert len(sio._qread) == 0  # The deque of BytesIO starts empty
+    assert len(sio._qread) == 0  # The deque of chunks starts empty
     assert sio.in_waiting == 0  # Depends upon working "in_waiting" property
     # Push a buffer using SerialIOProvider method
     sio._siop.do_recv(b'VIA-SIOP')
@@ -103,6 +104,27 @@ def test_read_varsz(sio: SerialIO) -> None:
     assert sio.read(20) == b'BUF4\n'
     assert sio.in_waiting == 0
 
+def test_read_gather(sio_provider: SerialIOProvider) -> None:
+    """Gather mode fills the read across buffer boundaries"""
+    sio = SerialIO(sio_provider, sys.stderr, gather=True)
+    sio_provider.do_recv(b'BUF1\n')
+    sio_provider.do_recv(b'')
+    sio_provider.do_recv(b'BUF2\n')
+    sio_provider.do_recv(b'BUF3\n')
+    assert sio.in_waiting == 15
+    assert sio.read(7) == b'BUF1\nBU'  # Spans first two buffers
+    assert sio.in_waiting == 8
+    ba1 = bytearray(20)
+    assert sio.readinto(ba1) == 8  # Drains everything remaining
+    assert ba1[:8] == b'F2\nBUF3\n'
+    assert sio.in_waiting == 0
+    assert len(sio._qread) <= 1  # At most a depleted buffer remains
+    assert sio.read(5) == b''
+    sio_provider.do_recv(b'ALL')
+    sio_provider.do_recv(b'-OF-')
+    sio_provider.do_recv(b'IT')
+    assert sio.readall() == b'ALL-OF-IT'
+
 def test_readneg_empties(sio: SerialIO) -> None:
     """Skip empty bufs and read almost all"""
     sio._siop.do_recv(b'BUF5\n')
@@ -168,15 +190,45 @@ def test_readall_multiline(sio: SerialIO) -> None:
         assert sio.readall() == b''
     assert sio.in_waiting == 0
 
-def test_readlines_unimp(sio: SerialIO) -> None:
-    """Multi-line readlines"""
+def test_readlines(sio: SerialIO) -> None:
+    """Multi-line readlines leaves the unterminated line queued"""
     assert sio.closed() is False
-    #sio._checkClosed()  # Always closed
     sio._siop.do_recv(b'LINE1\nLINE2\r\nLINE3')
-    assert sio.readlines
     sio._checkClosed()  # Raises error if closed
-    with pytest.raises(OSError):
-        sio.readlines()
+    assert sio.readlines() == [b'LINE1\n', b'LINE2\r\n']
+    assert sio.in_waiting == 5
+    sio._siop.do_recv(b'\nLINE4\nLINE5\n')
+    assert sio.readlines(3) == [b'LINE3\n']  # Stops once hint is reached
+    assert list(sio) == [b'LINE4\n', b'LINE5\n']
+    assert sio.in_waiting == 0
+
+def test_readuntil_growing(sio: SerialIO) -> None:
+    """Separator scans across many arrivals, resuming where the last scan stopped"""
+    sio._siop.do_recv(b'[1]: 0.')
+    assert sio.readuntil() == b''  # No terminator yet, data stays queued
+    assert sio._scan is not None and sio._scan[1] == 7
+    sio._siop.do_recv(b'25')
+    sio._siop.do_recv(b'')
+    sio._siop.do_recv(b'\r')
+    assert sio.readuntil(b'\r\n') == b''
+    assert sio._scan is not None and sio._scan[1] == 9  # Last byte may begin a sep
+    sio._siop.do_recv(b'\n[2]: 1.5\r\n')  # Separator straddles the arrivals
+    assert sio.readuntil(b'\r\n') == b'[1]: 0.25\r\n'
+    assert sio.readuntil(b'\r\n', 4) == b'[2]:'  # Limited by size
+    assert sio.readuntil(b'\r\n', 20) == b' 1.5\r\n'
+    assert sio.readuntil(b'\r\n', 20) == b''
+    assert sio.in_waiting == 0
+
+def test_readuntil_ring(sio_provider: SerialIOProvider) -> None:
+    """Separator scans across the wrap point of a ring buffer"""
+    sio = SerialIO(sio_provider, sys.stderr, ring_capacity=8)
+    sio_provider.do_recv(b'ABCDEF')
+    assert sio.read(5) == b'ABCDE'
+    sio_provider.do_recv(b'G\r')
+    assert sio.readuntil(b'\r\n') == b''
+    sio_provider.do_recv(b'\nHIJ')  # Wraps around the end of storage
+    assert sio.readuntil(b'\r\n') == b'FG\r\n'
+    assert sio.readline() == b'HIJ'  # Partial line at end of data
 
 def test_reset_buffers(sio: SerialIO) -> None:
     """Clear input buffers then resume"""
@@ -220,6 +272,55 @@ def test_write_amid_read(sio: SerialIO) -> None:
     assert sio.readall() == b'Howdy'
     assert sio.in_waiting == 0
 
+class _DelayedProvider(SerialIOLoopbackProvider):
+    """Loopback provider which delivers queued buffers one per wait_recv() call."""
+
+    def __init__(self, *bufs: bytes):
+        super().__init__(sys.stderr)
+        self.pending = list(bufs)
+        self.n_waits = 0
+
+    def wait_recv(self, timeout: typing.Optional[float]) -> bool:
+        self.n_waits += 1
+        if self.pending:
+            self.do_recv(self.pending.pop(0))
+        else:
+            time.sleep(min(timeout, 0.01) if timeout is not None else 0.01)
+        return True
+
+def test_blocking_read() -> None:
+    """Blocking reads wait via the provider until enough data arrives"""
+    siop = _DelayedProvider(b'AB', b'', b'CDE', b'FG\n', b'HI')
+    sio = SerialIO(siop, sys.stderr, timeout=None)
+    assert sio.read(4) == b'ABCD'  # Waited through three deliveries
+    assert siop.n_waits == 3
+    assert sio.readline() == b'EFG\n'
+    assert sio.read(2) == b'HI'
+    sio.timeout = 0.05  # Now times out with a partial result
+    t_start = time.monotonic()
+    assert sio.read(5) == b''
+    siop.pending.append(b'JK')
+    assert sio.read(5) == b'JK'
+    assert time.monotonic() - t_start >= 0.1
+    assert sio.readuntil(b'\n') == b''
+    sio.timeout = 0  # Non-blocking never waits
+    n_waits = siop.n_waits
+    siop.pending.append(b'NEVER')
+    assert sio.read(1) == b''
+    assert siop.n_waits == n_waits
+
+def test_inter_byte_timeout() -> None:
+    """A gap in arrivals ends a read once some data was received"""
+    siop = _DelayedProvider(b'12', b'34')
+    sio = SerialIO(siop, sys.stderr, timeout=5, inter_byte_timeout=0.02)
+    t_start = time.monotonic()
+    assert sio.read(10) == b'1234'
+    assert time.monotonic() - t_start < 1
+    # Synchronous providers cannot deliver more by waiting, so never block
+    sio2 = SerialIO(SerialIOLoopbackProvider(sys.stderr), sys.stderr, timeout=None)
+    sio2.write(b'XY')
+    assert sio2.read(10) == b'XY'
+
 def test_raise_seekablefd(sio: SerialIO) -> None:
     """Ensure exception raised on use of seekable or related functions."""
     with pytest.raises(OSError) as err1:
@@ -276,3 +377,73 @@ def test_callback_none() -> None:
     siop.do_recv(b'LOST')
     assert sio.in_waiting == 2
     assert sio.out_waiting == 0
+
+def test_read_chunks(sio: SerialIO) -> None:
+    """Received buffers are handed out as read-only views, without copying"""
+    buf1 = b'ABCDEF'
+    mutable = bytearray(b'GHI')
+    sio._siop.do_recv(buf1)
+    sio._siop.do_recv(mutable)
+    mutable[:] = b'XYZ'  # Sender reusing its buffer does not alter queued data
+    assert sio.read(2) == b'AB'
+    peeked = sio.peek_chunks()
+    assert [bytes(v) for v in peeked] == [b'CDEF', b'GHI']
+    assert sio.in_waiting == 7  # Peeking does not consume
+    chunks = sio.read_chunks(5)
+    assert [bytes(v) for v in chunks] == [b'CDEF', b'G']
+    assert chunks[0].obj is buf1  # A view of the received buffer itself
+    assert all(v.readonly for v in chunks)
+    assert sio.in_waiting == 2
+    assert [bytes(v) for v in sio.read_chunks()] == [b'HI']
+    assert sio.read_chunks() == []
+
+def test_read_chunks_ring(sio_provider: SerialIOProvider) -> None:
+    """A ring buffer peeks at its storage, but copies data read as chunks"""
+    sio = SerialIO(sio_provider, ring_capacity=8)
+    sio_provider.do_recv(b'123456')
+    sio.read(4)
+    sio_provider.do_recv(b'7890')  # Wraps around the end of storage
+    assert [bytes(v) for v in sio.peek_chunks()] == [b'5678', b'90']
+    assert [bytes(v) for v in sio.read_chunks(3)] == [b'567']
+    assert sio.readall() == b'890'
+
+def test_metrics(sio_provider: SerialIOProvider) -> None:
+    """Metrics count only while enabled, and measure latency until data is read"""
+    sio = SerialIO(sio_provider)
+    sio_provider.do_recv(b'before')
+    assert sio.stats() == {'metrics_enabled': False, 'in_waiting': 6, 'chunks_waiting': 1}
+    sio.enable_metrics()
+    sio.reset_input_buffer()
+    sio_provider.do_recv(b'A' * 100)
+    sio_provider.do_recv(b'B' * 3)
+    sio.write(b'xyz')  # Loops back as a third chunk
+    assert sio.read(50) == b'A' * 50
+    assert sio.read(100) == b'A' * 50
+    time.sleep(0.01)
+    assert sio.readall() == b'BBBxyz'
+    assert sio.read(1) == b''
+    stats = sio.stats()
+    assert stats['metrics_enabled'] is True
+    assert (stats['recv_chunks'], stats['recv_bytes'], stats['hwm_chunks']) == (3, 106, 3)
+    assert stats['chunk_sizes']['buckets'] == {4: 2, 128: 1}  # 3, 3 and 100 bytes
+    assert (stats['read_calls'], stats['empty_reads'], stats['read_bytes']) == (4, 1, 106)
+    assert (stats['write_calls'], stats['write_bytes']) == (1, 3)
+    latency = stats['latency_ns']
+    assert latency['count'] == 3  # One per chunk, when its first byte was read
+    assert latency['max'] >= 10e6
+    sio.enable_metrics(False)
+    sio_provider.do_recv(b'paused')
+    assert sio.stats()['recv_chunks'] == 3  # Kept, but no longer updated
+    sio.reset_metrics()
+    assert sio.stats()['recv_chunks'] == 0
+
+def test_metrics_ring_dropped(sio_provider: SerialIOProvider) -> None:
+    """Ring overflow counts dropped bytes, and dropped chunks never report latency"""
+    sio = SerialIO(sio_provider, ring_capacity=8, metrics=True)
+    sio_provider.do_recv(b'12345')
+    sio_provider.do_recv(b'67890')  # Drops the oldest two bytes
+    assert sio.read(8) == b'34567890'
+    stats = sio.stats()
+    assert stats['dropped_bytes'] == 2
+    assert stats['hwm_bytes'] == 8
+    assert stats['latency_ns']['count'] == 1  # First chunk lost its first byte
@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""Tests of the asyncio stream interface to SerialIO."""
+
+import sys
+import asyncio
+import pytest
+
+from .. import SerialIO, SerialIOLoopbackProvider, SerialStreamReader, open_serial_connection
+
+
+def test_stream_reads() -> None:
+    """Readers wake when the provider delivers data, without polling."""
+    async def scenario() -> None:
+        siop = SerialIOLoopbackProvider(sys.stderr)
+        reader, writer = open_serial_connection(siop)
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.01, siop.do_recv, b'[1]: 0.')
+        loop.call_later(0.02, siop.do_recv, b'25\n[2]')
+        loop.call_later(0.03, siop.do_recv, b': 1.5\nTAIL')
+        assert await reader.readline() == b'[1]: 0.25\n'
+        assert await reader.readuntil(b': ') == b'[2]: '
+        assert await reader.readexactly(4) == b'1.5\n'
+        assert await reader.read(100) == b'TAIL'
+        writer.write(b'ECHO')
+        await writer.drain()
+        assert await asyncio.wait_for(reader.read(2), 1) == b'EC'
+        loop.call_soon(writer.close)  # EOF ends partial reads
+        with pytest.raises(asyncio.IncompleteReadError) as err:
+            await reader.readexactly(5)
+        assert err.value.partial == b'HO'
+        assert reader.at_eof()
+        assert writer.is_closing()
+    asyncio.run(scenario())
+
+def test_stream_iteration() -> None:
+    """Async iteration over lines, ending at a closed provider."""
+    async def scenario() -> None:
+        siop = SerialIOLoopbackProvider(sys.stderr)
+        reader = SerialStreamReader(SerialIO(siop, sys.stderr), limit=8)
+        siop.do_recv(b'A\nB\nPARTIAL')
+        siop.set_closed(True)
+        assert [line async for line in reader] == [b'A\n', b'B\n', b'PARTIAL']
+        siop.set_closed(False)
+        siop.do_recv(b'MUCH TOO LONG')
+        with pytest.raises(asyncio.LimitOverrunError):
+            await reader.readuntil(b'\n')
+    asyncio.run(scenario())
+
+def test_stream_one_waiter() -> None:
+    """Only one coroutine may wait upon a reader at a time."""
+    async def scenario() -> None:
+        reader, _ = open_serial_connection(SerialIOLoopbackProvider(sys.stderr))
+        first = asyncio.ensure_future(reader.read(1))
+        await asyncio.sleep(0)
+        with pytest.raises(RuntimeError):
+            await reader.read(1)
+        first.cancel()
+    asyncio.run(scenario())
+
+def test_stream_close_listeners() -> None:
+    """Closing the writer (again, harmlessly) detaches the pair from the SerialIO."""
+    async def scenario() -> None:
+        siop = SerialIOLoopbackProvider(sys.stderr)
+        reader, writer = open_serial_connection(siop)
+        sio = reader.sio
+        assert len(sio._listeners) == 1
+        siop.do_recv(b'LAST')
+        writer.close()
+        writer.close()
+        await writer.wait_closed()
+        assert not sio._listeners
+        assert await reader.read() == b'LAST'  # Data received before closing stays
+    asyncio.run(scenario())
+
+def test_stream_reader_loop() -> None:
+    """Readers belong to the running loop, so need one given when constructed outside."""
+    sio = SerialIO(SerialIOLoopbackProvider(sys.stderr))
+    with pytest.raises(RuntimeError):
+        SerialStreamReader(sio)
+    loop = asyncio.new_event_loop()
+    try:
+        reader = SerialStreamReader(sio, loop=loop)
+        sio._siop.do_recv(b'ready\n')
+        assert loop.run_until_complete(reader.readline()) == b'ready\n'
+    finally:
+        loop.close()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""\
+Tests of SerialTCPProvider against a loopback socket server acting as a serial bridge.
+"""
+
+import asyncio
+import os
+import socket
+import struct
+import time
+import typing
+import pytest
+
+from .. import SerialIO, SerialTCPProvider
+
+#pylint: disable=redefined-outer-name
+#pylint: disable=protected-access
+
+
+@pytest.fixture
+def bridge() -> typing.Iterator[typing.Tuple[SerialTCPProvider, socket.socket]]:
+    """(provider, server side socket) of a loopback connection."""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    (host, port) = listener.getsockname()
+    prov = SerialTCPProvider(host, port, connect_timeout=5.0)
+    (server, _) = listener.accept()
+    listener.close()
+    server.settimeout(5.0)
+    yield prov, server
+    prov.close()
+    server.close()
+
+
+def _recv_exactly(server: socket.socket, n_want: int) -> bytes:
+    data: bytes = b''
+    while len(data) < n_want:
+        part: bytes = server.recv(n_want - len(data))
+        if not part:
+            break
+        data += part
+    return data
+
+
+def test_tcp_roundtrip(bridge: typing.Tuple[SerialTCPProvider, socket.socket]) -> None:
+    """Blocking reads pull data through wait_recv, and writes reach the bridge"""
+    (prov, server) = bridge
+    assert prov.peername == server.getsockname()
+    sio = SerialIO(prov, timeout=5.0)
+    server.sendall(b'hello\nworld\n')
+    assert sio.readline() == b'hello\n'
+    assert sio.readline() == b'world\n'
+    sio.write(b'abc')
+    sio.write(bytearray(b'def'))
+    assert _recv_exactly(server, 6) == b'abcdef'
+    assert sio.out_waiting == 0
+    with pytest.raises(ValueError):
+        SerialTCPProvider(host='127.0.0.1')
+
+def test_tcp_reader_thread(bridge: typing.Tuple[SerialTCPProvider, socket.socket]) -> None:
+    """A reader thread delivers large reads, then EOF once the bridge shuts down"""
+    (prov, server) = bridge
+    sio = SerialIO(prov, timeout=5.0)
+    prov.start()
+    payload = bytes(range(256)) * 1024
+    server.sendall(payload)
+    assert sio.read(len(payload)) == payload
+    assert prov.n_read_bytes == len(payload)
+    server.sendall(b'tail')
+    server.shutdown(socket.SHUT_WR)
+    sio.timeout = None
+    assert sio.read(100) == b'tail'  # Data before EOF is still readable
+    assert prov.at_eof
+    assert not prov.is_closed()
+    prov.close()
+    assert prov.is_closed()
+
+def test_tcp_held_back(bridge: typing.Tuple[SerialTCPProvider, socket.socket]) -> None:
+    """Writes the socket does not accept are held back, then sent by drain()"""
+    (prov, server) = bridge
+    chunks = [bytes([i]) * 65536 for i in range(64)]  # More than socket buffers hold
+    for chunk in chunks:
+        prov.write_bytes(chunk)
+    assert prov.out_waiting() > 0
+    assert not prov.drain(0.01)
+    received: typing.List[bytes] = []
+    prov.start()  # Reader thread sends held back data as the socket becomes writable
+    while sum(len(part) for part in received) < len(chunks) * 65536:
+        received.append(server.recv(2 ** 20))
+    assert b''.join(received) == b''.join(chunks)
+    assert prov.drain(5.0)
+
+def test_tcp_reset(bridge: typing.Tuple[SerialTCPProvider, socket.socket]) -> None:
+    """A reset connection is reported by is_closed()"""
+    (prov, server) = bridge
+    sio = SerialIO(prov, timeout=5.0)
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_LINGER, struct.pack('ii', 1, 0))
+    server.close()  # Linger of 0 sends RST
+    time.sleep(0.05)
+    assert sio.read(1) == b''
+    assert prov.is_closed()
+    assert isinstance(prov.error, ConnectionError)
+    with pytest.raises(ValueError):
+        sio.write(b'x')
+
+def test_tcp_high_fd() -> None:
+    """A socket above select()'s FD_SETSIZE is waited on, and read from a given loop"""
+    (near, far) = socket.socketpair()
+    fd_high: int = 1100
+    try:
+        os.dup2(near.fileno(), fd_high)
+    except OSError:
+        pytest.skip("Too few fds allowed")
+    finally:
+        near.close()
+    prov = SerialTCPProvider(sock=socket.socket(fileno=fd_high))
+    assert prov._fd == fd_high
+    far.settimeout(5.0)
+    sio = SerialIO(prov, timeout=5.0)
+    far.sendall(b'high\n')
+    assert sio.readline() == b'high\n'
+    prov.write_bytes(b'back')
+    assert prov.drain(1.0)
+    assert _recv_exactly(far, 4) == b'back'
+    loop = asyncio.new_event_loop()
+    arrived: typing.List[bytes] = []
+    sio.add_recv_listener(arrived.append)
+    try:
+        prov.attach(loop)  # Not running yet, so given explicitly
+        far.sendall(b'loop')
+        t_end: float = time.monotonic() + 5.0
+        while not arrived and time.monotonic() < t_end:
+            loop.run_until_complete(asyncio.sleep(0.01))
+        prov.stop()
+    finally:
+        loop.close()
+    assert arrived == [b'loop']
+    prov.close()
+    far.close()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""\
+Tests of SerialTrace event recording, consumption and formatting.
+"""
+
+import io
+import threading
+import typing
+import pytest
+
+from .. import SerialIO, SerialIOLoopbackProvider, SerialTrace
+from ..trace import EV_OPEN, EV_RECV, EV_READ, EV_DISC, EV_WRITE, EV_MARK, EV_RESET_IN
+
+
+def test_trace_events() -> None:
+    """Events are decoded in order, and each is only consumed once"""
+    trace = SerialTrace(8)
+    trace.record(EV_RECV, 0x1234, 10, 0, 10)
+    trace.mark(42)
+    assert len(trace) == 2
+    events = trace.events()
+    assert [(evt.seq, evt.event) for evt in events] == [(0, EV_RECV), (1, EV_MARK)]
+    assert (events[0].obj_id, events[0].length, events[0].offset, events[0].extra) \
+        == (0x1234, 10, 0, 10)
+    assert events[1].extra == 42
+    assert events[0].time_ns <= events[1].time_ns
+    assert 'RECV   0x1234 len=10 off=0 x=10' in events[0].format()
+    assert trace.events() == []
+    assert len(trace) == 0
+
+def test_trace_overwrite() -> None:
+    """A full ring overwrites its oldest events, counting them as lost"""
+    trace = SerialTrace(4)
+    for i in range(10):
+        trace.mark(i)
+    assert [evt.extra for evt in trace.events()] == [6, 7, 8, 9]
+    assert trace.lost == 6
+    fout = io.StringIO()
+    for i in range(6):
+        trace.mark(i)
+    assert trace.dump(fout) == 4
+    lines = fout.getvalue().splitlines()
+    assert lines[0] == '# 2 trace events lost'
+    assert len(lines) == 5
+    with pytest.raises(ValueError):
+        SerialTrace(0)
+
+def test_trace_serialio() -> None:
+    """SerialIO and SerialIOLoopbackProvider record their activity, without payloads"""
+    trace = SerialTrace()
+    prov = SerialIOLoopbackProvider(trace=trace)
+    sio = SerialIO(prov, trace=trace)
+    sio.write(b'hello')
+    assert sio.read(3) == b'hel'
+    assert sio.read(10) == b'lo'
+    prov.do_recv(b'world')
+    sio.reset_input_buffer()
+    seen: typing.List[typing.Tuple] = [(evt.event, evt.obj_id, evt.length, evt.offset)
+                                       for evt in trace.events()]
+    assert seen == [
+        (EV_OPEN, id(prov), 0, 0),
+        (EV_OPEN, id(sio), 0, 0),
+        (EV_WRITE, id(prov), 5, 0),
+        (EV_RECV, id(sio), 5, 0),
+        (EV_WRITE, id(sio), 5, 0),
+        (EV_READ, id(sio), 3, 3),
+        (EV_DISC, id(sio), 5, 0),
+        (EV_READ, id(sio), 2, 5),
+        (EV_RECV, id(sio), 5, 5),
+        (EV_RESET_IN, id(sio), 5, 0),
+    ]
+
+def test_trace_threads() -> None:
+    """Concurrent recording loses nothing, and the background writer gets every event"""
+    trace = SerialTrace(2 ** 12)
+    fout = io.StringIO()
+    trace.start(fout, interval=0.001)
+    with pytest.raises(RuntimeError):
+        trace.start(fout)
+    def work(obj_id: int) -> None:
+        for i in range(500):
+            trace.record(EV_RECV, obj_id, 1, i)
+    threads = [threading.Thread(target=work, args=(n,)) for n in range(1, 5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    trace.stop()
+    lines = fout.getvalue().splitlines()
+    assert len(lines) == 2000
+    assert trace.lost == 0
+    for n in range(1, 5):
+        offsets = [int(line.split('off=')[1].split()[0])
+                   for line in lines if f' 0x{n:X} ' in line]
+        assert offsets == list(range(500))
@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""\
+Tests of SerialTTYProvider against a pseudo-terminal, the test acting as the device.
+"""
+
+import asyncio
+import os
+import time
+import typing
+import pytest
+
+from .. import SerialIO, SerialTTYProvider, SerialWriteTimeout
+
+pytest.importorskip('termios')
+
+#pylint: disable=redefined-outer-name
+#pylint: disable=protected-access
+
+
+@pytest.fixture
+def pty() -> typing.Iterator[typing.Tuple[int, str]]:
+    """(fd of the "device" end, path of the tty end) of a new pseudo-terminal."""
+    (fd_dev, fd_tty) = os.openpty()
+    path: str = os.ttyname(fd_tty)
+    os.close(fd_tty)  # Reopened by path, as a real device would be
+    yield fd_dev, path
+    try:
+        os.close(fd_dev)
+    except OSError:
+        pass
+
+
+def _device_read(fd_dev: int, n_want: int) -> bytes:
+    data: bytes = b''
+    t_end: float = time.monotonic() + 5.0
+    while len(data) < n_want and time.monotonic() < t_end:
+        data += os.read(fd_dev, n_want - len(data))
+    return data
+
+
+def test_tty_blocking_reads(pty: typing.Tuple[int, str]) -> None:
+    """Blocking SerialIO reads pull data through wait_recv, in raw mode"""
+    (fd_dev, path) = pty
+    with SerialTTYProvider(path, baudrate=115200) as prov:
+        sio = SerialIO(prov, timeout=5.0)
+        os.write(fd_dev, b'line one\r\nline two\n')  # Raw, so CR is untranslated
+        assert sio.readline() == b'line one\r\n'
+        assert sio.readline() == b'line two\n'
+        sio.timeout = 0.05
+        assert sio.read(10) == b''  # Times out
+        sio.write(b'hello\n')
+        assert _device_read(fd_dev, 6) == b'hello\n'
+        assert prov.drain(1.0)
+        assert prov.n_read_bytes == 19
+    assert prov.is_closed()
+    with pytest.raises(ValueError):
+        SerialTTYProvider(path, baudrate=12345)
+
+def test_tty_reader_thread(pty: typing.Tuple[int, str]) -> None:
+    """A reader thread delivers large reads, and reports EOF once the device hangs up"""
+    (fd_dev, path) = pty
+    prov = SerialTTYProvider(path)
+    sio = SerialIO(prov, timeout=5.0)
+    prov.start()
+    with pytest.raises(RuntimeError):
+        prov.start()
+    payload = bytes(range(256)) * 64
+    os.write(fd_dev, payload)
+    assert sio.read(len(payload)) == payload
+    assert sio.stats()['chunks_waiting'] == 0
+    os.close(fd_dev)
+    sio.timeout = None
+    assert sio.read(1) == b''  # EOF ends the blocking read
+    assert prov.at_eof
+    prov.close()
+
+def test_tty_event_loop(pty: typing.Tuple[int, str]) -> None:
+    """attach() delivers data from an asyncio loop reader"""
+    (fd_dev, path) = pty
+    prov = SerialTTYProvider(path)
+    sio = SerialIO(prov)
+    arrived: typing.List[bytes] = []
+    sio.add_recv_listener(arrived.append)
+
+    async def run() -> None:
+        prov.attach()
+        os.write(fd_dev, b'ping')
+        t_end: float = time.monotonic() + 5.0
+        while not arrived and time.monotonic() < t_end:
+            await asyncio.sleep(0.01)
+        prov.stop()
+
+    with pytest.raises(RuntimeError):
+        prov.attach()  # No running loop
+    asyncio.run(run())
+    assert sio.read(10) == b'ping'
+    prov.close()
+
+def test_tty_high_fd(pty: typing.Tuple[int, str]) -> None:
+    """Waits work for fds above select()'s FD_SETSIZE"""
+    (fd_dev, path) = pty
+    prov = SerialTTYProvider(path)
+    fd_high: int = 1100
+    try:
+        os.dup2(prov._fd, fd_high)
+    except OSError:
+        prov.close()
+        pytest.skip("Too few fds allowed")
+    os.close(prov._fd)
+    prov._fd = fd_high
+    sio = SerialIO(prov, timeout=5.0)
+    os.write(fd_dev, b'high\n')
+    assert sio.readline() == b'high\n'
+    prov.write_bytes(b'back')
+    assert prov.drain(1.0)
+    assert _device_read(fd_dev, 4) == b'back'
+    prov.close()
+
+def test_tty_write_timeout(pty: typing.Tuple[int, str]) -> None:
+    """Writes the device does not accept are held back, or time out with write_timeout"""
+    (fd_dev, path) = pty
+    prov = SerialTTYProvider(path)
+    big = b'x' * (2 ** 20)  # More than the pty buffers
+    prov.write_bytes(big)
+    assert prov.out_waiting() > 0
+    assert not prov.drain(0.05)
+    prov.reset_output()
+    assert prov.out_waiting() == 0
+    prov.write_timeout = 0.05
+    with pytest.raises(SerialWriteTimeout):
+        prov.write_bytes(big)
+    prov.close()
+    with pytest.raises(ValueError):
+        prov.write_bytes(b'closed')
@@ -0,0 +1,164 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""Low overhead debug tracing: compact binary events recorded into an in-memory ring.
+
+Recording an event only packs a few integers (no payload, no formatting, no flush),
+so tracing can stay enabled at full baud rate. Events are decoded and formatted later,
+on demand (events(), dump()) or periodically by a background thread (start()).
+Each ring slot is one _EVENT: (sequence + 1, time_ns, object id, offset, length,
+extra, event type), with sequence numbers letting readers detect overwritten slots.
+"""
+
+import itertools
+import struct
+import threading
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional, TextIO
+
+EV_OPEN: int = 0  # Object was constructed
+EV_RECV: int = 1  # Chunk queued: offset of its first byte, extra = bytes kept
+EV_READ: int = 2  # Bytes read: offset of the next byte to read, extra = bytes wanted
+EV_DISC: int = 3  # Depleted chunk left the queue: offset = chunk number
+EV_WRITE: int = 4  # Bytes written to a provider
+EV_LOST: int = 5  # Chunk arrived without any callback set to receive it
+EV_RESET_IN: int = 6  # Waiting input discarded: length = bytes discarded
+EV_RESET_OUT: int = 7  # Waiting output discarded
+EV_MARK: int = 8  # Annotation from mark(): extra = caller's value
+
+EVENT_NAMES: Dict[int, str] = {
+    EV_OPEN: 'OPEN', EV_RECV: 'RECV', EV_READ: 'READ', EV_DISC: 'DISC',
+    EV_WRITE: 'WRITE', EV_LOST: 'LOST', EV_RESET_IN: 'RSTIN', EV_RESET_OUT: 'RSTOUT',
+    EV_MARK: 'MARK',
+}
+
+_EVENT = struct.Struct('<QQQqIqB3x')  # 48 bytes
+_EVENT_SIZE: int = _EVENT.size
+_monotonic_ns = time.monotonic_ns
+
+
+class TraceEvent(NamedTuple):
+    """One decoded trace event."""
+    seq: int  # Sequence number, counting every event ever recorded
+    time_ns: int  # time.monotonic_ns() when recorded
+    event: int  # EV_* type
+    obj_id: int  # id() of the recording object
+    offset: int
+    length: int
+    extra: int
+
+    def format(self, t_base: int = 0) -> str:
+        """Single line description, with time in microseconds since t_base."""
+        name: str = EVENT_NAMES.get(self.event, str(self.event))
+        return (f'{(self.time_ns - t_base) / 1000:14.3f} {name:<6} 0x{self.obj_id:X}'
+                f' len={self.length} off={self.offset} x={self.extra}')
+
+
+class SerialTrace():
+    """Fixed capacity ring of trace events, the oldest overwritten once it is full.
+        record() may be called from any thread. Events are consumed by events() (or
+        the dump() and start() methods using it), and lost counts those overwritten
+        before being consumed.
+    """
+
+    def __init__(self, capacity: int = 2 ** 16):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity: int = capacity
+        self._buf: bytearray = bytearray(_EVENT_SIZE * capacity)
+        self._pack_into = _EVENT.pack_into  # Bound once, since record() is the hot path
+        self._counter = itertools.count()  # next() is atomic, so threads claim distinct slots
+        self._seq_last: int = -1  # Hint of the latest sequence number recorded
+        self._seq_next: int = 0  # Next sequence number to consume
+        self.lost: int = 0
+        self.t_base: int = time.monotonic_ns()  # Formatted times are relative to this
+        self._thread: Optional[threading.Thread] = None
+        self._stop: threading.Event = threading.Event()
+        self._lock: threading.Lock = threading.Lock()  # Serializes consumers only
+
+    def record(self, event: int, obj_id: int, length: int = 0, offset: int = 0,
+               extra: int = 0) -> None:
+        """Append an event, overwriting the oldest slot once the ring is full."""
+        seq: int = next(self._counter)
+        self._pack_into(self._buf, (seq % self.capacity) * _EVENT_SIZE, seq + 1,
+                        _monotonic_ns(), obj_id, offset, length, extra, event)
+        self._seq_last = seq
+
+    def mark(self, value: int = 0, obj_id: int = 0) -> None:
+        """Record an EV_MARK annotation, eg: to locate a point of interest in the trace."""
+        self.record(EV_MARK, obj_id, 0, 0, value)
+
+    def __len__(self) -> int:
+        """Approximate count of events recorded but not yet consumed (nor lost)."""
+        return max(0, min(self.capacity, self._seq_last + 1 - self._seq_next))
+
+    def events(self) -> List[TraceEvent]:
+        """Consume and decode events recorded since the last call, oldest first.
+            Stops early at a slot whose (concurrent) recording has not finished.
+        """
+        with self._lock:
+            seq_last: int = self._seq_last
+            seq: int = self._seq_next
+            if seq < seq_last + 1 - self.capacity:  # Overwritten before being consumed
+                self.lost += seq_last + 1 - self.capacity - seq
+                seq = seq_last + 1 - self.capacity
+            decoded: List[TraceEvent] = []
+            while seq <= seq_last:
+                (stored, t_ns, obj_id, offset, length, extra, event) = _EVENT.unpack_from(
+                    self._buf, (seq % self.capacity) * _EVENT_SIZE)
+                if stored <= seq:  # Still being recorded (by another thread)
+                    break
+                if stored == seq + 1:
+                    decoded.append(TraceEvent(seq, t_ns, event, obj_id, offset, length, extra))
+                else:  # Overwritten while consuming
+                    self.lost += 1
+                seq += 1
+            self._seq_next = seq
+            return decoded
+
+    def iter_lines(self) -> Iterator[str]:
+        """Consume events, formatting each as a line of text (with newline)."""
+        for evt in self.events():
+            yield evt.format(self.t_base) + '\n'
+
+    def dump(self, fout: TextIO) -> int:
+        """Consume events, writing them formatted to fout. Returns events written."""
+        n_lost: int = self.lost
+        lines: List[str] = list(self.iter_lines())
+        n_events: int = len(lines)
+        if self.lost > n_lost:
+            lines.insert(0, f'# {self.lost - n_lost} trace events lost\n')
+        if lines:
+            fout.writelines(lines)
+            fout.flush()
+        return n_events
+
+    def start(self, fout: TextIO, interval: float = 0.1) -> None:
+        """Dump events to fout every interval seconds from a background (daemon) thread."""
+        if self._thread is not None:
+            raise RuntimeError("Trace writer already started")
+        self._stop.clear()
+
+        def run() -> None:
+            while not self._stop.wait(interval):
+                self.dump(fout)
+            self.dump(fout)  # Whatever was recorded before stop()
+
+        self._thread = threading.Thread(target=run, name='SerialTrace', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread of start(), after it writes the remaining events."""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> 'SerialTrace':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# Copyright (c) cdr4eelz.
+# Distributed under the terms of the Modified BSD License.
+
+"""SerialIOProvider reading a local tty/pty device directly (POSIX only), bypassing the
+    browser's Web Serial and the kernel comm when the device is attached to the machine
+    running the kernel.
+"""
+
+import errno
+import os
+import struct
+from typing import List, Optional, TextIO, Union
+
+try:
+    import fcntl
+    import termios
+except ImportError:  # Not POSIX, only already opened non-tty fds can work
+    fcntl = None
+    termios = None
+
+from ._pollprovider import PollingProvider
+
+
+class SerialTTYProvider(PollingProvider):
+    """SerialIOProvider for a local tty (device path, or an already open fd such as one
+        end of os.openpty()), using a non-blocking fd and delivering each os.read() of
+        up to read_size bytes to do_recv. Data is read by whichever of these is active:
+            start() a reader thread, which also sends data held back by write_bytes
+            attach() to an asyncio loop, using loop.add_reader()
+            otherwise blocking SerialIO reads, via wait_recv()
+        Terminals are switched to raw mode (unless raw=False), at baudrate if given.
+        An fd passed in is left open by close(), while a path opened here is closed.
+    """
+
+    def __init__(self, port: Union[str, int], baudrate: Optional[int] = None,
+                 raw: bool = True, read_size: int = 2 ** 16,
+                 write_timeout: Optional[float] = None, dbglog: TextIO = None):
+        super().__init__(read_size, write_timeout, dbglog)
+        self._owns_fd: bool = not isinstance(port, int)
+        if self._owns_fd:
+            self._fd = os.open(port, os.O_RDWR | os.O_NOCTTY | os.O_NONBLOCK)
+        else:
+            self._fd = port
+            os.set_blocking(port, False)
+        if termios is not None and os.isatty(self._fd):
+            self._configure(baudrate, raw)
+        elif baudrate is not None:
+            raise ValueError("baudrate requires a tty")
+        if self._dbglog:
+            self._dbglog.write(f'Constructed {ascii(self)} fd={self._fd}\n')
+
+    def _configure(self, baudrate: Optional[int], raw: bool) -> None:
+        """Apply raw mode and baudrate to the terminal."""
+        attrs = termios.tcgetattr(self._fd)
+        if raw:  # As tty.setraw(), plus CLOCAL to ignore modem control lines
+            attrs[0] &= ~(termios.BRKINT | termios.ICRNL | termios.INPCK | termios.ISTRIP
+                          | termios.IXON | termios.IXOFF | termios.INLCR | termios.IGNCR)
+            attrs[1] &= ~termios.OPOST
+            attrs[2] &= ~(termios.CSIZE | termios.PARENB)
+            attrs[2] |= termios.CS8 | termios.CREAD | termios.CLOCAL
+            attrs[3] &= ~(termios.ECHO | termios.ICANON | termios.IEXTEN | termios.ISIG)
+            attrs[6][termios.VMIN] = 1
+            attrs[6][termios.VTIME] = 0
+        if baudrate is not None:
+            speed: Optional[int] = getattr(termios, f'B{baudrate}', None)
+            if speed is None:
+                raise ValueError(f"Unsupported baudrate {baudrate}")
+            attrs[4] = attrs[5] = speed
+        termios.tcsetattr(self._fd, termios.TCSANOW, attrs)
+
+    def _read_raw(self) -> bytes:
+        try:
+            return os.read(self._fd, self._read_size)
+        except OSError as exc:
+            if exc.errno != errno.EIO:  # EIO is how a pty reports a closed peer
+                raise
+            return b''
+
+    def _write_raw(self, bufs: List[memoryview]) -> int:
+        return os.writev(self._fd, bufs)
+
+    def _close_raw(self) -> None:
+        if self._owns_fd:
+            os.close(self._fd)
+
+    def _kernel_out_waiting(self) -> int:
+        """Bytes in the terminal's output queue, where that can be queried."""
+        if fcntl is None or not hasattr(termios, 'TIOCOUTQ'):
+            return 0
+        try:
+            return struct.unpack('i', fcntl.ioctl(self._fd, termios.TIOCOUTQ, b'\0' * 4))[0]
+        except (OSError, TypeError):  # Unsupported, or fd closed meanwhile
+            return 0
+
+    def _reset_kernel_output(self) -> None:
+        if termios is not None and os.isatty(self._fd):
+            termios.tcflush(self._fd, termios.TCOFLUSH)
@@ -62,6 +62,9 @@ setup_args = dict(
         'ipywidgets>=7.0.0',
         "jupyter_server>=1.6,<2"
     ],
+    extras_require={
+        'numpy': ['numpy'],  # serialhub.parsers
+    },
     zip_safe=False,
     include_package_data=True,
     python_requires=">=3.7",
@@ -87,19 +87,23 @@ export class SerialHubPort {
     }
   }
 
-  /* writeToStream writes and awaits multiple buffers to the serial port */
-  writeToStream(data: ArrayBufferView[] | ArrayBuffer[]): number {
-    if (!this.writer) {
+  /* writeToStream writes multiple buffers to the serial port in order,
+      resolving to the number of bytes once all were committed to the port */
+  async writeToStream(data: ArrayBufferView[] | ArrayBuffer[]): Promise<number> {
+    const writer = this.writer;
+    if (!writer) {
       throw new TypeError('Stream not open');
     }
-    data.forEach(async (d: ArrayBufferView | ArrayBuffer) => {
-      //Anonymous function is ASYNC so it can AWAIT the write() call below
+    //Queue every write() now, so writes from later calls can not come between
+    const pending: Promise<void>[] = [];
+    for (const d of data) {
       console.log('[WRITE]', d, d.byteLength);
-      await this.writer?.write(d); //AWAIT in sequence, to avoid parallel promises
-    });
+      pending.push(writer.write(d));
+    }
     let nWritten = 0;
-    for (const d of data) {
-      nWritten += d.byteLength; //TODO: What about offsets in ArrayBufferView???
+    for (let i = 0; i < data.length; i++) {
+      await pending[i]; //The writer completes queued writes in sequence
+      nWritten += data[i].byteLength;
     }
     console.log('[WROTE]', nWritten);
     return nWritten;
@@ -42,7 +42,12 @@ export class SerialHubModel extends DOMWidgetModel {
       pkt_recv_front: [0, 0],
       pkt_send_front: [0, 0],
       pkt_recv_back: [0, 0],
-      pkt_send_back: [0, 0]
+      pkt_send_back: [0, 0],
+      recv_batch_ms: 0,
+      recv_batch_bytes: 0,
+      stats_interval: 0,
+      scrollback_chars: 0,
+      scrollback_lines: 0
     };
   }
 
@@ -69,9 +74,26 @@ export class SerialHubView extends DOMWidgetView {
   protected _el_prompt: HTMLSpanElement | null = null;
   protected _el_stats: HTMLPreElement | null = null;
   protected _el_value: HTMLPreElement | null = null;
+  protected _scroll: [Text, number, number][] = []; //[node, chars, newlines]
+  protected _scroll_chars = 0;
+  protected _scroll_lines = 0;
 
   _shp: SerialHubPort | null = null;
 
+  /* Received chunks held back to be forwarded to the backend as one RECV message */
+  protected _rbatch: Uint8Array[] = [];
+  protected _rbatch_bytes = 0;
+  protected _rbatch_timer: ReturnType<typeof setTimeout> | null = null;
+  protected _rbatch_stat: [number, number] = [0, 0];
+
+  /* Frontend statistics, counted locally and published to the model periodically */
+  protected _stat_counts: Dict<[number, number]> = {
+    pkt_recv_front: [0, 0],
+    pkt_send_front: [0, 0]
+  };
+  protected _stat_timer: ReturnType<typeof setTimeout> | null = null;
+  protected _stat_time = 0; //Date.now() of last stats_publish()
+
   render(): this {
     console.log('RENDER serialhub widget');
     this.el.id = this.id || UUID.uuid4();
@@ -113,6 +135,7 @@ export class SerialHubView extends DOMWidgetView {
     this.model.on('change:pkt_send_back', this.changed_stats, this);
 
     this.model.on('msg:custom', this.msg_custom, this);
+    this.model.send({ type: 'VREQ' }, {}); //Ask for any scrollback retained so far
 
     const supported: boolean = SerialHubPort.isSupported();
     this.model.set('is_supported', supported);
@@ -163,6 +186,65 @@ export class SerialHubView extends DOMWidgetView {
     if (this._el_value && this.model) {
       this._el_value.textContent = this.model.get('value');
     }
+    this._scroll = [];
+    this._scroll_chars = 0;
+    this._scroll_lines = 0;
+  }
+  count_lines(text: string): number {
+    let nLines = 0;
+    for (let i = text.indexOf('\n'); i >= 0; i = text.indexOf('\n', i + 1)) {
+      nLines++;
+    }
+    return nLines;
+  }
+  append_scrollback(text: string): void {
+    //Append a VDLT delta, then trim oldest text to the scrollback limits
+    if (!this._el_value) {
+      return;
+    }
+    if (this._scroll.length === 0) {
+      this._el_value.textContent = ''; //Replace any "value" text
+    }
+    const node = window.document.createTextNode(text);
+    this._el_value.appendChild(node);
+    const nLines = this.count_lines(text);
+    this._scroll.push([node, text.length, nLines]);
+    this._scroll_chars += text.length;
+    this._scroll_lines += nLines;
+    const maxChars: number = this.model.get('scrollback_chars');
+    const maxLines: number = this.model.get('scrollback_lines');
+    while (this._scroll.length > 0) {
+      const head = this._scroll[0];
+      const data: string = head[0].data;
+      let nCut = 0;
+      if (maxChars > 0 && this._scroll_chars > maxChars) {
+        nCut = Math.min(data.length, this._scroll_chars - maxChars);
+      }
+      if (maxLines > 0 && this._scroll_lines > maxLines) {
+        let iNL = -1;
+        for (let n = this._scroll_lines - maxLines; n > 0; n--) {
+          iNL = data.indexOf('\n', iNL + 1);
+          if (iNL < 0) {
+            break;
+          }
+        }
+        nCut = Math.max(nCut, iNL < 0 ? data.length : iNL + 1);
+      }
+      if (nCut <= 0) {
+        break;
+      }
+      const nCutLines = this.count_lines(data.substring(0, nCut));
+      this._scroll_chars -= nCut;
+      this._scroll_lines -= nCutLines;
+      if (nCut >= data.length) {
+        head[0].remove();
+        this._scroll.shift();
+      } else {
+        head[0].deleteData(0, nCut);
+        head[1] -= nCut;
+        head[2] -= nCutLines;
+      }
+    }
   }
   changed_stats(): void {
     if (this._el_stats) {
@@ -179,28 +261,47 @@ export class SerialHubView extends DOMWidgetView {
 
   /* stats_zero set all frontend & backend stats to 0 */
   protected stats_zero(): void {
-    this.model.set('pkt_recv_front', [0, 0]);
-    this.model.set('pkt_send_front', [0, 0]);
-    //this.model.send({ type: 'RSTS' }, {}); //Send message to reset backend stats
-    this.model.set('pkt_recv_back', [0, 0]);
-    this.model.set('pkt_send_back', [0, 0]);
-    this.touch();
+    this._stat_counts = { pkt_recv_front: [0, 0], pkt_send_front: [0, 0] };
+    this.model.send({ type: 'RSTS' }, {}); //Send message to reset backend stats
+    this.stats_publish();
   }
+  /* stats_inc_tuple counts in plain numbers, published according to stats_interval */
   protected stats_inc_tuple(
     key: string,
     nBytes: number,
     nPackets = 1
   ): [number, number] {
-    const [oByt, oPkt] = this.model.get(key);
+    const [oByt, oPkt] = this._stat_counts[key];
     const nStats: [number, number] = [oByt + nBytes, oPkt + nPackets];
-    this.model.set(key, nStats);
-    this.touch();
+    this._stat_counts[key] = nStats;
+    const interval: number = this.model.get('stats_interval');
+    if (interval === 0) {
+      this.stats_publish();
+    } else if (interval > 0 && this._stat_timer === null) {
+      const msWait = this._stat_time + interval * 1000 - Date.now();
+      if (msWait <= 0) {
+        this.stats_publish();
+      } else {
+        this._stat_timer = setTimeout(() => this.stats_publish(), msWait);
+      }
+    }
     return nStats;
   }
+  /* stats_publish syncs the frontend counters to the pkt_*_front traitlets */
+  stats_publish(): void {
+    if (this._stat_timer !== null) {
+      clearTimeout(this._stat_timer);
+      this._stat_timer = null;
+    }
+    this._stat_time = Date.now();
+    for (const key in this._stat_counts) {
+      this.model.set(key, this._stat_counts[key]);
+    }
+    this.touch();
+  }
 
-  cb_read(this: SerialHubView, value: Uint8Array): void {
-    console.log('DATA-IN', value.length, value);
-    const nStat = this.stats_inc_tuple('pkt_recv_front', value.length);
+  /* send_recv forwards received serial data to the backend */
+  protected send_recv(value: Uint8Array, nStat: [number, number]): void {
     try {
       this.model.send({ type: 'RECV', pkt_recv_front: nStat }, {}, [value]);
     } catch (e) {
@@ -210,13 +311,59 @@ export class SerialHubView extends DOMWidgetView {
     }
   }
 
+  /* flush_recv merges any held back chunks into a single RECV message */
+  flush_recv(): void {
+    if (this._rbatch_timer !== null) {
+      clearTimeout(this._rbatch_timer);
+      this._rbatch_timer = null;
+    }
+    if (this._rbatch.length <= 0) {
+      return;
+    }
+    let merged: Uint8Array = this._rbatch[0];
+    if (this._rbatch.length > 1) {
+      merged = new Uint8Array(this._rbatch_bytes);
+      let offset = 0;
+      for (const chunk of this._rbatch) {
+        merged.set(chunk, offset);
+        offset += chunk.length;
+      }
+    }
+    this._rbatch = [];
+    this._rbatch_bytes = 0;
+    this.send_recv(merged, this._rbatch_stat);
+  }
+
+  cb_read(this: SerialHubView, value: Uint8Array): void {
+    console.log('DATA-IN', value.length, value);
+    const nStat = this.stats_inc_tuple('pkt_recv_front', value.length);
+    const batchMs: number = this.model.get('recv_batch_ms');
+    if (!(batchMs > 0)) {
+      this.flush_recv(); //In case batching was just turned off
+      this.send_recv(value, nStat);
+      return;
+    }
+    //Batching: each read() yields a fresh Uint8Array, so it can be held as-is
+    this._rbatch.push(value);
+    this._rbatch_bytes += value.length;
+    this._rbatch_stat = nStat;
+    const batchBytes: number = this.model.get('recv_batch_bytes');
+    if (batchBytes > 0 && this._rbatch_bytes >= batchBytes) {
+      this.flush_recv();
+    } else if (this._rbatch_timer === null) {
+      this._rbatch_timer = setTimeout(() => this.flush_recv(), batchMs);
+    }
+  }
+
   cb_connect(this: SerialHubView): void {
     console.log('cb_connect', this._shp);
     this.update_stats_title(); //Update serialPortInfo since we connected
     this.stats_zero(); //Reset statistics on fresh connection
-    this._shp?.readLoop((value: Uint8Array) => {
-      this.cb_read(value);
-    });
+    this._shp
+      ?.readLoop((value: Uint8Array) => {
+        this.cb_read(value);
+      })
+      .then(() => this.flush_recv()); //Forward anything still batched
     console.log('DONE cb_connect');
   }
 
@@ -265,14 +412,48 @@ export class SerialHubView extends DOMWidgetView {
     }
   }
 
+  protected write_send(mBuffs: DataView[], offset: number): void {
+    //Acknowledge SEND data with SENT once written, so backend can limit data in flight
+    //(echoing the SEND offset, so backend can tell which data an acknowledgement is for)
+    let nBytes = 0;
+    for (const b of mBuffs) {
+      nBytes += b.byteLength;
+    }
+    const acked = (nWritten: number): void => {
+      const nStat = this.stats_inc_tuple('pkt_send_front', nWritten);
+      this.model.send(
+        { type: 'SENT', acked: nBytes, offset: offset, stat_client: nStat },
+        {},
+        []
+      );
+    };
+    if (!this._shp) {
+      return; //Only a view with an open port acknowledges (and writes) data
+    }
+    this._shp
+      .writeToStream(mBuffs)
+      .then(acked, (e: Error) => {
+        console.error('WRITE FAILED', e);
+        acked(0); //Failed data is no longer in flight either
+      });
+  }
+
   msg_custom(this: SerialHubView, mData: Dict<any>, mBuffs: DataView[]): void {
     //console.log(this, mData, mBuffs);
     const msgType = mData['type'];
     if (msgType === 'SEND') {
       console.log('MSG-SEND', mBuffs);
-      if (this._shp) {
-        const nWritten: number = this._shp.writeToStream(mBuffs);
-        this.stats_inc_tuple('pkt_send_front', nWritten);
+      this.write_send(mBuffs, mData['offset']);
+    } else if (msgType === 'STAT') {
+      this.stats_publish(); //Backend asked for statistics on demand
+    } else if (msgType === 'VDLT') {
+      this.append_scrollback(mData['text']); //Scrollback mode delta of "value"
+    } else if (msgType === 'VCLR') {
+      this.changed_value(); //Scrollback cleared, show "value" instead
+    } else if (msgType === 'VSET') {
+      this.changed_value(); //Whole scrollback, replacing whatever is shown
+      if (mData['text']) {
+        this.append_scrollback(mData['text']);
       }
     } else {
       console.log('UNKNOWN MESSAGE: ', msgType, mData, mBuffs);